@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+import unittest
+import jwt
+from app import create_app
+
+# A valid /api/predict-time body
+SAMPLE_FEATURES = {
+    "length": 30,
+    "colors": 2,
+    "decorations": 1,
+    "technique": 1,
+    "service_type": 1,
+    "complexity": 3
+}
+
+class APITestCase(unittest.TestCase):
+    # Every test gets its own app on a throwaway database. Subclasses add or
+    # override settings through `config`.
+    config = {}
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.app = create_app(dict({
+            'DATABASE': os.path.join(self.tmp, 'test.db'),
+            'RATE_LIMIT_ENABLED': False,
+            'ONLINE_LEARNING': False,
+            'HASH_WORKERS': 0,
+            'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000'
+        }, **self.config)).test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def register(self, name, email, role):
+        # The registration response plus `headers` for authenticated requests and the new user's `id`
+        response = self.app.post('/api/auth/register', json={
+            'name': name, 'email': email, 'password': 'secret', 'role': role
+        })
+        self.assertEqual(response.status_code, 201)
+        data = response.get_json()
+        data['headers'] = {'Authorization': f'Bearer {data["token"]}'}
+        data['id'] = jwt.decode(data['token'], options={'verify_signature': False})['user_id']
+        return data
+
+    def login(self, email, password='secret', ip='127.0.0.1'):
+        return self.app.post('/api/auth/login', json={'email': email, 'password': password},
+                             environ_base={'REMOTE_ADDR': ip})
@@ -0,0 +1,113 @@
+import numpy as np
+
+SOLVERS = ('batch', 'minibatch', 'lstsq')
+
+
+# --- NumPy Linear Regression ---
+# Drop-in for LinearRegressionCustom (same fit/predict/loss), vectorised and
+# not tied to 6 features.
+class LinearRegressionNumpy:
+    def __init__(self, lr=0.001, epochs=100, solver='batch', batch_size=256, seed=None, verbose=True, l2=0.0):
+        if solver not in SOLVERS:
+            raise ValueError(f"Unknown solver {solver!r}, expected one of {SOLVERS}")
+        self.lr = lr
+        self.epochs = epochs
+        self.solver = solver
+        self.batch_size = batch_size
+        # L2 (ridge) penalty on the weights, not on the bias
+        self.l2 = l2
+        self.verbose = verbose
+        self.rng = np.random.default_rng(seed)
+        self.w = None
+        self.b = self.rng.random()
+        self.losses = []
+        # Епохата (1-based) на всяка стойност в losses
+        self.loss_epochs = []
+
+    def _init_weights(self, n_features):
+        if self.w is None or self.w.shape != (n_features,):
+            self.w = self.rng.random(n_features)
+
+    def predict(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        y = x @ self.w + self.b
+        return float(y) if x.ndim == 1 else y
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self._init_weights(X.shape[1])
+        if self.solver == 'lstsq':
+            self._fit_lstsq(X, y)
+            return self
+        for epoch in range(self.epochs):
+            if self.solver == 'batch':
+                self._step(X, y)
+            else:
+                order = self.rng.permutation(len(X))
+                Xs, ys = X[order], y[order]
+                for start in range(0, len(X), self.batch_size):
+                    end = start + self.batch_size
+                    self._step(Xs[start:end], ys[start:end])
+            if epoch % 10 == 0 or epoch == self.epochs - 1:
+                loss = self.loss(X, y)
+                self.losses.append(loss)
+                self.loss_epochs.append(epoch + 1)
+                if self.verbose:
+                    print(f"Epoch {epoch+1}/{self.epochs}, loss: {loss:.4f}")
+        return self
+
+    def partial_fit(self, X, y):
+        # One SGD pass over a chunk; used by stream_train for out-of-core data.
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self._init_weights(X.shape[1])
+        for start in range(0, len(X), self.batch_size):
+            end = start + self.batch_size
+            self._step(X[start:end], y[start:end])
+        return self
+
+    def _step(self, X, y):
+        error = X @ self.w + self.b - y
+        scale = 2 / len(X)
+        self.w -= self.lr * (scale * (X.T @ error) + 2 * self.l2 * self.w)
+        self.b -= self.lr * scale * error.sum()
+
+    def _fit_lstsq(self, X, y):
+        A = np.hstack([X, np.ones((len(X), 1))])
+        if self.l2:
+            # Ridge normal equations; same objective as _step: mean squared error + l2·|w|²
+            penalty = np.eye(A.shape[1]) * self.l2 * len(X)
+            penalty[-1, -1] = 0.0
+            coef = np.linalg.solve(A.T @ A + penalty, A.T @ y)
+        else:
+            coef, *_ = np.linalg.lstsq(A, y, rcond=None)
+        self.w, self.b = coef[:-1], float(coef[-1])
+        self.losses.append(self.loss(X, y))
+        self.loss_epochs.append(1)
+
+    def loss(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        error = X @ self.w + self.b - np.asarray(y, dtype=np.float64)
+        return float(error @ error / len(X))
+
+    def visualize(self, X, y, path=None):
+        # С path графиката се записва във файл без дисплей (Agg), иначе plt.show()
+        import matplotlib
+        if path:
+            matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        X = np.asarray(X, dtype=np.float64)
+        # Визуализира само по първата характеристика (length)
+        order = np.argsort(X[:, 0])
+        plt.scatter(X[:, 0], y, label='Данни')
+        plt.plot(X[order, 0], self.predict(X[order]), color="red", label='Линеен модел')
+        plt.xlabel("length")
+        plt.ylabel("time")
+        plt.legend()
+        plt.tight_layout()
+        if path:
+            plt.savefig(path)
+            plt.close()
+        else:
+            plt.show()
@@ -0,0 +1,51 @@
+import argparse
+import hashlib
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference import FEATURES, FlatModelFile, linear_weights, load_model, write_flat
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def model_row(model):
+    # Тегла върху суровите признаци + bias, за sklearn pipeline или LinearRegressionNumpy
+    if getattr(model, "w", None) is not None and hasattr(model, "b"):
+        weights, bias = np.asarray(model.w, dtype=np.float64), float(model.b)
+    else:
+        folded = linear_weights(model)
+        if folded is None:
+            raise ValueError(f"{type(model).__name__} is not linear in the raw features and cannot be exported")
+        weights, bias = folded
+    if weights.shape != (len(FEATURES),):
+        raise ValueError(f"expected {len(FEATURES)} weights, got {weights.shape}")
+    return np.append(weights, bias)
+
+
+def export(models, path, **meta):
+    # models: {име: модел}; всички се записват в една таблица
+    names = list(models)
+    table = np.vstack([model_row(models[name]) for name in names])
+    return write_flat(path, table, names, **meta)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a trained model to the flat, memory-mappable format")
+    parser.add_argument("--model", default=os.path.join(HERE, "nail_model.pkl"))
+    parser.add_argument("--out", default=os.path.join(HERE, "nail_model.bin"))
+    parser.add_argument("--name", default="default")
+    args = parser.parse_args(argv)
+
+    with open(args.model, "rb") as f:
+        source = hashlib.sha256(f.read()).hexdigest()[:12]
+    export({args.name: load_model(args.model)}, args.out, source=os.path.basename(args.model), source_version=source)
+    flat = FlatModelFile(args.out)
+    print(f"{args.out}: {len(flat)} model(s), {os.path.getsize(args.out)} bytes, source {source}")
+    print(f"w: {np.round(flat.table[0, :-1], 4).tolist()}, b: {flat.table[0, -1]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine import LinearRegressionNumpy
+
+FEATURES = ["length", "colors", "decorations", "technique", "service_type", "complexity"]
+TARGET = "time"
+
+
+def iter_chunks(path, chunksize=100_000, features=FEATURES, target=TARGET):
+    # Чете CSV-то на парчета с фиксирани типове, без да го зарежда целия в паметта.
+    columns = list(features) + [target]
+    reader = pd.read_csv(path, usecols=columns, dtype={c: np.float64 for c in columns}, chunksize=chunksize)
+    for chunk in reader:
+        yield chunk[list(features)].to_numpy(), chunk[target].to_numpy()
+
+
+def train_stream(path, model, chunksize=100_000, passes=1):
+    rows = 0
+    start = time.perf_counter()
+    for _ in range(passes):
+        for X, y in iter_chunks(path, chunksize):
+            model.losses.append(model.loss(X, y) if model.w is not None else float("nan"))
+            model.partial_fit(X, y)
+            rows += len(X)
+    return rows, time.perf_counter() - start
+
+
+def peak_rss_mb():
+    # ru_maxrss е в KB на Linux и в байтове на macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming training over a large appointments CSV")
+    parser.add_argument("csv")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--passes", type=int, default=1)
+    parser.add_argument("--lr", type=float, default=0.0001)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", help="write the trained weights as a flat model file (see export_model.py)")
+    args = parser.parse_args(argv)
+
+    model = LinearRegressionNumpy(lr=args.lr, batch_size=args.batch_size, seed=args.seed, verbose=False)
+    rows, seconds = train_stream(args.csv, model, args.chunksize, args.passes)
+    print(f"rows: {rows}, seconds: {seconds:.2f}, rows/sec: {rows / seconds:,.0f}, peak RSS: {peak_rss_mb():.1f} MB")
+    print(f"last chunk loss: {model.losses[-1]:.4f}")
+    print(f"w: {np.round(model.w, 4).tolist()}, b: {model.b:.4f}")
+    if args.out:
+        from export_model import export
+        export({"default": model}, args.out, source=args.csv, rows=rows)
+        print(f"exported to {args.out}")
+    return model
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
+import os
+import sys
 import pandas as pd
 import joblib
+import numpy as np
 from sklearn.metrics import mean_squared_error
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference import CompiledPredictor, FlatModelFile, compile_model
+from tuning import cross_validate
+
 # Зареждане на данни и модела
 df = pd.read_csv("nail_time.csv")
 model = joblib.load("nail_model.pkl")
@@ -14,4 +21,24 @@ y = df["time"]
 y_pred = model.predict(X)
 mse = mean_squared_error(y, y_pred)
 
-print(f"Средна квадратична грешка: {mse:.2f}") 
\ No newline at end of file
+print(f"Средна квадратична грешка (върху обучаващите данни): {mse:.2f}")
+
+# Оценка върху данни, които моделът не е виждал: 5-fold крос-валидация
+cv = cross_validate({"solver": "lstsq", "lr": 0.0, "epochs": 0, "l2": 0.0, "transform": "raw"},
+                    X.to_numpy(dtype=np.float64), y.to_numpy(dtype=np.float64))
+print(f"Средна квадратична грешка (5-fold CV): {cv['mse']:.2f} ± {cv['std']:.2f}")
+
+# Съвпадение на компилирания модел с model.predict
+predictor = compile_model(model)
+rows = X.to_dict("records")
+single = np.array([predictor.predict_one(row) for row in rows])
+batch = predictor.predict_many(rows)
+assert isinstance(predictor, CompiledPredictor), "модела не може да бъде компилиран"
+assert np.allclose(single, y_pred, rtol=0, atol=1e-9), "predict_one се различава от model.predict"
+assert np.allclose(batch, y_pred, rtol=0, atol=1e-9), "predict_many се различава от model.predict"
+print(f"Компилиран модел: {len(rows)} реда съвпадат с model.predict")
+
+# Плоският файл (export_model.py) дава същите прогнози като pickle-а
+flat = FlatModelFile("nail_model.bin").predictor()
+assert np.allclose(flat.predict_many(rows), y_pred, rtol=0, atol=1e-9), "nail_model.bin се различава от nail_model.pkl"
+print("nail_model.bin съвпада с nail_model.pkl")
@@ -1,14 +1,26 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import argparse
+import json
+import os
 import random
+import time
+
+import pandas as pd
+
+from engine import SOLVERS, LinearRegressionNumpy
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FEATURES = ["length", "colors", "decorations", "technique", "service_type", "complexity"]
+TARGET = "time"
+
 
 # --- Custom Linear Regression ---
 class LinearRegressionCustom:
-    def __init__(self, lr=0.001, epochs=100):
+    def __init__(self, lr=0.001, epochs=100, verbose=True):
         self.w = [random.random() for _ in range(6)]  # 6 features
         self.b = random.random()
         self.lr = lr
         self.epochs = epochs
+        self.verbose = verbose
         self.losses = []
 
     def predict(self, x):
@@ -34,7 +46,8 @@ class LinearRegressionCustom:
             if epoch % 10 == 0 or epoch == self.epochs - 1:
                 loss = self.loss(X, y)
                 self.losses.append(loss)
-                print(f"Epoch {epoch+1}/{self.epochs}, loss: {loss:.4f}")
+                if self.verbose:
+                    print(f"Epoch {epoch+1}/{self.epochs}, loss: {loss:.4f}")
 
     def loss(self, X, y):
         n = len(X)
@@ -45,6 +58,7 @@ class LinearRegressionCustom:
         return total_loss / n
 
     def visualize(self, X, y):
+        import matplotlib.pyplot as plt
         # Визуализира само по първата характеристика (length)
         plt.scatter([x[0] for x in X], y, label='Данни')
         x_sorted = sorted(X, key=lambda x: x[0])
@@ -56,12 +70,54 @@ class LinearRegressionCustom:
         plt.tight_layout()
         plt.show()
 
-# --- Зареждане на данните ---
-df = pd.read_csv('nail_time.csv')
-X = df[["length", "colors", "decorations", "technique", "service_type", "complexity"]].values.tolist()
-y = df["time"].values.tolist()
 
-# --- Обучение с custom LinearRegression ---
-custom_model = LinearRegressionCustom(lr=0.0001, epochs=100)
-custom_model.fit(X, y)
-custom_model.visualize(X, y) 
\ No newline at end of file
+def load_data(path):
+    df = pd.read_csv(path, usecols=FEATURES + [TARGET])
+    return df[FEATURES].to_numpy(dtype=float), df[TARGET].to_numpy(dtype=float)
+
+
+def train(X, y, lr=0.0001, epochs=100, solver="batch", l2=0.0, seed=None):
+    model = LinearRegressionNumpy(lr=lr, epochs=epochs, solver=solver, l2=l2, seed=seed, verbose=False)
+    start = time.perf_counter()
+    model.fit(X, y)
+    return model, time.perf_counter() - start
+
+
+def write_loss_log(path, model, **meta):
+    # Един JSON ред на обучение: параметри, време и кривата на загубата
+    record = dict(meta, epochs=model.loss_epochs, losses=[round(loss, 6) for loss in model.losses])
+    with open(path, "a") as f:
+        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the duration model (headless unless --plot is given)")
+    parser.add_argument("--csv", default=os.path.join(HERE, "nail_time.csv"))
+    parser.add_argument("--lr", type=float, default=0.0001)
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--solver", choices=SOLVERS, default="batch")
+    parser.add_argument("--l2", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--loss-log", help="append the loss curve as a JSON line to this file")
+    parser.add_argument("--out", help="write the trained weights as a flat model file (see export_model.py)")
+    parser.add_argument("--plot", nargs="?", const="", metavar="PNG",
+                        help="show the fit, or save it to PNG without a display")
+    args = parser.parse_args(argv)
+
+    X, y = load_data(args.csv)
+    model, seconds = train(X, y, args.lr, args.epochs, args.solver, args.l2, args.seed)
+    print(f"rows: {len(X)}, seconds: {seconds:.3f}, loss: {model.losses[-1]:.4f}")
+    if args.loss_log:
+        write_loss_log(args.loss_log, model, csv=args.csv, rows=len(X), seconds=round(seconds, 6),
+                       lr=args.lr, solver=args.solver, l2=args.l2, seed=args.seed)
+    if args.out:
+        from export_model import export
+        export({"default": model}, args.out, source=args.csv, rows=len(X), solver=args.solver)
+        print(f"exported to {args.out}")
+    if args.plot is not None:
+        model.visualize(X, y, args.plot or None)
+    return model
+
+
+if __name__ == '__main__':
+    main()
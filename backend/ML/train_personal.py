@@ -0,0 +1,68 @@
+import argparse
+import os
+import sqlite3
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference import FEATURES, MODEL_PATH, FlatModelFile, write_flat
+from model_pool import PERSONAL_MODELS_PATH
+
+DATABASE = os.environ.get("NAILTIME_DB", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nailtime.db"))
+
+
+def completed_by_worker(conn):
+    # Приключени часове с реално време и всички признаци, групирани по работник
+    rows = conn.execute(f"""
+        SELECT worker_id, {", ".join(FEATURES)}, actual_time FROM appointments
+        WHERE status = 'completed' AND actual_time IS NOT NULL
+          AND {" AND ".join(f"{f} IS NOT NULL" for f in FEATURES)}
+        ORDER BY worker_id
+    """).fetchall()
+    groups = {}
+    for worker_id, *values in rows:
+        groups.setdefault(worker_id, []).append(values)
+    return {worker_id: np.array(values, dtype=np.float64) for worker_id, values in groups.items()}
+
+
+def fit_shrunk(X, y, prior, strength):
+    # Ridge регресия, свита към глобалния модел вместо към нула:
+    # min |Xa·w - y|² + strength·|w - prior|². При малко данни остава близо до prior.
+    Xa = np.hstack([X, np.ones((len(X), 1))])
+    A = Xa.T @ Xa + strength * np.eye(Xa.shape[1])
+    return np.linalg.solve(A, Xa.T @ y + strength * prior)
+
+
+def train(conn, prior, min_samples=10, strength=50.0):
+    names, rows = [], []
+    for worker_id, data in completed_by_worker(conn).items():
+        if len(data) < min_samples:
+            continue
+        names.append(f"worker:{worker_id}")
+        rows.append(fit_shrunk(data[:, :-1], data[:, -1], prior, strength))
+    return names, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit per-worker duration models from completed appointments")
+    parser.add_argument("--db", default=DATABASE)
+    parser.add_argument("--global-model", default=MODEL_PATH)
+    parser.add_argument("--out", default=PERSONAL_MODELS_PATH)
+    parser.add_argument("--min-samples", type=int, default=10)
+    parser.add_argument("--strength", type=float, default=50.0)
+    args = parser.parse_args(argv)
+
+    global_model = FlatModelFile(args.global_model).predictor()
+    prior = np.append(global_model.weights, global_model.bias)
+    with sqlite3.connect(args.db) as conn:
+        names, rows = train(conn, prior, args.min_samples, args.strength)
+    if not names:
+        print(f"no worker has {args.min_samples}+ completed appointments with actual times")
+        return
+    write_flat(args.out, np.vstack(rows), names, strength=args.strength, min_samples=args.min_samples)
+    print(f"{len(names)} personal models written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from engine import LinearRegressionNumpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference import write_flat
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FEATURES = ["length", "colors", "decorations", "technique", "service_type", "complexity"]
+TARGET = "time"
+TRANSFORMS = ("raw", "standardize", "squares")
+
+DEFAULT_GRID = {
+    "solver": ["batch", "lstsq"],
+    "lr": [0.0001, 0.001, 0.01],
+    "epochs": [100, 500],
+    "l2": [0.0, 0.01, 0.1],
+    "transform": list(TRANSFORMS),
+}
+
+
+# --- Трансформации на признаците ---
+# Параметрите се смятат само върху обучаващата част на всеки fold.
+
+def fit_transform(name, X):
+    if name == "standardize":
+        std = X.std(axis=0)
+        return X.mean(axis=0), np.where(std > 0, std, 1.0)
+    if name in ("raw", "squares"):
+        return None
+    raise ValueError(f"Unknown transform {name!r}, expected one of {TRANSFORMS}")
+
+
+def apply_transform(name, params, X):
+    if name == "standardize":
+        mean, std = params
+        return (X - mean) / std
+    if name == "squares":
+        return np.hstack([X, X ** 2])
+    return X
+
+
+def raw_weights(name, params, model):
+    # Тегла върху суровите признаци, ако трансформацията е линейна, иначе None
+    if name == "raw":
+        return np.asarray(model.w, dtype=np.float64), float(model.b)
+    if name == "standardize":
+        mean, std = params
+        w = model.w / std
+        return w, float(model.b - w @ mean)
+    return None
+
+
+# --- Крос-валидация ---
+
+def kfold(n, k=5, seed=0):
+    order = np.random.default_rng(seed).permutation(n)
+    folds = np.array_split(order, k)
+    for i in range(k):
+        yield np.concatenate(folds[:i] + folds[i + 1:]), folds[i]
+
+
+def build(config, seed=0):
+    return LinearRegressionNumpy(lr=config["lr"], epochs=config["epochs"], solver=config["solver"],
+                                 l2=config["l2"], seed=seed, verbose=False)
+
+
+def cross_validate(config, X, y, k=5, seed=0):
+    scores = []
+    for train, test in kfold(len(X), k, seed):
+        params = fit_transform(config["transform"], X[train])
+        model = build(config, seed)
+        with np.errstate(over="ignore", invalid="ignore"):
+            model.fit(apply_transform(config["transform"], params, X[train]), y[train])
+            score = model.loss(apply_transform(config["transform"], params, X[test]), y[test])
+        scores.append(score if math.isfinite(score) else math.inf)
+    with np.errstate(over="ignore", invalid="ignore"):
+        mse, std = float(np.mean(scores)), float(np.std(scores))
+    return {"config": config, "mse": mse, "std": std if math.isfinite(std) else math.inf, "folds": scores}
+
+
+def grid(space):
+    keys = list(space)
+    for values in itertools.product(*(space[key] for key in keys)):
+        config = dict(zip(keys, values))
+        # lr и epochs не влияят на lstsq; пази само по една такава конфигурация
+        if config["solver"] == "lstsq" and (config["lr"], config["epochs"]) != (space["lr"][0], space["epochs"][0]):
+            continue
+        yield config
+
+
+def random_configs(n, seed=0):
+    rnd = random.Random(seed)
+    for _ in range(n):
+        yield {
+            "solver": rnd.choice(["batch", "minibatch", "lstsq"]),
+            "lr": 10 ** rnd.uniform(-5, -1.5),
+            "epochs": rnd.choice([50, 100, 200, 500, 1000]),
+            "l2": rnd.choice([0.0, 10 ** rnd.uniform(-4, 0)]),
+            "transform": rnd.choice(TRANSFORMS),
+        }
+
+
+# --- Споделени данни за работните процеси ---
+# Родителят копира X и y веднъж в shared memory; всеки процес ги вижда като
+# numpy масиви без собствено копие.
+
+_shared = {}
+
+
+def _attach(name, shape):
+    block = shared_memory.SharedMemory(name=name)
+    data = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+    _shared.update(block=block, X=data[:, :-1], y=data[:, -1])
+
+
+def _evaluate(config, k, seed):
+    return cross_validate(config, _shared["X"], _shared["y"], k, seed)
+
+
+def search(configs, X, y, k=5, seed=0, workers=None):
+    configs = list(configs)
+    workers = os.cpu_count() if workers is None else workers
+    if workers <= 1:
+        return sorted((cross_validate(c, X, y, k, seed) for c in configs), key=lambda r: r["mse"])
+    data = np.column_stack([X, y]).astype(np.float64)
+    block = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    try:
+        np.ndarray(data.shape, dtype=np.float64, buffer=block.buf)[:] = data
+        with ProcessPoolExecutor(workers, initializer=_attach, initargs=(block.name, data.shape)) as pool:
+            chunksize = max(1, len(configs) // (workers * 4))
+            results = list(pool.map(_evaluate, configs, itertools.repeat(k), itertools.repeat(seed),
+                                    chunksize=chunksize))
+    finally:
+        block.close()
+        block.unlink()
+    return sorted(results, key=lambda r: r["mse"])
+
+
+def fit_best(config, X, y, seed=0):
+    params = fit_transform(config["transform"], X)
+    model = build(config, seed)
+    model.fit(apply_transform(config["transform"], params, X), y)
+    return model, params
+
+
+def load_csv(path):
+    import pandas as pd
+    df = pd.read_csv(path, usecols=FEATURES + [TARGET])
+    return df[FEATURES].to_numpy(dtype=np.float64), df[TARGET].to_numpy(dtype=np.float64)
+
+
+def print_leaderboard(results, top):
+    print(f"{'#':>3} {'mse':>10} {'std':>8}  {'solver':<9} {'lr':>9} {'epochs':>6} {'l2':>8}  transform")
+    for i, r in enumerate(results[:top], 1):
+        c = r["config"]
+        print(f"{i:>3} {r['mse']:>10.3f} {r['std']:>8.3f}  {c['solver']:<9} {c['lr']:>9.2g} {c['epochs']:>6} "
+              f"{c['l2']:>8.2g}  {c['transform']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validated grid/random search for the duration model")
+    parser.add_argument("--csv", default=os.path.join(HERE, "nail_time.csv"))
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--random", type=int, default=0, help="sample N random configs instead of the grid")
+    parser.add_argument("--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--leaderboard", help="write all results as JSON")
+    parser.add_argument("--out", help="export the best model, refitted on all data, as a flat model file")
+    parser.add_argument("--compare-serial", action="store_true", help="also run serially and report the speedup")
+    args = parser.parse_args(argv)
+
+    X, y = load_csv(args.csv)
+    configs = list(random_configs(args.random, args.seed) if args.random else grid(DEFAULT_GRID))
+    start = time.perf_counter()
+    results = search(configs, X, y, args.folds, args.seed, args.workers)
+    parallel = time.perf_counter() - start
+    workers = args.workers or os.cpu_count()
+    print(f"{len(configs)} configs x {args.folds} folds on {len(X)} rows: {parallel:.2f} s with {workers} worker(s)")
+    if args.compare_serial:
+        start = time.perf_counter()
+        search(configs, X, y, args.folds, args.seed, workers=1)
+        serial = time.perf_counter() - start
+        print(f"serial: {serial:.2f} s, speedup {serial / parallel:.2f}x")
+    print_leaderboard(results, args.top)
+
+    if args.leaderboard:
+        with open(args.leaderboard, "w") as f:
+            json.dump(results, f, indent=2)
+    best = next((r for r in results if r["config"]["transform"] != "squares"), None) if args.out else None
+    if best is not None:
+        # Само линейни модели върху суровите признаци могат да се сервират
+        model, params = fit_best(best["config"], X, y, args.seed)
+        w, b = raw_weights(best["config"]["transform"], params, model)
+        write_flat(args.out, np.append(w, b), cv_mse=best["mse"], config=best["config"], source=args.csv)
+        print(f"best servable model (cv mse {best['mse']:.3f}) exported to {args.out}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import logging
+import math
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+VIEWS = ('week', 'month', 'year')
+ALL_SERVICES = ''
+
+
+def init_schema(conn):
+    # One row per (granularity, bucket start, service); service '' holds the
+    # totals across services. The primary key doubles as the range index.
+    # Returns True when existing rollups hold non-numeric amounts (written
+    # before completions were coerced) and need a rebuild().
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS appointment_rollups (
+            period TEXT NOT NULL,
+            period_start TEXT NOT NULL,
+            service TEXT NOT NULL,
+            appointments INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            minutes REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (period, period_start, service)
+        ) WITHOUT ROWID
+    ''')
+    conn.commit()
+    return conn.execute('''
+        SELECT 1 FROM appointment_rollups
+        WHERE typeof(revenue) NOT IN ('real', 'integer') OR typeof(minutes) NOT IN ('real', 'integer')
+        LIMIT 1
+    ''').fetchone() is not None
+
+
+def bucket_starts(day):
+    return {
+        'day': day,
+        'week': day - timedelta(days=day.weekday()),
+        'month': day.replace(day=1),
+    }
+
+
+def amount(appointment, *columns):
+    # First of `columns` that is set, as a float. Older rows may hold text
+    # that is not a number; it counts as 0, the same as SUM() in rebuild().
+    for column in columns:
+        value = appointment[column]
+        if value is None or value == '':
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            number = math.nan
+        if math.isfinite(number):
+            return number
+        logger.warning('Completed appointment has a non-numeric %s %r, counted as 0', column, value)
+        return 0.0
+    return 0.0
+
+
+def apply_completion(conn, appointment, sign=1):
+    # Adds (sign=1) or removes (sign=-1) one completed appointment from every
+    # rollup it belongs to. Runs inside the caller's transaction.
+    day = date.fromisoformat(appointment['start_at'][:10])
+    minutes = amount(appointment, 'actual_time', 'predicted_time')
+    revenue = amount(appointment, 'price')
+    rows = [
+        (period, start.isoformat(), service, sign, sign * revenue, sign * minutes)
+        for period, start in bucket_starts(day).items()
+        for service in (ALL_SERVICES, appointment['service'])
+    ]
+    conn.executemany('''
+        INSERT INTO appointment_rollups (period, period_start, service, appointments, revenue, minutes)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (period, period_start, service) DO UPDATE SET
+            appointments = appointments + excluded.appointments,
+            revenue = revenue + excluded.revenue,
+            minutes = minutes + excluded.minutes
+    ''', rows)
+
+
+def rebuild(conn):
+    # Recomputes every rollup from the appointments table, e.g. after a bulk import.
+    buckets = {
+        'day': "date(start_at)",
+        'week': "date(start_at, 'weekday 0', '-6 days')",
+        'month': "strftime('%Y-%m-01', start_at)",
+    }
+    conn.execute('DELETE FROM appointment_rollups')
+    for period, expression in buckets.items():
+        for service in ("''", 'service'):
+            conn.execute(f'''
+                INSERT INTO appointment_rollups (period, period_start, service, appointments, revenue, minutes)
+                SELECT '{period}', {expression}, {service}, COUNT(*), COALESCE(SUM(price), 0),
+                       COALESCE(SUM(COALESCE(actual_time, predicted_time, 0)), 0)
+                FROM appointments WHERE status = 'completed'
+                GROUP BY 2, 3
+            ''')
+    conn.commit()
+
+
+def series_range(view, anchor):
+    # Dashboard views: week -> 7 daily points, month -> daily points,
+    # year -> 12 monthly points. Returns (granularity, first, last, services period).
+    if view == 'week':
+        first = anchor - timedelta(days=anchor.weekday())
+        return 'day', first, first + timedelta(days=6), 'week'
+    if view == 'month':
+        first = anchor.replace(day=1)
+        last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return 'day', first, last, 'month'
+    if view == 'year':
+        return 'month', anchor.replace(month=1, day=1), anchor.replace(month=12, day=1), 'month'
+    raise ValueError(f'Unknown period {view!r}')
+
+
+def bucket_range(granularity, first, last):
+    current = first
+    while current <= last:
+        yield current
+        if granularity == 'day':
+            current += timedelta(days=1)
+        else:
+            current = (current + timedelta(days=32)).replace(day=1)
+
+
+def read_dashboard(conn, view, anchor):
+    granularity, first, last, services_period = series_range(view, anchor)
+    rows = conn.execute('''
+        SELECT period_start, appointments, revenue, minutes FROM appointment_rollups
+        WHERE period = ? AND service = '' AND period_start BETWEEN ? AND ?
+        ORDER BY period_start
+    ''', (granularity, first.isoformat(), last.isoformat())).fetchall()
+    # Services come from the coarsest rollup that exactly covers the range:
+    # one week row, one month row, or twelve month rows per service.
+    services = conn.execute('''
+        SELECT service, SUM(appointments) AS appointments, SUM(revenue) AS revenue FROM appointment_rollups
+        WHERE period = ? AND service != '' AND period_start BETWEEN ? AND ?
+        GROUP BY service ORDER BY appointments DESC
+    ''', (services_period, first.isoformat(), last.isoformat())).fetchall()
+    # Empty buckets have no rollup row; fill them so the charts get every point
+    found = {r['period_start']: r for r in rows}
+    series = []
+    for start in bucket_range(granularity, first, last):
+        r = found.get(start.isoformat())
+        series.append({'start': start.isoformat(), 'appointments': r['appointments'] if r else 0,
+                       'revenue': round(r['revenue'], 2) if r else 0.0, 'minutes': round(r['minutes'], 1) if r else 0.0})
+    total = sum(s['appointments'] for s in series)
+    return {
+        'period': view,
+        'from': first.isoformat(),
+        'to': last.isoformat(),
+        'series': series,
+        'services': [{'name': r['service'], 'appointments': r['appointments'], 'revenue': round(r['revenue'], 2),
+                      'share': round(100 * r['appointments'] / total, 1) if total else 0.0} for r in services],
+        'totals': {
+            'appointments': total,
+            'revenue': round(sum(s['revenue'] for s in series), 2),
+            'avg_minutes': round(sum(s['minutes'] for s in series) / total, 1) if total else None,
+        },
+    }
+
+
+def init_app(app):
+    pool = app.extensions['db_pool']
+    conn = pool.connect()
+    try:
+        if init_schema(conn):
+            logger.warning('Rebuilding appointment rollups that hold non-numeric amounts')
+            rebuild(conn)
+    finally:
+        conn.close()
@@ -1,257 +1,190 @@
-from flask import Flask, request, jsonify
+from flask import Flask
 from flask_cors import CORS
-import sqlite3
-from werkzeug.security import generate_password_hash, check_password_hash
 import os
-from datetime import datetime, timedelta
-import jwt
 import logging
-import joblib
-import pandas as pd
-from flask_bootstrap import Bootstrap
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager
+import analytics
+import db
+import hashing
+import json_codec
+import metrics
+import micro_batcher
+import model_pool
+import model_registry
+import online_learning
+import outbox
+import prediction_cache
+import rate_limit
+import scheduling
+import users
+from logging_setup import configure_logging
+from blueprints.admin import admin_bp
+from blueprints.analytics import analytics_bp
+from blueprints.appointments import appointments_bp
+from blueprints.auth import auth_bp, update_user
+from blueprints.predict import predict_bp
+from blueprints.users import users_bp
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-CORS(app, 
-     resources={r"/api/*": {
-         "origins": [
-             "http://localhost:8080",
-             "http://127.0.0.1:8080",
-             "http://172.20.10.7:8080"
-         ],
-         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-         "allow_headers": ["Content-Type", "Authorization", "Accept"],
-         "expose_headers": ["Content-Type", "Authorization"],
-         "supports_credentials": True
-     }})
+CORS_RESOURCES = {r"/api/*": {
+    "origins": [
+        "http://localhost:8080",
+        "http://127.0.0.1:8080",
+        "http://172.20.10.7:8080"
+    ],
+    "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    "allow_headers": ["Content-Type", "Authorization", "Accept"],
+    "expose_headers": ["Content-Type", "Authorization"],
+    "supports_credentials": True
+}}
 
-# Configuration
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///nailtime.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = 'your_email@gmail.com'
-app.config['MAIL_PASSWORD'] = 'your_email_password'
-app.config['MAIL_DEFAULT_SENDER'] = 'your_email@gmail.com'
 
-DATABASE = 'nailtime.db'
+def load_config(app):
+    # Configuration
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
+    app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+    app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+    app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', '1') == '1'
+    app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME', 'your_email@gmail.com')
+    app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD', 'your_email_password')
+    app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', 'your_email@gmail.com')
+    app.config['MAIL_SENDER_ENABLED'] = os.environ.get('MAIL_SENDER_ENABLED', '0') == '1'
+    app.config['MAIL_BATCH_SIZE'] = int(os.environ.get('MAIL_BATCH_SIZE', 50))
+    app.config['MAIL_POLL_INTERVAL'] = float(os.environ.get('MAIL_POLL_INTERVAL', 5))
+    app.config['MAIL_REMINDER_HOURS'] = float(os.environ.get('MAIL_REMINDER_HOURS', 24))
+    app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    app.config['RATE_LIMIT_BACKEND'] = os.environ.get('RATE_LIMIT_BACKEND', 'shared')
+    if 'RATE_LIMITS' in os.environ:
+        app.config['RATE_LIMITS'] = os.environ['RATE_LIMITS']
+    app.config['JSON_ORJSON'] = os.environ.get('JSON_ORJSON', '1') == '1'
+    app.config['AUTH_CACHE_ENABLED'] = os.environ.get('AUTH_CACHE_ENABLED', '1') == '1'
+    app.config['AUTH_CACHE_TTL'] = float(os.environ.get('AUTH_CACHE_TTL', 60))
+    app.config['AUTH_USER_CACHE_TTL'] = float(os.environ.get('AUTH_USER_CACHE_TTL', 5))
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 8))
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config['HASH_WORKERS'] = int(os.environ.get('HASH_WORKERS', 2))
+    app.config['HASH_MAX_PENDING'] = int(os.environ.get('HASH_MAX_PENDING', 32))
+    if 'MODEL_PATH' in os.environ:
+        app.config['MODEL_PATH'] = os.environ['MODEL_PATH']
+    app.config['MODEL_PRELOAD'] = os.environ.get('MODEL_PRELOAD', '1') == '1'
+    app.config['MODEL_WATCH_INTERVAL'] = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+    app.config['MODEL_MAX_HOLDOUT_MSE'] = float(os.environ['MODEL_MAX_HOLDOUT_MSE']) if 'MODEL_MAX_HOLDOUT_MSE' in os.environ else None
+    app.config['MODEL_POOL_SIZE'] = int(os.environ.get('MODEL_POOL_SIZE', 1024))
+    if 'PERSONAL_MODELS_PATH' in os.environ:
+        app.config['PERSONAL_MODELS_PATH'] = os.environ['PERSONAL_MODELS_PATH']
+    app.config['ONLINE_LEARNING'] = os.environ.get('ONLINE_LEARNING', '1') == '1'
+    app.config['ONLINE_AUTO_PROMOTE'] = os.environ.get('ONLINE_AUTO_PROMOTE', '0') == '1'
+    app.config['ONLINE_MAX_HOLDOUT_RATIO'] = float(os.environ.get('ONLINE_MAX_HOLDOUT_RATIO', 1.5))
+    app.config['ONLINE_SNAPSHOT_INTERVAL'] = float(os.environ.get('ONLINE_SNAPSHOT_INTERVAL', 300))
+    app.config['MICROBATCH_ENABLED'] = os.environ.get('MICROBATCH_ENABLED', '0') == '1'
+    app.config['MICROBATCH_WINDOW_MS'] = float(os.environ.get('MICROBATCH_WINDOW_MS', 2))
+    app.config['MICROBATCH_MAX_SIZE'] = int(os.environ.get('MICROBATCH_MAX_SIZE', 32))
+    app.config['MICROBATCH_TIMEOUT'] = float(os.environ.get('MICROBATCH_TIMEOUT', 1.0))
+    app.config['PREDICTION_CACHE_SIZE'] = int(os.environ.get('PREDICTION_CACHE_SIZE', 4096))
+    app.config['PREDICTION_CACHE_WARM'] = os.environ.get('PREDICTION_CACHE_WARM', '0') == '1'
+    app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED', '0') == '1'
+    app.config['PROFILE_SLOW_MS'] = float(os.environ.get('PROFILE_SLOW_MS', 100))
+    app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'profiles')
+    app.config['SCHEDULE_OPEN'] = os.environ.get('SCHEDULE_OPEN', '09:00')
+    app.config['SCHEDULE_CLOSE'] = os.environ.get('SCHEDULE_CLOSE', '19:00')
+    app.config['SCHEDULE_STEP'] = int(os.environ.get('SCHEDULE_STEP', 15))
+    app.config['SCHEDULE_REFRESH_SECONDS'] = float(os.environ.get('SCHEDULE_REFRESH_SECONDS', 30))
+    app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO')
+    app.config['LOG_LEVELS'] = os.environ.get('LOG_LEVELS', 'werkzeug=INFO')
+    app.config['LOG_SAMPLING'] = os.environ.get('LOG_SAMPLING', '')
+    app.config['LOG_FORMAT'] = os.environ.get('LOG_FORMAT', 'json')
 
-def init_db():
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            role TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
 
-def get_db():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+def create_app(config=None):
+    app = Flask(__name__)
+    CORS(app, resources=CORS_RESOURCES)
+    load_config(app)
+    if config:
+        app.config.update(config)
 
-# Initialize database
-with app.app_context():
-    init_db()
+    # Structured logging through a background queue listener
+    configure_logging(app)
 
-def generate_token(user):
-    token = jwt.encode({
-        'user_id': user['id'],
-        'name': user['name'],
-        'email': user['email'],
-        'role': user['role'],
-        'exp': datetime.utcnow() + timedelta(days=1)
-    }, app.config['SECRET_KEY'], algorithm='HS256')
-    return token
+    # orjson for request bodies and jsonify(), when installed
+    json_codec.init_app(app)
 
-def token_required(f):
-    from functools import wraps
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'message': 'Token is missing'}), 401
-        try:
-            token = token.split(' ')[1]  # Remove 'Bearer ' prefix
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            conn = get_db()
-            cur = conn.cursor()
-            cur.execute('SELECT * FROM users WHERE id = ?', (data['user_id'],))
-            current_user = cur.fetchone()
-            conn.close()
-            if not current_user:
-                raise Exception('User not found')
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Invalid token'}), 401
-        except Exception as e:
-            return jsonify({'message': str(e)}), 401
-        return f(current_user, *args, **kwargs)
-    return decorated
+    # Request latency histograms, /metrics and opt-in profiling
+    metrics.init_app(app)
 
-@app.route('/api/auth/register', methods=['POST', 'OPTIONS'])
-def register():
-    if request.method == 'OPTIONS':
-        return '', 204
-        
-    try:
-        logger.debug('Registration request received')
-        data = request.get_json()
-        if not data:
-            logger.error('No data provided in registration request')
-            return jsonify({'message': 'No data provided'}), 400
-        
-        logger.debug(f'Registration data received: {data}')
-        
-        # Validate required fields
-        required_fields = ['name', 'email', 'password', 'role']
-        missing_fields = [field for field in required_fields if not data.get(field)]
-        if missing_fields:
-            logger.error(f'Missing required fields in registration request: {missing_fields}')
-            return jsonify({'message': f'Missing required fields: {", ".join(missing_fields)}'}), 400
-        
-        # Validate role
-        if data['role'] not in ['client', 'worker', 'owner']:
-            logger.error(f'Invalid role in registration request: {data["role"]}')
-            return jsonify({'message': 'Invalid role'}), 400
-        
-        # Validate email format
-        if '@' not in data['email']:
-            logger.error(f'Invalid email format in registration request: {data["email"]}')
-            return jsonify({'message': 'Invalid email format'}), 400
-        
-        conn = get_db()
-        cur = conn.cursor()
-        
-        # Check if user already exists
-        cur.execute('SELECT * FROM users WHERE email = ?', (data['email'],))
-        if cur.fetchone():
-            logger.error(f'Email already registered: {data["email"]}')
-            conn.close()
-            return jsonify({'message': 'Email already registered'}), 409
-        
-        # Create new user
-        password_hash = generate_password_hash(data['password'])
-        try:
-            cur.execute('''
-                INSERT INTO users (name, email, password_hash, role)
-                VALUES (?, ?, ?, ?)
-            ''', (data['name'], data['email'], password_hash, data['role']))
-            conn.commit()
-            
-            # Get the created user
-            cur.execute('SELECT * FROM users WHERE email = ?', (data['email'],))
-            user = cur.fetchone()
-            
-            if not user:
-                logger.error('Failed to create user after successful insert')
-                raise Exception('Failed to create user')
-            
-            token = generate_token(user)
-            logger.debug('User successfully registered and token generated')
-            return jsonify({
-                'message': 'Registration successful',
-                'token': token,
-                'user': {
-                    'name': user['name'],
-                    'email': user['email'],
-                    'role': user['role']
-                }
-            }), 201
-            
-        except Exception as e:
-            logger.error(f'Error during user creation: {str(e)}')
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
-            
-    except Exception as e:
-        logger.error(f'Error during registration: {str(e)}')
-        return jsonify({'message': f'Error during registration: {str(e)}'}), 500
+    # Pooled SQLite connections in WAL mode; creates the schema on first start
+    db.init_app(app)
 
-@app.route('/api/auth/login', methods=['POST', 'OPTIONS'])
-def login():
-    if request.method == 'OPTIONS':
-        return '', 204
-        
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'message': 'No data provided'}), 400
-        
-        # Validate required fields
-        if not data.get('email') or not data.get('password'):
-            return jsonify({'message': 'Missing email or password'}), 400
-        
-        conn = get_db()
-        cur = conn.cursor()
-        
-        # Find user
-        cur.execute('SELECT * FROM users WHERE email = ?', (data['email'],))
-        user = cur.fetchone()
-        
-        if not user:
-            return jsonify({'message': 'Invalid email or password'}), 401
-        
-        if not check_password_hash(user['password_hash'], data['password']):
-            return jsonify({'message': 'Invalid email or password'}), 401
-        
-        # Generate token
-        token = generate_token(user)
-        return jsonify({
-            'message': 'Login successful',
-            'token': token,
-            'user': {
-                'name': user['name'],
-                'email': user['email'],
-                'role': user['role']
-            }
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'message': f'Error during login: {str(e)}'}), 500
-    finally:
-        if 'conn' in locals():
-            conn.close()
+    # Per-IP and per-user token buckets, checked before any view runs
+    rate_limit.init_app(app)
 
-@app.route('/api/auth/verify', methods=['GET', 'OPTIONS'])
-@token_required
-def verify_token(current_user):
-    if request.method == 'OPTIONS':
-        return '', 204
-        
-    return jsonify({
-        'message': 'Token is valid',
-        'user': {
-            'name': current_user['name'],
-            'email': current_user['email'],
-            'role': current_user['role']
-        }
-    }), 200
+    # Password hashing runs in a bounded process pool
+    hashing.init_app(app)
+    app.register_blueprint(auth_bp)
+    # The frontend updates the profile through /api/user/update
+    app.add_url_rule('/api/user/update', 'user_update', update_user, methods=['PUT', 'OPTIONS'])
+
+    # Duration model, loaded now or on first use (MODEL_PRELOAD); reloads swap it in place
+    model_registry.init_app(app)
+    prediction_cache.init_app(app)
+    # Opt-in: concurrent predictions scored together in small batches
+    micro_batcher.init_app(app)
+    # Per-worker and per-salon models, loaded on first use into a bounded pool
+    model_pool.init_app(app)
+    # Shadow model trained in the background from completed appointments
+    online_learning.init_app(app)
+    app.register_blueprint(predict_bp)
+    app.register_blueprint(admin_bp)
+
+    # Appointments table and the in-memory free-slot index
+    scheduling.init_app(app)
+    # Booking emails: queued in SQLite, sent in batches by a background thread
+    outbox.init_app(app)
+    app.register_blueprint(appointments_bp)
+
+    # Rollups behind the owner dashboard, updated as appointments complete
+    analytics.init_app(app)
+    app.register_blueprint(analytics_bp)
+
+    # Staff/user search for the owner dashboard: keyset pages, trigram index
+    users.init_app(app)
+    app.register_blueprint(users_bp)
+    return app
+
+
+def warm_up(app):
+    # Run before a pre-forking server forks its workers: everything loaded here
+    # is shared copy-on-write instead of being loaded again in every worker.
+    registry = app.extensions['model_registry']
+    model = registry.current()
+    model.predictor.predict_one({})
+    with app.app_context():
+        scheduling.get_schedule().ensure_loaded(db.get_db())
+    # The connection went back to the pool; SQLite handles must not cross fork()
+    app.extensions['db_pool'].close_all()
+
+
+def after_fork(app):
+    # Threads do not survive fork(); restart the ones create_app() started.
+    # Pooled connections opened in the master are dropped, not reused.
+    app.extensions['db_pool'].close_all()
+    configure_logging(app)
+    for name in ('online_learner', 'micro_batcher', 'outbox_sender'):
+        if app.extensions.get(name) is not None:
+            app.extensions[name].start()
+    registry = app.extensions['model_registry']
+    if app.config.get('MODEL_WATCH_INTERVAL'):
+        registry.stop()
+        registry.watch(app.config['MODEL_WATCH_INTERVAL'])
+
+
+def __getattr__(name):
+    # Keeps `from app import app` working (tests, benchmarks) without building
+    # an application on a plain `import app`.
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
-@app.route('/api/predict-time', methods=['POST'])
-def predict_time():
-    data = request.json
-    features = ['length', 'colors', 'decorations', 'technique', 'service_type', 'complexity']
-    sample = pd.DataFrame([{f: data.get(f, 0) for f in features}])
-    predicted_time = model.predict(sample)[0]
-    return jsonify({'predicted_time': round(float(predicted_time), 2)})
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    create_app().run(debug=True)
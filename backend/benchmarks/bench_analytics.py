@@ -0,0 +1,104 @@
+# Owner dashboard queries over a year of synthetic completed appointments:
+# reading the precomputed rollups versus aggregating the raw appointments table.
+# Usage (from backend/): python benchmarks/bench_analytics.py [per_day] [queries]
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from analytics import apply_completion, init_schema as init_rollups, read_dashboard, rebuild, series_range
+from scheduling import format_time, init_schema
+
+YEAR_START = datetime(2030, 1, 1, 9, 0)
+SERVICES = (('Маникюр', 30), ('Гел лак', 45), ('Ноктопластика', 80), ('Педикюр', 50), ('Nail art', 60))
+
+
+def populate(conn, per_day, rnd):
+    conn.executemany("INSERT INTO users (name, email, password_hash, role) VALUES (?, ?, 'x', 'worker')",
+                     [(f'Worker {i}', f'w{i}@example.com') for i in range(10)])
+    rows = []
+    for day in range(365):
+        for _ in range(per_day):
+            service, price = rnd.choice(SERVICES)
+            start = YEAR_START + timedelta(days=day, minutes=15 * rnd.randrange(40))
+            minutes = rnd.randint(30, 150)
+            rows.append((rnd.randint(1, 10), service, format_time(start),
+                         format_time(start + timedelta(minutes=minutes)), minutes, minutes, price))
+    conn.executemany(
+        "INSERT INTO appointments (worker_id, service, start_at, end_at, status, predicted_time, actual_time, price) "
+        "VALUES (?, ?, ?, ?, 'completed', ?, ?, ?)", rows)
+    conn.commit()
+    return len(rows)
+
+
+def raw_dashboard(conn, view, anchor):
+    # Same result as read_dashboard(), computed from the appointments table
+    granularity, first, last, _ = series_range(view, anchor)
+    bucket = "date(start_at)" if granularity == 'day' else "strftime('%Y-%m-01', start_at)"
+    end = f'{last.year}-12-31' if granularity == 'month' else last.isoformat()
+    params = (first.isoformat() + ' 00:00', end + ' 23:59')
+    rows = conn.execute(f'''
+        SELECT {bucket} AS period_start, COUNT(*) AS appointments, SUM(price) AS revenue,
+               SUM(COALESCE(actual_time, predicted_time, 0)) AS minutes
+        FROM appointments WHERE status = 'completed' AND start_at BETWEEN ? AND ?
+        GROUP BY 1 ORDER BY 1
+    ''', params).fetchall()
+    services = conn.execute('''
+        SELECT service, COUNT(*) AS appointments, SUM(price) AS revenue FROM appointments
+        WHERE status = 'completed' AND start_at BETWEEN ? AND ?
+        GROUP BY service ORDER BY appointments DESC
+    ''', params).fetchall()
+    return rows, services
+
+
+def time_queries(fn, conn, queries):
+    start = time.perf_counter()
+    for view, anchor in queries:
+        fn(conn, view, anchor)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main(per_day, queries):
+    rnd = random.Random(0)
+    pool = db.ConnectionPool(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    conn = pool.connect()
+    db.init_db(conn)
+    init_schema(conn)
+    init_rollups(conn)
+    count = populate(conn, per_day, rnd)
+    start = time.perf_counter()
+    rebuild(conn)
+    print(f'{count} completed appointments, rollups rebuilt in {time.perf_counter() - start:.2f} s')
+
+    anchor = date(2030, 7, 15)
+    for view in ('week', 'month', 'year'):
+        fast, slow = read_dashboard(conn, view, anchor), raw_dashboard(conn, view, anchor)
+        assert [s['appointments'] for s in fast['series']] == [r['appointments'] for r in slow[0]], view
+        assert {s['name']: s['appointments'] for s in fast['services']} == \
+               {r['service']: r['appointments'] for r in slow[1]}, view
+
+    print(f'{"view":<6} {"rollups":>12} {"raw":>12}')
+    for view in ('week', 'month', 'year'):
+        batch = [(view, date(2030, 1, 1) + timedelta(days=rnd.randrange(365))) for _ in range(queries)]
+        fast = time_queries(read_dashboard, conn, batch)
+        slow = time_queries(raw_dashboard, conn, batch)
+        print(f'{view:<6} {fast:>9.1f} us {slow:>9.1f} us  ({slow / fast:.0f}x)')
+
+    # Write-side cost: the six upserts added to each completion
+    row = {'start_at': '2030-06-01 10:00', 'service': 'Маникюр', 'actual_time': 45, 'predicted_time': 40, 'price': 30}
+    start = time.perf_counter()
+    for _ in range(queries):
+        conn.execute('BEGIN')
+        apply_completion(conn, row)
+        conn.commit()
+    print(f'apply_completion + commit: {(time.perf_counter() - start) / queries * 1e6:.1f} us')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [40, 200][len(args):]))
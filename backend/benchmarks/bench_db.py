@@ -0,0 +1,59 @@
+# Concurrent register + login throughput with a fresh connection per request in
+# rollback-journal mode (the old get_db) versus the pooled WAL connection layer.
+# Password hashing is made cheap by default so the numbers reflect database
+# cost; pass --real-hash to keep the production hash.
+# Usage (from backend/): python benchmarks/bench_db.py [users] [threads] [--real-hash]
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TMP = tempfile.mkdtemp()
+os.environ['NAILTIME_DB'] = os.path.join(TMP, 'warmup.db')
+
+
+def run(app, users, threads, tag):
+    def worker(i):
+        client = app.test_client()
+        email = f'{tag}{i}@example.com'
+        r = client.post('/api/auth/register', json={'name': f'User {i}', 'email': email, 'password': 'secret', 'role': 'client'})
+        ok = r.status_code == 201
+        r = client.post('/api/auth/login', json={'email': email, 'password': 'secret'})
+        return ok and r.status_code == 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(worker, range(users)))
+    return users * 2 / (time.perf_counter() - start), results.count(False)
+
+
+def main(users, threads, real_hash):
+    from app import create_app
+    import db
+    from hashing import HashingService
+    app = create_app({'RATE_LIMIT_ENABLED': False})
+    logging.disable(logging.CRITICAL)
+    if not real_hash:
+        app.extensions['hashing'] = HashingService('pbkdf2:sha256:1', workers=0)
+
+    setups = [
+        ('connect per request, rollback journal', 0, (('journal_mode', 'DELETE'),)),
+        ('pooled, WAL + tuned pragmas', 8, db.PRAGMAS),
+    ]
+    for name, size, pragmas in setups:
+        pool = db.ConnectionPool(os.path.join(TMP, f'pool{size}.db'), size, pragmas)
+        conn = pool.connect()
+        db.init_db(conn)
+        conn.close()
+        app.extensions['db_pool'] = pool
+        rps, failures = run(app, users, threads, f'u{size}_')
+        print(f'{name:<40} {rps:>8.0f} req/s  failures: {failures}')
+        pool.close_all()
+
+
+if __name__ == '__main__':
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    main(int(args[0]) if args else 2000, int(args[1]) if len(args) > 1 else 8, '--real-hash' in sys.argv)
@@ -0,0 +1,76 @@
+# Concurrent logins with password hashing inline on the request threads versus
+# the process pool. While the logins run, a separate thread measures
+# /api/predict-time latency to show how much login load slows other endpoints.
+# Usage (from backend/): python benchmarks/bench_hashing.py [logins] [threads] [pool workers]
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['NAILTIME_DB'] = os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+PREDICT = {'length': 30, 'colors': 2, 'decorations': 1, 'technique': 1, 'service_type': 1, 'complexity': 3}
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000 if samples else float('nan')
+
+
+def run(app, logins, threads):
+    done = threading.Event()
+    latencies = []
+
+    def probe():
+        client = app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.post('/api/predict-time', json=PREDICT)
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.002)
+
+    def login(_):
+        return app.test_client().post('/api/auth/login', json={
+            'email': 'bench@example.com', 'password': 'secret'
+        }).status_code
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        codes = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+    return logins / elapsed, codes, latencies
+
+
+def main(logins, threads, workers):
+    from app import create_app
+    from hashing import HashingService
+    app = create_app({'RATE_LIMIT_ENABLED': False})
+    logging.disable(logging.CRITICAL)
+
+    method = app.config['PASSWORD_HASH_METHOD']
+    app.extensions['hashing'] = HashingService(method, workers=0)
+    app.test_client().post('/api/auth/register', json={
+        'name': 'Bench', 'email': 'bench@example.com', 'password': 'secret', 'role': 'client'
+    })
+
+    print(f'{"mode":<14} {"logins/s":>9} {"503s":>5} {"predict p50 ms":>15} {"predict p99 ms":>15}')
+    for name, service in (('inline', HashingService(method, workers=0)),
+                          (f'pool x{workers}', HashingService(method, workers=workers, max_pending=threads))):
+        app.extensions['hashing'] = service
+        rate, codes, latencies = run(app, logins, threads)
+        print(f'{name:<14} {rate:>9.1f} {codes.count(503):>5} '
+              f'{percentile(latencies, 0.5):>15.2f} {percentile(latencies, 0.99):>15.2f}')
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [200, 16, os.cpu_count() or 2][len(args):]))
@@ -0,0 +1,63 @@
+# Register throughput with synchronous DEBUG logging (the old basicConfig setup)
+# versus the queue-based JSON pipeline at DEBUG and at INFO. Log output goes to
+# /dev/null; password hashing is made cheap so logging cost is visible.
+# Usage (from backend/): python benchmarks/bench_logging.py [registrations] [threads]
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['NAILTIME_DB'] = os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+
+def run(app, n, threads, tag):
+    def register(i):
+        return app.test_client().post('/api/auth/register', json={
+            'name': f'User {i}', 'email': f'{tag}{i}@example.com', 'password': 'secret', 'role': 'client'
+        }).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        codes = list(pool.map(register, range(n)))
+    assert codes.count(201) == n, 'registration failed'
+    return n / (time.perf_counter() - start)
+
+
+def synchronous_debug(app):
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+
+
+def main(n, threads):
+    from app import create_app
+    from hashing import HashingService
+    from logging_setup import configure_logging
+    app = create_app({'RATE_LIMIT_ENABLED': False})
+
+    sys.stderr = open(os.devnull, 'w')
+    app.extensions['hashing'] = HashingService('pbkdf2:sha256:1', workers=0)
+    modes = [
+        ('sync handler, DEBUG', synchronous_debug),
+        ('queue + JSON, DEBUG', lambda a: (a.config.update(LOG_LEVEL='DEBUG'), configure_logging(a))),
+        ('queue + JSON, INFO', lambda a: (a.config.update(LOG_LEVEL='INFO'), configure_logging(a))),
+    ]
+    results = []
+    for i, (name, setup) in enumerate(modes):
+        setup(app)
+        results.append((name, run(app, n, threads, f'm{i}_')))
+    sys.stderr = sys.__stderr__
+    for name, rps in results:
+        print(f'{name:<22} {rps:>8.0f} registrations/s')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [2000, 8][len(args):]))
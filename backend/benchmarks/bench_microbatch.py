@@ -0,0 +1,55 @@
+# Throughput and latency of /api/predict-time with and without micro-batching,
+# for several batching windows and client concurrency levels, in-process and
+# with both the compiled linear predictor and the sklearn pipeline. The
+# prediction cache is shrunk to one entry so every request reaches the model.
+# Usage (from backend/): python benchmarks/bench_microbatch.py [requests] [concurrency ...]
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('NAILTIME_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from loadtest import InProcess, Scenario, run
+
+WINDOWS_MS = [None, 0.5, 2.0, 5.0]
+MAX_BATCH = 32
+
+
+def main(requests, concurrency):
+    from app import create_app
+    from inference import PICKLE_PATH, SklearnPredictor, load_model
+    from micro_batcher import MicroBatcher
+    logging.disable(logging.CRITICAL)
+    app = create_app({'ONLINE_LEARNING': False, 'PREDICTION_CACHE_SIZE': 1, 'RATE_LIMIT_ENABLED': False})
+    registry = app.extensions['model_registry']
+    predictors = {
+        'compiled': registry.current().predictor,
+        'sklearn': SklearnPredictor(load_model(PICKLE_PATH)),
+    }
+    scenario = Scenario([], 5000, 0)
+
+    print(f'{"predictor":<10} {"window":>7} {"clients":>7} {"req/s":>9} {"p50 ms":>8} {"p95 ms":>8} '
+          f'{"p99 ms":>8} {"errors":>7} {"avg batch":>9}')
+    for name, predictor in predictors.items():
+        registry.install(predictor, name, PICKLE_PATH)
+        for window in WINDOWS_MS:
+            for clients in concurrency:
+                batcher = None
+                if window is not None:
+                    batcher = MicroBatcher(window / 1000, MAX_BATCH)
+                    batcher.start()
+                app.extensions['micro_batcher'] = batcher
+                stats = run(lambda: InProcess(app), scenario, {'predict': 1}, clients, requests, None, 0)['total']
+                if batcher is not None:
+                    batcher.stop()
+                label = 'off' if window is None else f'{window:g} ms'
+                print(f'{name:<10} {label:>7} {clients:>7} {stats["throughput"]:>9.0f} {stats["p50_ms"]:>8.2f} '
+                      f'{stats["p95_ms"]:>8.2f} {stats["p99_ms"]:>8.2f} {stats["error_rate"]:>7.2%} '
+                      f'{batcher.stats()["avg_batch"] if batcher else 1:>9.1f}')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(args[0] if args else 2000, args[1:] or [1, 8, 32])
@@ -0,0 +1,102 @@
+# Model loading: the joblib pickle versus the flat memory-mapped file, each in a
+# fresh interpreter (imports included), and memory use of forked workers that
+# read a large multi-model table from the flat file versus a private copy.
+# Linux only (reads /proc/self/smaps_rollup).
+# Usage (from backend/): python benchmarks/bench_model_load.py [models] [workers]
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from inference import FEATURES, MODEL_PATH, PICKLE_PATH, FlatModelFile, write_flat
+
+LOAD = '''
+import time, sys, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+from inference import load_predictor
+predictor = load_predictor(sys.argv[1])
+predictor.predict_one({})
+print(time.perf_counter() - start)
+'''
+
+
+def load_time(path, runs=5):
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = [float(subprocess.run([sys.executable, '-c', LOAD, path], cwd=backend, capture_output=True,
+                                    text=True, check=True).stdout.split()[-1]) for _ in range(runs)]
+    return statistics.median(samples)
+
+
+def memory_kb():
+    # Proportional set size of this process split into anonymous and file-backed
+    # pages; shared file pages are divided between the processes mapping them.
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields['Pss_Anon'], fields['Pss_File']
+
+
+def forked_workers(path, load, workers):
+    # Each child opens the file (header and name index), loads the table, reads
+    # every row and reports how much its memory grew at each step. The children overlap, so shared pages are split between them.
+    pipes = []
+    for _ in range(workers):
+        read, write = os.pipe()
+        if os.fork() == 0:
+            os.close(read)
+            before = memory_kb()
+            flat = FlatModelFile(path)
+            opened = memory_kb()
+            table = load(flat)
+            float(np.asarray(table).sum())
+            time.sleep(1.0)  # let the siblings map the file too before measuring
+            after = memory_kb()
+            os.write(write, ('%d %d %d' % (sum(opened) - sum(before), after[0] - opened[0],
+                                           after[1] - opened[1])).encode())
+            os._exit(0)
+        os.close(write)
+        pipes.append(read)
+    stats = []
+    for read in pipes:
+        stats.append(tuple(int(v) for v in os.read(read, 100).split()))
+        os.close(read)
+    for _ in pipes:
+        os.wait()
+    return stats
+
+
+def main(models, workers):
+    print(f'{"load in a fresh process":<28} {"ms":>8}')
+    print(f'{"pickle (joblib + sklearn)":<28} {load_time(PICKLE_PATH) * 1000:>8.1f}')
+    print(f'{"flat (np.memmap)":<28} {load_time(MODEL_PATH) * 1000:>8.1f}')
+
+    path = os.path.join(tempfile.mkdtemp(), 'models.bin')
+    table = np.random.default_rng(0).random((models, len(FEATURES) + 1))
+    write_flat(path, table, [f'worker-{i}' for i in range(models)])
+    size_mb = table.nbytes / 2 ** 20
+    del table
+    print(f'\n{models} models ({size_mb:.1f} MB table), {workers} forked workers, '
+          f'PSS growth per worker in MB:')
+    print(f'{"":<14} {"header":>8} {"table anon":>11} {"table file":>11}')
+    loaders = {
+        'memmap': lambda flat: flat.table,
+        'private copy': lambda flat: np.array(flat.table),
+    }
+    for name, load in loaders.items():
+        header, anon, file = (statistics.mean(column) / 1024 for column in zip(*forked_workers(path, load, workers)))
+        print(f'{name:<14} {header:>8.1f} {anon:>11.1f} {file:>11.1f}')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [500_000, 4][len(args):]))
@@ -0,0 +1,75 @@
+# Prediction latency as the number of personal models grows. Requests pick a
+# worker from a skewed distribution (a few busy technicians, a long tail), so
+# the LRU pool (MODEL_POOL_SIZE) holds the hot models while cold ones are
+# built from the memory-mapped file on demand.
+# Usage (from backend/): python benchmarks/bench_model_pool.py [requests] [pool_size]
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('NAILTIME_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import numpy as np
+
+from inference import FEATURES, write_flat
+
+COUNTS = (0, 10, 100, 1_000, 10_000, 100_000)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return tuple(samples[int(len(samples) * q)] * 1e6 for q in (0.5, 0.99))
+
+
+def workload(n, models, rnd):
+    # Pareto-distributed worker ids, some of them without a personal model
+    features = {f: rnd.randint(1, 5) for f in FEATURES}
+    return [dict(features, worker_id=min(int(rnd.paretovariate(1.2)), max(models, 1) * 2))
+            for _ in range(n)]
+
+
+def main(requests, pool_size):
+    from app import create_app
+    logging.disable(logging.CRITICAL)
+    rnd = random.Random(0)
+    directory = tempfile.mkdtemp()
+    print(f'{"models":>8} {"pool p50":>9} {"pool p99":>9} {"hit rate":>9} {"http p50":>9} {"http p99":>9}  (us)')
+    for count in COUNTS:
+        path = os.path.join(directory, f'personal-{count}.bin')
+        if count:
+            table = np.random.default_rng(count).normal(1.0, 0.2, (count, len(FEATURES) + 1))
+            write_flat(path, table, [f'worker:{i}' for i in range(1, count + 1)])
+        app = create_app({'PERSONAL_MODELS_PATH': path, 'MODEL_POOL_SIZE': pool_size,
+                          'RATE_LIMIT_ENABLED': False})
+        pool = app.extensions['model_pool']
+        cache = app.extensions['prediction_cache']
+        registry = app.extensions['model_registry']
+        payloads = workload(requests, count, rnd)
+
+        timings = []
+        with app.app_context():
+            for data in payloads:
+                start = time.perf_counter()
+                model = pool.resolve(data['worker_id']) or registry.current()
+                cache.predict(model, data)
+                timings.append(time.perf_counter() - start)
+        pool_p50, pool_p99 = percentiles(timings)
+        hit_rate = pool.stats()['hit_rate']
+
+        client = app.test_client()
+        timings = []
+        for data in payloads[:requests // 4]:
+            start = time.perf_counter()
+            client.post('/api/predict-time', json=data)
+            timings.append(time.perf_counter() - start)
+        http_p50, http_p99 = percentiles(timings)
+        print(f'{count:>8} {pool_p50:>9.1f} {pool_p99:>9.1f} {hit_rate:>9.2f} {http_p50:>9.1f} {http_p99:>9.1f}')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [20_000, 1024][len(args):]))
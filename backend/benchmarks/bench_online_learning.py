@@ -0,0 +1,118 @@
+# Overhead of the online learner: cost of submit() on the request path, CPU
+# and memory per background update, the PUT /status latency with learning on
+# and off, and how quickly the shadow model catches up with a drifted technician.
+# Usage (from backend/): python benchmarks/bench_online_learning.py [samples]
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('NAILTIME_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from inference import FEATURES
+
+
+def drifted_samples(predictor, n, rnd, slowdown=1.3, noise=3.0):
+    # Appointments that take `slowdown` times what the live model predicts
+    samples = []
+    for _ in range(n):
+        features = {f: rnd.randint(1, 5) for f in FEATURES}
+        samples.append((features, predictor.predict_one(features) * slowdown + rnd.gauss(0, noise)))
+    return samples
+
+
+def status_latency(app, completions):
+    from hashing import HashingService
+    app.extensions['hashing'] = HashingService('pbkdf2:sha256:1', workers=0)
+    client = app.test_client()
+    email = f'owner{time.time_ns()}@example.com'
+    client.post('/api/auth/register', json={'name': 'Owner', 'email': email, 'password': 'secret', 'role': 'owner'})
+    headers = {'Authorization': 'Bearer ' + client.post('/api/auth/login', json={
+        'email': email, 'password': 'secret'}).get_json()['token']}
+    wemail = f'worker{time.time_ns()}@example.com'
+    client.post('/api/auth/register', json={'name': 'Worker', 'email': wemail, 'password': 'secret', 'role': 'worker'})
+    with app.app_context():
+        from db import get_db
+        worker_id = get_db().execute('SELECT id FROM users WHERE email = ?', (wemail,)).fetchone()[0]
+    timings = []
+    for i in range(completions):
+        day, slot = divmod(i, 8)
+        data = {f: 2 for f in FEATURES}
+        data.update(worker_id=worker_id, service='Гел лак', duration=60,
+                    start=f'2031-{1 + day // 28:02d}-{1 + day % 28:02d} {9 + slot:02d}:00')
+        appointment = client.post('/api/appointments', json=data, headers=headers).get_json()['appointment']
+        start = time.perf_counter()
+        client.put(f'/api/appointments/{appointment["id"]}/status',
+                   json={'status': 'completed', 'actual_time': 55}, headers=headers)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6, sorted(timings)[int(len(timings) * 0.99)] * 1e6
+
+
+def main(samples):
+    from app import create_app
+    from online_learning import OnlineLearner
+    logging.disable(logging.CRITICAL)
+    rnd = random.Random(0)
+    directory = tempfile.mkdtemp()
+    app = create_app({'ONLINE_LEARNING': False})
+    registry = app.extensions['model_registry']
+    data = drifted_samples(registry.current().predictor, samples, rnd)
+
+    # Request path: enqueue only
+    learner = OnlineLearner(registry, snapshot_path=None)
+    start = time.perf_counter()
+    for features, actual in data:
+        learner.submit(features, actual)
+    submit_ns = (time.perf_counter() - start) / samples * 1e9
+
+    # Background side: drain the queue on a thread and measure its CPU time
+    tracemalloc.start()
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    learner.start()
+    learner._queue.join()
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    memory_kb = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    stats = learner.stats()
+    learner.stop(snapshot=False)
+    print(f'submit() on the request path   {submit_ns:>8.0f} ns')
+    print(f'update in the background       {stats["avg_update_us"]:>8.1f} us  '
+          f'({cpu / samples * 1e6:.1f} us CPU, {samples / wall:,.0f} updates/s)')
+    print(f'peak traced memory             {memory_kb:>8.0f} kB  (window {learner.live_errors.values.maxlen})')
+
+    # Drift: how many completions until the shadow is promoted, without the
+    # holdout cap and with the default one (which the drifted model fails)
+    for ratio in (None, 1.5):
+        registry.reload(force=True)
+        learner = OnlineLearner(registry, snapshot_path=os.path.join(directory, f'online-{ratio}.bin'), auto_promote=True,
+                                max_holdout_ratio=ratio)
+        promoted_at = None
+        for i, (features, actual) in enumerate(data, 1):
+            learner.learn(features, actual)
+            if learner.promotions and promoted_at is None:
+                promoted_at = i
+        live, shadow = learner.rolling_mse()
+        cap = 'no holdout cap' if ratio is None else f'holdout cap {ratio:g}x'
+        outcome = f'promoted after {promoted_at} completions' if promoted_at else 'never promoted'
+        print(f'\n30% slower technician, {cap}: {outcome}, {learner.promotions} promotion(s); '
+              f'rolling MSE live {live if live is None else round(live, 1)}, '
+              f'shadow {shadow if shadow is None else round(shadow, 1)}')
+
+    print(f'\n{"PUT /status":<16} {"p50 us":>8} {"p99 us":>8}')
+    for enabled in (False, True):
+        app = create_app({'ONLINE_LEARNING': enabled, 'DATABASE': os.path.join(directory, f'status-{enabled}.db'),
+                          'ONLINE_SNAPSHOT_PATH': os.path.join(directory, f'status-{enabled}.bin')})
+        p50, p99 = status_latency(app, min(samples, 400))
+        print(f'{"learning " + ("on" if enabled else "off"):<16} {p50:>8.0f} {p99:>8.0f}')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [5000][len(args):]))
@@ -0,0 +1,186 @@
+# Email outbox: what a booking pays on the request path (queueing the
+# confirmation and reminder versus sending the confirmation inline), and how
+# fast the background sender drains the outbox into a local SMTP server for
+# several batch sizes, reusing one connection versus one per message.
+# Uses aiosmtpd as the SMTP stand-in when installed, otherwise a minimal
+# SMTP sink built on socketserver. --latency adds a delay to every SMTP reply
+# to approximate a remote server.
+# Usage (from backend/): python benchmarks/bench_outbox.py [--messages N] [--latency MS]
+import argparse
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import outbox
+import scheduling
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    # Just enough SMTP for smtplib: EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 sink ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b'EHLO':
+                self.wfile.write(b'250-sink\r\n')
+                self.reply('250 8BITMIME')
+            elif command == b'DATA':
+                self.reply('354 end with .')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.server.received += 1
+                self.reply('250 queued')
+            elif command == b'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency):
+        super().__init__(('127.0.0.1', 0), SinkHandler)
+        self.latency = latency
+        self.received = 0
+
+
+def start_smtp(latency):
+    # Returns (port, received-count callable, stop callable)
+    if not latency:
+        try:
+            from aiosmtpd.controller import Controller
+        except ImportError:
+            pass
+        else:
+            class Counter:
+                received = 0
+
+                async def handle_DATA(self, server, session, envelope):
+                    self.received += 1
+                    return '250 OK'
+            handler = Counter()
+            controller = Controller(handler, hostname='127.0.0.1', port=0)
+            controller.start()
+            return controller.server.sockets[0].getsockname()[1], lambda: handler.received, controller.stop
+    server = SinkServer(latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1], lambda: server.received, server.shutdown
+
+
+class ConnectionPerMessage(outbox.SMTPConnection):
+    # The naive sender: connect, send, quit for every message
+    def send(self, message):
+        super().send(message)
+        self.close()
+
+
+def setup(path, messages):
+    pool = db.ConnectionPool(path, size=0)
+    conn = pool.connect()
+    db.init_db(conn)
+    scheduling.init_schema(conn)
+    outbox.init_schema(conn)
+    conn.execute("INSERT INTO users (name, email, password_hash, role) VALUES ('Мария', 'maria@example.com', 'x', 'client')")
+    conn.execute("INSERT INTO users (name, email, password_hash, role) VALUES ('Ива', 'iva@example.com', 'x', 'worker')")
+    conn.commit()
+    return pool, conn
+
+
+def fill(conn, messages):
+    conn.execute('DELETE FROM email_outbox')
+    now = time.time()
+    conn.executemany('INSERT INTO email_outbox (kind, recipient, subject, body, send_at) VALUES (?, ?, ?, ?, ?)',
+                     [('message', f'client{i}@example.com', 'Потвърждение', 'Здравейте!', now)
+                      for i in range(messages)])
+    conn.commit()
+
+
+def request_path(pool, conn, port, bookings):
+    # Booking insert + queue_booking in one transaction, versus booking insert
+    # and sending the confirmation over a fresh SMTP connection inline
+    schedule = scheduling.Schedule(9 * 60, 19 * 60, 15)
+    schedule.load(conn)
+    start = datetime.now() + timedelta(days=3)
+    start = start.replace(hour=9, minute=0, second=0, microsecond=0)
+    queued = []
+    inline = []
+    for i in range(bookings):
+        day, slot = divmod(i, 20)
+        begin = start + timedelta(days=day * 2, minutes=slot * 30)
+        fields = {'client_id': 1, 'service': 'Гел лак'}
+        t = time.perf_counter()
+        scheduling.book(conn, schedule, 2, begin, begin + timedelta(minutes=15), fields,
+                        lambda conn, appointment_id: outbox.queue_booking(conn, appointment_id, begin, 'Гел лак'))
+        queued.append(time.perf_counter() - t)
+
+        begin += timedelta(minutes=15)
+        t = time.perf_counter()
+        scheduling.book(conn, schedule, 2, begin, begin + timedelta(minutes=15), fields)
+        connection = outbox.SMTPConnection('127.0.0.1', port)
+        message = EmailMessage()
+        message['From'], message['To'], message['Subject'] = 'salon@example.com', 'maria@example.com', 'Потвърждение'
+        message.set_content('Здравейте!')
+        connection.send(message)
+        connection.close()
+        inline.append(time.perf_counter() - t)
+    queued.sort()
+    inline.sort()
+    return queued, inline
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--bookings', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.0, help='ms added to every SMTP reply')
+    args = parser.parse_args(argv)
+
+    port, received, stop = start_smtp(args.latency / 1000)
+    pool, conn = setup(os.path.join(tempfile.mkdtemp(), 'outbox.db'), args.messages)
+
+    queued, inline = request_path(pool, conn, port, args.bookings)
+    p = lambda values, q: values[int(q * (len(values) - 1))] * 1000
+    print(f'{"booking request path":<34} {"p50 ms":>8} {"p99 ms":>8}')
+    print(f'{"book + queue confirmation/reminder":<34} {p(queued, 0.5):>8.3f} {p(queued, 0.99):>8.3f}')
+    print(f'{"book + send confirmation inline":<34} {p(inline, 0.5):>8.3f} {p(inline, 0.99):>8.3f}')
+    queued_rows = conn.execute("SELECT COUNT(*) FROM email_outbox").fetchone()[0]
+    print(f'({queued_rows} outbox rows queued for {args.bookings} bookings)')
+
+    print(f'\n{"sender":<22} {"batch":>6} {"messages/s":>11} {"connects":>9}')
+    for label, connection_class, batch_sizes in (('one connection/message', ConnectionPerMessage, (50,)),
+                                                 ('reused connection', outbox.SMTPConnection, (1, 10, 50, 200))):
+        for batch in batch_sizes:
+            fill(conn, args.messages)
+            connection = connection_class('127.0.0.1', port)
+            sender = outbox.OutboxSender(pool, connection, 'salon@example.com', batch_size=batch)
+            before = received()
+            start = time.perf_counter()
+            sent = sender.drain()
+            seconds = time.perf_counter() - start
+            connection.close()
+            assert sent == args.messages and received() - before == args.messages, (sent, received() - before)
+            print(f'{label:<22} {batch:>6} {sent / seconds:>11,.0f} {connection.connects:>9}')
+    stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# Compares N calls to /api/predict-time against one /api/predict-time/batch call.
+# Usage (from backend/): python benchmarks/bench_predict_batch.py [N ...]
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def random_rows(n, seed=0):
+    rnd = random.Random(seed)
+    return [{
+        'length': rnd.randint(15, 60),
+        'colors': rnd.randint(0, 5),
+        'decorations': rnd.randint(0, 3),
+        'technique': rnd.randint(0, 2),
+        'service_type': rnd.randint(0, 2),
+        'complexity': rnd.randint(1, 5),
+    } for _ in range(n)]
+
+
+def main(sizes):
+    from app import create_app
+    app = create_app({'RATE_LIMIT_ENABLED': False})
+    client = app.test_client()
+    print(f'{"N":>6} {"single (ms)":>12} {"batch (ms)":>12} {"speedup":>8}')
+    for n in sizes:
+        rows = random_rows(n)
+
+        start = time.perf_counter()
+        single = [client.post('/api/predict-time', json=row).get_json()['predicted_time'] for row in rows]
+        single_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        batch = client.post('/api/predict-time/batch', json=rows).get_json()['predicted_times']
+        batch_ms = (time.perf_counter() - start) * 1000
+
+        assert all(abs(a - b) < 0.011 for a, b in zip(single, batch)), 'batch and single results differ'
+        print(f'{n:>6} {single_ms:>12.1f} {batch_ms:>12.1f} {single_ms / batch_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [10, 100, 500])
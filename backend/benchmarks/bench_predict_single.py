@@ -0,0 +1,48 @@
+# Per-call latency of the old pandas + model.predict path versus the compiled predictor.
+# Usage (from backend/): python benchmarks/bench_predict_single.py [iterations]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from bench_predict_batch import random_rows
+from inference import FEATURES, compile_model, load_model
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return pick(0.50) * 1e6, pick(0.99) * 1e6
+
+
+def measure(fn, rows):
+    samples = []
+    for row in rows:
+        start = time.perf_counter()
+        fn(row)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def main(iterations):
+    model = load_model()
+    predictor = compile_model(model)
+    rows = random_rows(iterations)
+
+    def sklearn_path(data):
+        sample = pd.DataFrame([{f: data.get(f, 0) for f in FEATURES}])
+        return model.predict(sample)[0]
+
+    sklearn_path(rows[0])
+    predictor.predict_one(rows[0])
+    print(f'{"path":<12} {"p50 (us)":>10} {"p99 (us)":>10}')
+    for name, fn in (('sklearn', sklearn_path), ('compiled', predictor.predict_one)):
+        p50, p99 = measure(fn, rows)
+        print(f'{name:<12} {p50:>10.2f} {p99:>10.2f}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
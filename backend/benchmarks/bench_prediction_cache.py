@@ -0,0 +1,58 @@
+# Prediction cache hit rate and per-call latency on a skewed request mix
+# (a few hundred distinct feature combinations), with and without the cache,
+# and the cost of precomputing the full grid. The compiled predictor bypasses
+# the cache, so its "cached" column shows the bypass overhead.
+# Usage (from backend/): python benchmarks/bench_prediction_cache.py [requests] [distinct]
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_predict_batch import random_rows
+from inference import SklearnPredictor, load_model
+from model_registry import ModelRegistry, ModelVersion
+from prediction_cache import PredictionCache
+
+
+def measure(model, traffic):
+    start = time.perf_counter()
+    for row in traffic:
+        model.predictor.predict_one(row)
+    direct_us = (time.perf_counter() - start) / len(traffic) * 1e6
+
+    cache = PredictionCache(maxsize=1024)
+    start = time.perf_counter()
+    for row in traffic:
+        cache.predict(model, row)
+    cached_us = (time.perf_counter() - start) / len(traffic) * 1e6
+    return direct_us, cached_us, cache.stats()
+
+
+def main(requests, distinct):
+    compiled = ModelRegistry().reload()
+    fallback = ModelVersion(SklearnPredictor(load_model()), compiled.version, compiled.path, compiled.holdout_mse)
+
+    combos = random_rows(distinct, seed=1)
+    rnd = random.Random(2)
+    # Zipf-like skew: popular combinations dominate traffic
+    weights = [1 / (i + 1) for i in range(distinct)]
+    traffic = rnd.choices(combos, weights, k=requests)
+
+    # sklearn is ~1000x slower per call, so it gets a shorter run
+    for name, model, n in (('compiled', compiled, requests), ('sklearn', fallback, requests // 20)):
+        direct_us, cached_us, stats = measure(model, traffic[:n])
+        print(f'{name:<9} direct {direct_us:>9.2f} us/call, cached {cached_us:>8.2f} us/call, '
+              f'hit rate {stats["hit_rate"]:.1%}, avg hit {stats["avg_hit_us"]:.2f} us, '
+              f'avg miss {stats["avg_miss_us"]:.2f} us')
+
+    grid = PredictionCache(maxsize=100_000)
+    start = time.perf_counter()
+    n = grid.warm(fallback)
+    print(f'precomputed {n} grid entries in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [100_000, 300][len(args):]))
@@ -0,0 +1,99 @@
+# Rate limiter overhead: one bucket check per backend, the full per-request
+# check (key extraction included) and /api/predict-time through the test
+# client with the limiter off and on. Also checks that forked workers share
+# one allowance with the shared-memory and SQLite backends.
+# Usage (from backend/): python benchmarks/bench_rate_limit.py [iterations] [workers]
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('NAILTIME_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from rate_limit import MemoryBackend, RateLimiter, SharedMemoryBackend, SQLiteBackend
+
+PREDICT = {'length': 30, 'colors': 2, 'decorations': 1, 'technique': 1, 'service_type': 1, 'complexity': 3}
+# High enough that nothing is limited while measuring overhead
+UNLIMITED = 'ip:1000000000/second'
+
+
+def backends(directory):
+    return {
+        'memory': MemoryBackend(),
+        'shared': SharedMemoryBackend(),
+        'sqlite': SQLiteBackend(os.path.join(directory, 'limits.db')),
+    }
+
+
+def per_call_us(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def shared_allowance(backend, workers, attempts, burst):
+    # Each forked worker tries `attempts` times on one key; returns how many got through in total
+    pipes = []
+    for _ in range(workers):
+        read, write = os.pipe()
+        if os.fork() == 0:
+            os.close(read)
+            allowed = sum(1 for _ in range(attempts) if not backend.take('shared-key', 1e-9, burst))
+            os.write(write, str(allowed).encode())
+            os._exit(0)
+        os.close(write)
+        pipes.append(read)
+    total = 0
+    for read in pipes:
+        total += int(os.read(read, 32))
+        os.close(read)
+    for _ in pipes:
+        os.wait()
+    return total
+
+
+def main(number, workers):
+    from app import create_app
+    logging.disable(logging.CRITICAL)
+    directory = tempfile.mkdtemp()
+
+    print(f'{"backend":<8} {"take() hot key":>15} {"take() 10k keys":>16} {"check() in request":>19}  (us)')
+    app = create_app({'ONLINE_LEARNING': False, 'RATE_LIMIT_ENABLED': False})
+    keys = [f'predict.predict_time|ip:10.0.{i // 256}.{i % 256}' for i in range(10_000)]
+    for name, backend in backends(directory).items():
+        iterations = number if name != 'sqlite' else max(1, number // 20)
+        hot = per_call_us(lambda: backend.take('predict.predict_time|ip:127.0.0.1', 1e9, 1e9), iterations)
+        cycle = iter(keys * (iterations * 5 // len(keys) + 1))
+        spread = per_call_us(lambda: backend.take(next(cycle), 1e9, 1e9), iterations)
+        limiter = RateLimiter(backend, {'predict.predict_time': UNLIMITED})
+        with app.test_request_context('/api/predict-time', method='POST', json=PREDICT,
+                                      environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+            check = per_call_us(lambda: limiter.check('predict.predict_time'), iterations)
+        print(f'{name:<8} {hot:>15.2f} {spread:>16.2f} {check:>19.2f}')
+
+    print(f'\n{"/api/predict-time":<18} {"median us":>10}')
+    for label, config in (('limiter off', {'RATE_LIMIT_ENABLED': False}),
+                          ('memory', {'RATE_LIMIT_BACKEND': 'memory'}),
+                          ('shared', {'RATE_LIMIT_BACKEND': 'shared'}),
+                          ('sqlite', {'RATE_LIMIT_BACKEND': 'sqlite',
+                                      'RATE_LIMIT_DATABASE': os.path.join(directory, 'app-limits.db')})):
+        app = create_app(dict(config, ONLINE_LEARNING=False, RATE_LIMITS={'predict.predict_time': UNLIMITED}))
+        client = app.test_client()
+        samples = []
+        for _ in range(max(1, number // 20)):
+            start = time.perf_counter()
+            client.post('/api/predict-time', json=PREDICT)
+            samples.append(time.perf_counter() - start)
+        print(f'{label:<18} {statistics.median(samples) * 1e6:>10.1f}')
+
+    burst = 50
+    print(f'\n{workers} forked workers x 100 attempts on one key with a burst of {burst}:')
+    for name, backend in backends(directory).items():
+        print(f'  {name:<8} {shared_allowance(backend, workers, 100, burst):>4} allowed')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [100_000, 4][len(args):]))
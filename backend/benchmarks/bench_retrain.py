@@ -0,0 +1,96 @@
+# End-to-end retrain as an automated job runs it: a fresh interpreter running
+# ML/train_ml.py headless on a CSV, writing the loss log and the flat model
+# file. Also reports how long `import train_ml` takes and what importing
+# matplotlib.pyplot would add to it.
+# Usage (from backend/): python benchmarks/bench_retrain.py [--rows N ...] [--runs N] [--save FILE] [--baseline FILE]
+# With --baseline, exits 1 when any stage is more than --tolerance slower.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ML = os.path.join(BACKEND, 'ML')
+sys.path.insert(0, ML)
+
+import numpy as np
+
+from bench_train import synthetic
+from train_ml import FEATURES, TARGET
+
+IMPORT = '''
+import time, sys
+start = time.perf_counter()
+exec(sys.argv[1])
+print(time.perf_counter() - start)
+'''
+
+
+def import_time(code):
+    out = subprocess.run([sys.executable, '-c', IMPORT, code], cwd=ML, capture_output=True, text=True, check=True)
+    return float(out.stdout.split()[-1])
+
+
+def retrain_time(csv, directory, solver):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, 'train_ml.py', '--csv', csv, '--solver', solver, '--seed', '0',
+                    '--loss-log', os.path.join(directory, 'losses.jsonl'),
+                    '--out', os.path.join(directory, 'model.bin')],
+                   cwd=ML, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def write_csv(path, rows):
+    X, y = synthetic(rows)
+    np.savetxt(path, np.column_stack([X, y]), delimiter=',', fmt='%.4f',
+               header=','.join(FEATURES + [TARGET]), comments='')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='*', default=[10_000, 500_000])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--save')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp()
+    results = {
+        'import train_ml': statistics.median(import_time('import train_ml') for _ in range(args.runs)),
+        'import matplotlib.pyplot': statistics.median(
+            import_time('import matplotlib.pyplot') for _ in range(args.runs)),
+    }
+    csvs = [('nail_time.csv', os.path.join(ML, 'nail_time.csv'))]
+    for rows in args.rows:
+        path = os.path.join(directory, f'{rows}.csv')
+        write_csv(path, rows)
+        csvs.append((f'{rows} rows', path))
+    for label, path in csvs:
+        for solver in ('batch', 'lstsq'):
+            samples = [retrain_time(path, directory, solver) for _ in range(args.runs)]
+            results[f'retrain {label} ({solver})'] = statistics.median(samples)
+
+    for name, seconds in results.items():
+        print(f'{name:<36} {seconds * 1000:>9.1f} ms  (median of {args.runs})')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        slower = {name: (results[name], base) for name, base in baseline.items()
+                  if name in results and results[name] > base * (1 + args.tolerance)}
+        for name, (now, base) in slower.items():
+            print(f'REGRESSION {name}: {now * 1000:.1f} ms vs baseline {base * 1000:.1f} ms')
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
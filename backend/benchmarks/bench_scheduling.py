@@ -0,0 +1,95 @@
+# First-free-slot search over a month of synthetic bookings: the in-memory
+# per-worker/per-day index versus scanning the week's rows from SQLite.
+# Usage (from backend/): python benchmarks/bench_scheduling.py [workers] [queries]
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from scheduling import Schedule, book, format_time, init_schema, parse_time
+
+MONTH_START = datetime(2030, 3, 1)
+DURATIONS = (30, 45, 60, 75, 90, 120)
+
+
+def populate(conn, schedule, workers, rnd):
+    conn.executemany("INSERT INTO users (name, email, password_hash, role) VALUES (?, ?, 'x', 'worker')",
+                     [(f'Worker {i}', f'w{i}@example.com') for i in range(workers)])
+    conn.commit()
+    schedule.load(conn, since=MONTH_START)
+    booked = 0
+    start = time.perf_counter()
+    for worker_id in schedule.workers:
+        for day in range(30):
+            minute = schedule.open_minute + rnd.choice((0, 15, 30))
+            while True:
+                duration = rnd.choice(DURATIONS)
+                if minute + duration > schedule.close_minute:
+                    break
+                slot = MONTH_START + timedelta(days=day, minutes=minute)
+                book(conn, schedule, worker_id, slot, slot + timedelta(minutes=duration),
+                     {'service': 'Гел лак', 'price': 40})
+                booked += 1
+                minute += duration + rnd.choice((0, 0, 15, 30, 60))
+    return booked, time.perf_counter() - start
+
+
+def scan_first_free(conn, schedule, duration, start, days=7):
+    # What the dashboard would do without the index: fetch the rows, walk the gaps.
+    rows = conn.execute(
+        "SELECT worker_id, start_at, end_at FROM appointments WHERE status != 'cancelled' "
+        "AND start_at >= ? AND start_at < ? ORDER BY start_at",
+        (format_time(start.replace(hour=0, minute=0)), format_time(start + timedelta(days=days)))).fetchall()
+    busy = {}
+    for worker_id, start_at, end_at in rows:
+        s, e = parse_time(start_at), parse_time(end_at)
+        busy.setdefault((worker_id, s.date()), []).append((s.hour * 60 + s.minute, e.hour * 60 + e.minute))
+    for offset in range(days):
+        day = start.date() + timedelta(days=offset)
+        not_before = max(schedule.open_minute, start.hour * 60 + start.minute if offset == 0 else 0)
+        best = None
+        for worker_id in schedule.workers:
+            cursor = -(-not_before // schedule.step) * schedule.step
+            for s, e in busy.get((worker_id, day), ()):
+                if s >= cursor + duration:
+                    break
+                cursor = max(cursor, -(-e // schedule.step) * schedule.step)
+            if cursor + duration <= schedule.close_minute and (best is None or cursor < best[0]):
+                best = (cursor, worker_id)
+        if best:
+            return datetime.combine(day, datetime.min.time()) + timedelta(minutes=best[0]), best[1]
+    return None
+
+
+def main(workers, queries):
+    rnd = random.Random(0)
+    pool = db.ConnectionPool(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    conn = pool.connect()
+    db.init_db(conn)
+    init_schema(conn)
+    schedule = Schedule(refresh_seconds=float('inf'))
+    booked, seconds = populate(conn, schedule, workers, rnd)
+    print(f'{booked} bookings for {workers} workers in {seconds:.2f} s ({booked / seconds:,.0f} bookings/s)')
+
+    requests = [(rnd.choice((60, 75, 120, 180)), MONTH_START + timedelta(days=rnd.randrange(23), minutes=rnd.randrange(600)))
+                for _ in range(queries)]
+    for name, search in (('index', lambda d, s: schedule.first_free(d, s)),
+                         ('sql scan', lambda d, s: scan_first_free(conn, schedule, d, s))):
+        start = time.perf_counter()
+        results = [search(d, s) for d, s in requests]
+        per_query = (time.perf_counter() - start) / queries * 1e6
+        print(f'{name:<9} {per_query:>10.1f} us/query')
+        if name == 'index':
+            expected = results
+        else:
+            assert results == expected, 'index and scan disagree'
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [50, 500][len(args):]))
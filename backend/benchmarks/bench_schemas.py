@@ -0,0 +1,90 @@
+# Cost of decoding and validating one request body per endpoint: stdlib json
+# plus the hand-written checks the handlers used to do, orjson plus the
+# compiled schemas, and the same through a Flask request (get_json included).
+# Usage (from backend/): python benchmarks/bench_schemas.py [iterations]
+import json
+import logging
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('NAILTIME_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+import orjson
+
+from schemas import LOGIN, PREDICT, REGISTER
+
+PAYLOADS = {
+    'register': {'name': 'Мария Иванова', 'email': 'maria@example.com', 'password': 'secret', 'role': 'client'},
+    'login': {'email': 'maria@example.com', 'password': 'secret'},
+    'predict': {'length': 30, 'colors': 2, 'decorations': 1, 'technique': 1, 'service_type': 1,
+                'complexity': 3, 'worker_id': 7},
+}
+SCHEMAS = {'register': REGISTER, 'login': LOGIN, 'predict': PREDICT}
+
+
+# What the handlers did before the schemas
+def legacy_register(data):
+    if not data:
+        return False
+    required_fields = ['name', 'email', 'password', 'role']
+    missing_fields = [field for field in required_fields if not data.get(field)]
+    if missing_fields:
+        return False
+    if data['role'] not in ['client', 'worker', 'owner']:
+        return False
+    return '@' in data['email']
+
+
+def legacy_login(data):
+    return bool(data) and bool(data.get('email')) and bool(data.get('password'))
+
+
+def legacy_predict(data):
+    # Only the model-id parsing; missing features defaulted to 0
+    for key in ('worker_id', 'salon_id'):
+        if data.get(key) is not None:
+            int(data[key])
+    return True
+
+
+LEGACY = {'register': legacy_register, 'login': legacy_login, 'predict': legacy_predict}
+
+
+def per_call_us(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main(number):
+    from app import create_app
+    logging.disable(logging.CRITICAL)
+    app = create_app({'ONLINE_LEARNING': False})
+    plain = create_app({'ONLINE_LEARNING': False, 'JSON_ORJSON': False})
+
+    print(f'{"endpoint":<10} {"json+manual":>12} {"orjson+schema":>14} {"flask stdlib":>13} {"flask orjson":>13}  (us per request)')
+    for name, payload in PAYLOADS.items():
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        legacy, schema = LEGACY[name], SCHEMAS[name]
+        manual = per_call_us(lambda: legacy(json.loads(body)), number)
+        compiled = per_call_us(lambda: schema.validate(orjson.loads(body)), number)
+        in_flask = []
+        for application in (plain, app):
+            def request():
+                with application.test_request_context('/', method='POST', data=body,
+                                                      content_type='application/json'):
+                    schema.load()
+            in_flask.append(per_call_us(request, max(1, number // 10)))
+        print(f'{name:<10} {manual:>12.2f} {compiled:>14.2f} {in_flask[0]:>13.2f} {in_flask[1]:>13.2f}')
+
+    response = {'predicted_time': 43.09, 'model_version': '7709369d23bf', 'model': 'global'}
+    with app.app_context():
+        encode_orjson = per_call_us(lambda: app.json.dumps(response), number)
+    with plain.app_context():
+        encode_stdlib = per_call_us(lambda: plain.json.dumps(response), number)
+    print(f'\nencode predict response: stdlib {encode_stdlib:.2f} us, orjson {encode_orjson:.2f} us')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,85 @@
+# Startup cost in fresh interpreters: `import app`, create_app() with the model
+# preloaded or deferred, and the heaviest modules from `python -X importtime`.
+# Usage (from backend/): python benchmarks/bench_startup.py [--runs N] [--save FILE] [--baseline FILE]
+# With --baseline, exits 1 when any stage is more than --tolerance slower.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = {
+    'import': 'import app',
+    'create_app (lazy model)': 'import os; os.environ["MODEL_PRELOAD"] = "0"; import app; app.create_app()',
+    'create_app (preload)': 'import app; app.create_app()',
+    'wsgi (preload + warm-up)': 'import wsgi',
+}
+
+TIMER = '''
+import time, sys
+start = time.perf_counter()
+exec(sys.argv[1])
+print(time.perf_counter() - start)
+'''
+
+
+def run_stage(code, env):
+    out = subprocess.run([sys.executable, '-c', TIMER, code], cwd=BACKEND, env=env,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def importtime(code, env, top):
+    # Self import time summed per top-level package, in microseconds
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=BACKEND, env=env,
+                         capture_output=True, text=True, check=True)
+    totals = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        totals[package] = totals.get(package, 0) + int(own)
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--save')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, NAILTIME_DB=os.path.join(tempfile.mkdtemp(), 'startup.db'), LOG_LEVEL='WARNING')
+    results = {}
+    for name, code in STAGES.items():
+        samples = [run_stage(code, env) for _ in range(args.runs)]
+        results[name] = statistics.median(samples)
+        print(f'{name:<26} {results[name] * 1000:>8.1f} ms  (median of {args.runs})')
+
+    print('\nimport time by package after create_app():')
+    for package, micros in importtime('import app; app.create_app()', env, args.top):
+        print(f'  {package:<24} {micros / 1000:>8.1f} ms')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        slower = {name: (results[name], base) for name, base in baseline.items()
+                  if name in results and results[name] > base * (1 + args.tolerance)}
+        for name, (now, base) in slower.items():
+            print(f'REGRESSION {name}: {now * 1000:.1f} ms vs baseline {base * 1000:.1f} ms')
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
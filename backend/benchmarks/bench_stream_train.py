@@ -0,0 +1,40 @@
+# Streams synthetic appointment CSVs of growing size through ML/stream_train.py
+# and reports rows/sec and peak RSS, which should stay flat as the file grows.
+# Usage (from backend/): python benchmarks/bench_stream_train.py [rows ...]
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from bench_train import synthetic
+
+ML_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ML')
+HEADER = 'length,colors,decorations,technique,service_type,complexity,time'
+
+
+def write_csv(path, n, chunk=500_000):
+    with open(path, 'w') as f:
+        f.write(HEADER + '\n')
+        for start in range(0, n, chunk):
+            X, y = synthetic(min(chunk, n - start), seed=start)
+            np.savetxt(f, np.column_stack([X, y]), fmt=['%d'] * 6 + ['%.1f'], delimiter=',')
+
+
+def main(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f'appointments_{n}.csv')
+            write_csv(path, n)
+            size_mb = os.path.getsize(path) / 1e6
+            out = subprocess.run([sys.executable, 'stream_train.py', path, '--seed', '0'],
+                                 cwd=ML_DIR, capture_output=True, text=True, check=True)
+            print(f'{n:>10} rows ({size_mb:,.0f} MB): {out.stdout.splitlines()[0]}')
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [100_000, 1_000_000, 5_000_000])
@@ -0,0 +1,59 @@
+# Training time of the pure-Python LinearRegressionCustom versus the NumPy engine.
+# Usage (from backend/): python benchmarks/bench_train.py [rows ...]
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ML'))
+
+import numpy as np
+
+from engine import LinearRegressionNumpy
+from train_ml import LinearRegressionCustom
+
+EPOCHS = 100
+LOOP_MAX_ROWS = 20000
+
+
+def synthetic(n, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(15, 60, n),
+        rng.integers(0, 6, n),
+        rng.integers(0, 4, n),
+        rng.integers(0, 3, n),
+        rng.integers(0, 3, n),
+        rng.integers(1, 6, n),
+    ]).astype(np.float64)
+    y = X @ np.array([0.5, 2.0, 4.7, 3.2, 5.5, 6.1]) + 5.0 + rng.normal(0, 3, n)
+    return X, y
+
+
+def timed(model, X, y):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.fit(X, y)
+    return time.perf_counter() - start, model.loss(X, y)
+
+
+def main(sizes):
+    print(f'{"rows":>8} {"engine":<12} {"seconds":>9} {"mse":>10}')
+    for n in sizes:
+        X, y = synthetic(n)
+        runs = [
+            ('numpy', LinearRegressionNumpy(lr=0.0001, epochs=EPOCHS, seed=0)),
+            ('minibatch', LinearRegressionNumpy(lr=0.0001, epochs=EPOCHS, solver='minibatch', seed=0)),
+            ('lstsq', LinearRegressionNumpy(solver='lstsq')),
+        ]
+        if n <= LOOP_MAX_ROWS:
+            runs.insert(0, ('loop', LinearRegressionCustom(lr=0.0001, epochs=EPOCHS)))
+        for name, model in runs:
+            data = (X.tolist(), y.tolist()) if name == 'loop' else (X, y)
+            seconds, mse = timed(model, *data)
+            print(f'{n:>8} {name:<12} {seconds:>9.3f} {mse:>10.2f}')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [200, 10000, 500000])
@@ -0,0 +1,156 @@
+# Owner staff/user search over synthetic users (1M by default): checks with
+# EXPLAIN QUERY PLAN that every listing and search shape behind
+# GET /api/users is answered from an index (no full scan of users, no sort
+# of the result), then measures page latency at increasing depth with the
+# keyset cursor versus the equivalent LIMIT/OFFSET query, and the cost of
+# trigram search for common and rare terms.
+# Exits non-zero when a plan check fails.
+# Usage (from backend/): python benchmarks/bench_users.py [users] [repeat]
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import users
+
+FIRST = ['Мария', 'Елена', 'Иванка', 'Петя', 'София', 'Анна', 'Габриела', 'Десислава', 'Виктория', 'Николета',
+         'Ivan', 'Georgi', 'Nikolay', 'Dimitar', 'Stefan', 'Maria', 'Elena', 'Sofia', 'Anna', 'Viktoria']
+LAST = ['Иванова', 'Петрова', 'Георгиева', 'Димитрова', 'Стоянова', 'Николова', 'Тодорова', 'Колева',
+        'Ivanov', 'Petrov', 'Georgiev', 'Dimitrov', 'Stoyanov', 'Nikolov', 'Todorov', 'Kolev']
+ROLE_WEIGHTS = (('client', 90), ('worker', 9), ('owner', 1))
+PAGE = 25
+
+
+def populate(conn, count, seed=0):
+    # Bulk insert first and build the indexes and the FTS table afterwards,
+    # as init_schema() does for an existing database
+    rng = random.Random(seed)
+    roles = [role for role, weight in ROLE_WEIGHTS for _ in range(weight)]
+    start = datetime(2023, 1, 1)
+    step = 3 * 365 * 86400 / count
+
+    def rows():
+        for i in range(count):
+            name = f'{rng.choice(FIRST)} {rng.choice(LAST)}'
+            created = start + timedelta(seconds=int(i * step))
+            yield (name, f'user{i}@example.com', 'x', rng.choice(roles),
+                   'inactive' if rng.random() < 0.05 else 'active', created.strftime('%Y-%m-%d %H:%M:%S'))
+    conn.executemany('INSERT INTO users (name, email, password_hash, role, status, created_at) '
+                     'VALUES (?, ?, ?, ?, ?, ?)', rows())
+    conn.commit()
+
+
+SHAPES = {
+    # label: search_users() keyword arguments
+    'all users': {},
+    'role=worker': {'role': 'worker'},
+    'role=worker&status=inactive': {'role': 'worker', 'status': 'inactive'},
+    'prefix=Ел': {'prefix': 'Ел'},
+    'prefix=ел&role=worker': {'prefix': 'ел', 'role': 'worker'},
+    'q=Петрова': {'q': 'Петрова'},
+    'q=user12345': {'q': 'user12345'},
+    'q=ivan&role=worker': {'q': 'ivan', 'role': 'worker'},
+}
+
+
+def check_plans(conn):
+    # First page and a cursor page of every shape must avoid a full scan of
+    # users and a temporary B-tree for ORDER BY
+    failures = 0
+    for label, filters in SHAPES.items():
+        page = users.search_users(conn, limit=PAGE, **filters)
+        for cursor in [None] + [page['next_cursor']] * bool(page['next_cursor']):
+            sql, params, _, _ = users.build_query(cursor=cursor, limit=PAGE, **filters)
+            plan = users.query_plan(conn, sql, params)
+            bad = [step for step in plan
+                   if step.startswith('SCAN u') and 'INDEX' not in step or 'TEMP B-TREE' in step]
+            failures += bool(bad)
+            print(f'{"FAIL" if bad else "ok":<5} {label + (" (cursor)" if cursor else ""):<38} {" | ".join(plan)}')
+    return failures
+
+
+def timings(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples) * 1000, samples[int(0.99 * (len(samples) - 1))] * 1000
+
+
+def offset_query(filters, offset):
+    sql, params, _, _ = users.build_query(limit=PAGE - 1, **filters)
+    return sql + ' OFFSET :offset', dict(params, offset=offset)
+
+
+def depth_cursor(conn, filters, depth):
+    # Cursor pointing just before row `depth` of the listing
+    if not depth:
+        return None
+    sql, params = offset_query(filters, depth - 1)
+    row = conn.execute(sql.replace('LIMIT :limit', 'LIMIT 1'), params).fetchone()
+    if row is None:
+        return None
+    _, _, mode, keys = users.build_query(limit=PAGE, **filters)
+    return users.encode_cursor(mode, [row[key] for key in keys])
+
+
+def main(count, repeat):
+    path = os.path.join(tempfile.mkdtemp(), 'users.db')
+    pool = db.ConnectionPool(path, size=0)
+    conn = pool.connect()
+    db.init_db(conn)
+    start = time.perf_counter()
+    populate(conn, count)
+    inserted = time.perf_counter() - start
+    start = time.perf_counter()
+    fts = users.init_schema(conn)
+    indexed = time.perf_counter() - start
+    conn.execute('ANALYZE')
+    conn.commit()
+    print(f'{count:,} users: insert {inserted:.1f} s, indexes + FTS {indexed:.1f} s, '
+          f'database {os.path.getsize(path) / 2 ** 20:.0f} MB, fts5 {"yes" if fts else "no"}, '
+          f'SQLite {sqlite3.sqlite_version}\n')
+    if not fts:
+        sys.exit('This SQLite build has no FTS5; the trigram search cannot be checked')
+
+    failures = check_plans(conn)
+
+    print(f'\n{"page at depth":<32} {"rows":>9} {"keyset p50":>11} {"p99":>7} {"OFFSET p50":>11} {"p99":>7}  (ms)')
+    for label in ('all users', 'role=worker', 'prefix=Ел'):
+        filters = SHAPES[label]
+        for depth in (0, 1_000, 10_000, 100_000, count // 2):
+            cursor = depth_cursor(conn, filters, depth)
+            if depth and cursor is None:
+                continue
+            # Same page size and the same fetch for both; only the WHERE/OFFSET differs
+            sql, params, _, _ = users.build_query(cursor=cursor, limit=PAGE - 1, **filters)
+            keyset = timings(lambda: conn.execute(sql, params).fetchall(), repeat)
+            sql, params = offset_query(filters, depth)
+            offset = timings(lambda: conn.execute(sql, params).fetchall(), max(1, repeat // 10))
+            print(f'{label:<32} {depth:>9,} {keyset[0]:>11.3f} {keyset[1]:>7.3f} {offset[0]:>11.3f} {offset[1]:>7.3f}')
+
+    print(f'\n{"search (first page)":<32} {"matches":>9} {"p50":>11} {"p99":>7}  (ms)')
+    for label in ('q=Петрова', 'q=user12345', 'q=ivan&role=worker'):
+        filters = SHAPES[label]
+        sql, params, _, _ = users.build_query(limit=PAGE, **filters)
+        matches = conn.execute('SELECT COUNT(*) FROM users_fts WHERE users_fts MATCH ?',
+                               (params['match'],)).fetchone()[0]
+        p50, p99 = timings(lambda: users.search_users(conn, limit=PAGE, **filters), repeat)
+        print(f'{label:<32} {matches:>9,} {p50:>11.3f} {p99:>7.3f}')
+    conn.close()
+    if failures:
+        sys.exit(f'{failures} query plan check(s) failed')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [1_000_000, 200][len(args):]))
@@ -0,0 +1,49 @@
+# /api/auth/verify throughput with the token/user cache disabled and enabled.
+# Runs against a throwaway database in a temp directory.
+# Usage (from backend/): python benchmarks/bench_verify.py [requests] [threads]
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['NAILTIME_DB'] = os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+
+def run(app, headers, requests, threads):
+    def worker(n):
+        client = app.test_client()
+        for _ in range(n):
+            assert client.get('/api/auth/verify', headers=headers).status_code == 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(worker, [requests // threads] * threads))
+    return (requests // threads * threads) / (time.perf_counter() - start)
+
+
+def main(requests, threads):
+    from app import create_app
+    import helpers
+    app = create_app()
+    logging.disable(logging.CRITICAL)
+
+    client = app.test_client()
+    token = client.post('/api/auth/register', json={
+        'name': 'Bench', 'email': 'bench@example.com', 'password': 'secret', 'role': 'owner'
+    }).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    for enabled in (False, True):
+        app.config['AUTH_CACHE_ENABLED'] = enabled
+        helpers.token_cache.clear()
+        helpers.user_cache.clear()
+        rps = run(app, headers, requests, threads)
+        print(f'cache {"on " if enabled else "off"}: {rps:>8.0f} req/s')
+    print(helpers.auth_cache_stats())
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000, int(sys.argv[2]) if len(sys.argv) > 2 else 4)
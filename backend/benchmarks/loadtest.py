@@ -0,0 +1,286 @@
+# Load test for the auth and prediction API: register, login, verify and
+# predict-time in a configurable mix, driven by N concurrent client threads
+# either in-process (Flask test client), through a local threaded WSGI server
+# started here, or against an already running server (--url, e.g. gunicorn).
+# Reports throughput, p50/p95/p99 and error rate per endpoint; results are
+# saved as JSON and can be compared with a previous run.
+# Usage (from backend/):
+#   python benchmarks/loadtest.py [--target inprocess wsgi] [--concurrency 1 8]
+#       [--requests N | --duration S] [--mix predict=70,verify=20,login=8,register=2]
+#       [--save FILE] [--baseline FILE] [--tolerance 0.25]
+# With --baseline, exits 1 when throughput, p95 or error rate regress beyond
+# --tolerance. The in-process and local-server targets share the GIL with the
+# load generator, so compare runs on the same machine and target only.
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('NAILTIME_DB', os.path.join(tempfile.mkdtemp(), 'loadtest.db'))
+
+from inference import FEATURES
+
+DEFAULT_MIX = 'predict=70,verify=20,login=8,register=2'
+PASSWORD = 'secret-password'
+
+
+class InProcess:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HTTP:
+    # One keep-alive connection per client thread
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.connection = None
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        for attempt in (0, 1):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.connection.request(method, path, payload, headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.connection.close()
+                    self.connection = None
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # The server closed an idle keep-alive connection; retry once on a new one
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+
+class Scenario:
+    # Requests for each endpoint, built from users registered before the run
+    def __init__(self, users, distinct, seed):
+        rnd = random.Random(seed)
+        self.users = users
+        self.payloads = [{f: rnd.randint(1, 5) for f in FEATURES} for _ in range(distinct)]
+        self.emails = itertools.count()
+        self.run_id = f'{os.getpid()}-{time.time_ns()}'
+
+    def register(self, rnd):
+        email = f'load-{self.run_id}-{next(self.emails)}@example.com'
+        return 'POST', '/api/auth/register', {'name': 'Load', 'email': email, 'password': PASSWORD,
+                                              'role': 'client'}, None, 201
+
+    def login(self, rnd):
+        email, _ = rnd.choice(self.users)
+        return 'POST', '/api/auth/login', {'email': email, 'password': PASSWORD}, None, 200
+
+    def verify(self, rnd):
+        _, token = rnd.choice(self.users)
+        return 'GET', '/api/auth/verify', None, {'Authorization': f'Bearer {token}'}, 200
+
+    def predict(self, rnd):
+        return 'POST', '/api/predict-time', rnd.choice(self.payloads), None, 200
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ('register', 'login', 'verify', 'predict'):
+            raise argparse.ArgumentTypeError(f'unknown endpoint {name!r} in mix')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def create_users(session, count, run_id):
+    users = []
+    for i in range(count):
+        email = f'load-user-{run_id}-{i}@example.com'
+        status, body = session.request('POST', '/api/auth/register', {
+            'name': 'Load', 'email': email, 'password': PASSWORD, 'role': 'client'})
+        if status != 201:
+            raise RuntimeError(f'could not register load-test user: {status} {body}')
+        users.append((email, body['token']))
+    return users
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples, seconds):
+    latencies = sorted(latency for latency, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'throughput': round(len(samples) / seconds, 2) if seconds else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+    }
+
+
+def run(make_session, scenario, mix, concurrency, requests, duration, seed):
+    names, weights = list(mix), list(mix.values())
+    remaining = itertools.count()
+    results = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def client(index):
+        rnd = random.Random(seed + index)
+        session = make_session()
+        samples = []
+        barrier.wait()
+        deadline = time.perf_counter() + duration if duration else None
+        while True:
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    break
+            elif next(remaining) >= requests:
+                break
+            name = rnd.choices(names, weights)[0]
+            method, path, body, headers, expected = getattr(scenario, name)(rnd)
+            start = time.perf_counter()
+            try:
+                status, _ = session.request(method, path, body, headers)
+                ok = status == expected
+            except Exception:
+                ok = False
+            samples.append((name, time.perf_counter() - start, ok))
+        with lock:
+            results.extend(samples)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    report = {name: summarize([(latency, ok) for n, latency, ok in results if n == name], seconds)
+              for name in names}
+    report['total'] = summarize([(latency, ok) for _, latency, ok in results], seconds)
+    return report
+
+
+def start_server(app):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.port}'
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, endpoints in baseline.get('results', {}).items():
+        for name, base in endpoints.items():
+            now = results.get(key, {}).get(name)
+            if now is None:
+                continue
+            if now['throughput'] < base['throughput'] * (1 - tolerance):
+                regressions.append(f'{key} {name}: throughput {now["throughput"]:.0f}/s vs {base["throughput"]:.0f}/s')
+            if now['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append(f'{key} {name}: p95 {now["p95_ms"]:.2f} ms vs {base["p95_ms"]:.2f} ms')
+            if now['error_rate'] > base['error_rate'] + 0.01:
+                regressions.append(f'{key} {name}: error rate {now["error_rate"]:.2%} vs {base["error_rate"]:.2%}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test for the auth and prediction API')
+    parser.add_argument('--target', nargs='+', choices=['inprocess', 'wsgi'], default=['inprocess', 'wsgi'])
+    parser.add_argument('--url', help='load-test a running server instead of building the app here')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--requests', type=int, default=2000, help='requests per run (ignored with --duration)')
+    parser.add_argument('--duration', type=float, help='run each configuration for this many seconds')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument('--users', type=int, default=50, help='users registered before the run for login/verify')
+    parser.add_argument('--distinct', type=int, default=200, help='distinct predict payloads')
+    parser.add_argument('--hash-method', help='PASSWORD_HASH_METHOD for the app built here, e.g. pbkdf2:sha256:1000')
+    parser.add_argument('--rate-limit', action='store_true',
+                        help='keep the rate limiter on (all clients share one address, so it mostly answers 429)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+    targets = {}
+    if args.url:
+        targets['url'] = lambda: HTTP(args.url)
+    else:
+        from app import create_app
+        config = {'RATE_LIMIT_ENABLED': args.rate_limit}
+        if args.hash_method:
+            config['PASSWORD_HASH_METHOD'] = args.hash_method
+        app = create_app(config)
+        if 'inprocess' in args.target:
+            targets['inprocess'] = lambda: InProcess(app)
+        if 'wsgi' in args.target:
+            server, url = start_server(app)
+            targets['wsgi'] = lambda: HTTP(url)
+
+    results = {}
+    for target, make_session in targets.items():
+        scenario = Scenario([], args.distinct, args.seed)
+        scenario.users = create_users(make_session(), args.users, scenario.run_id)
+        for concurrency in args.concurrency:
+            key = f'{target} c={concurrency}'
+            results[key] = run(make_session, scenario, args.mix, concurrency, args.requests, args.duration, args.seed)
+            print(f'\n{key}')
+            print(f'  {"endpoint":<10} {"requests":>8} {"req/s":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7}')
+            for name, stats in results[key].items():
+                print(f'  {name:<10} {stats["requests"]:>8} {stats["throughput"]:>9.1f} {stats["p50_ms"]:>8.2f} '
+                      f'{stats["p95_ms"]:>8.2f} {stats["p99_ms"]:>8.2f} {stats["error_rate"]:>7.2%}')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'config': {'mix': args.mix, 'requests': args.requests, 'duration': args.duration,
+                                  'users': args.users, 'distinct': args.distinct, 'hash_method': args.hash_method,
+                                  'cpus': os.cpu_count()},
+                       'results': results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
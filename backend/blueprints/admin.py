@@ -0,0 +1,98 @@
+from flask import Blueprint, jsonify
+from helpers import get_db, token_required, auth_cache_stats
+from model_registry import ModelValidationError, get_registry
+from prediction_cache import get_prediction_cache
+from micro_batcher import get_batcher
+from model_pool import get_model_pool
+from online_learning import get_learner
+from outbox import get_sender
+from rate_limit import get_limiter
+import logging
+
+logger = logging.getLogger(__name__)
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+def owner_only(current_user):
+    if current_user['role'] != 'owner':
+        return jsonify({'message': 'Owner role required'}), 403
+    return None
+
+@admin_bp.route('/model', methods=['GET', 'OPTIONS'])
+@token_required
+def model_info(current_user):
+    denied = owner_only(current_user)
+    if denied:
+        return denied
+    return jsonify({'model': get_registry().current().to_dict()}), 200
+
+@admin_bp.route('/model/reload', methods=['POST', 'OPTIONS'])
+@token_required
+def reload_model(current_user):
+    denied = owner_only(current_user)
+    if denied:
+        return denied
+    registry = get_registry()
+    previous = registry.current().version
+    try:
+        current = registry.reload()
+    except ModelValidationError as e:
+        logger.error('Rejected model reload: %s', e)
+        return jsonify({'message': str(e), 'model': registry.current().to_dict()}), 422
+    except Exception as e:
+        logger.exception('Model reload failed')
+        return jsonify({'message': f'Error reloading model: {str(e)}'}), 500
+    return jsonify({
+        'message': 'Model reloaded' if current.version != previous else 'Model unchanged',
+        'model': current.to_dict()
+    }), 200
+
+@admin_bp.route('/model/online', methods=['GET', 'OPTIONS'])
+@token_required
+def online_model(current_user):
+    denied = owner_only(current_user)
+    if denied:
+        return denied
+    learner = get_learner()
+    if learner is None:
+        return jsonify({'message': 'Online learning is disabled'}), 404
+    return jsonify({'online': learner.stats(), 'model': get_registry().current().to_dict()}), 200
+
+@admin_bp.route('/model/online/promote', methods=['POST', 'OPTIONS'])
+@token_required
+def promote_online_model(current_user):
+    denied = owner_only(current_user)
+    if denied:
+        return denied
+    learner = get_learner()
+    if learner is None or learner.shadow is None:
+        return jsonify({'message': 'No online model to promote'}), 404
+    version = learner.promote()
+    if version is None:
+        return jsonify({'message': 'Online model failed holdout validation',
+                        'model': get_registry().current().to_dict()}), 422
+    return jsonify({'message': 'Online model promoted', 'model': get_registry().current().to_dict()}), 200
+
+@admin_bp.route('/cache', methods=['GET', 'OPTIONS'])
+@token_required
+def cache_stats(current_user):
+    denied = owner_only(current_user)
+    if denied:
+        return denied
+    batcher = get_batcher()
+    return jsonify({'auth': auth_cache_stats(), 'predictions': get_prediction_cache().stats(),
+                    'personal_models': get_model_pool().stats(),
+                    'micro_batching': batcher.stats() if batcher else None,
+                    'rate_limits': get_limiter().stats() if get_limiter() else None}), 200
+
+@admin_bp.route('/outbox', methods=['GET', 'OPTIONS'])
+@token_required
+def outbox_stats(current_user):
+    denied = owner_only(current_user)
+    if denied:
+        return denied
+    sender = get_sender()
+    if sender is not None:
+        return jsonify(sender.stats()), 200
+    counts = dict(get_db().execute('SELECT status, COUNT(*) FROM email_outbox GROUP BY status').fetchall())
+    return jsonify({'message': 'Sender is disabled in this process', 'outbox': counts}), 200
@@ -0,0 +1,22 @@
+from datetime import date
+from flask import Blueprint, request, jsonify
+from analytics import VIEWS, read_dashboard
+from blueprints.admin import owner_only
+from helpers import get_db, token_required
+
+analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
+
+@analytics_bp.route('', methods=['GET', 'OPTIONS'])
+@token_required
+def dashboard(current_user):
+    denied = owner_only(current_user)
+    if denied:
+        return denied
+    view = request.args.get('period', 'week')
+    if view not in VIEWS:
+        return jsonify({'message': f'period must be one of {", ".join(VIEWS)}'}), 400
+    try:
+        anchor = date.fromisoformat(request.args['date']) if request.args.get('date') else date.today()
+    except ValueError:
+        return jsonify({'message': 'date must be YYYY-MM-DD'}), 400
+    return jsonify(read_dashboard(get_db(), view, anchor)), 200
@@ -0,0 +1,268 @@
+from datetime import datetime, timedelta
+import math
+from flask import Blueprint, current_app, request, jsonify
+from analytics import apply_completion
+from helpers import get_db, token_required
+from inference import FEATURES
+from model_pool import select_model
+from outbox import cancel_booking, get_sender, queue_booking
+from online_learning import get_learner
+from prediction_cache import get_prediction_cache
+from metrics import timed
+from scheduling import SlotTaken, book, format_time, get_schedule, parse_time, rebook, round_up
+from schemas import APPOINTMENT, APPOINTMENT_STATUS, ValidationError
+import logging
+
+logger = logging.getLogger(__name__)
+
+appointments_bp = Blueprint('appointments', __name__, url_prefix='/api/appointments')
+
+# Allowed status changes. A completed appointment can only be completed again,
+# to correct actual_time; a cancelled one can be booked again if its slot is free.
+TRANSITIONS = {
+    'scheduled': ('in-progress', 'completed', 'cancelled'),
+    'in-progress': ('scheduled', 'completed', 'cancelled'),
+    'completed': ('completed',),
+    'cancelled': ('scheduled',),
+}
+
+# /free-slot looks at most this many days ahead; the search is workers x days
+MAX_SEARCH_DAYS = 62
+
+APPOINTMENT_COLUMNS = '''
+    a.id, a.worker_id, a.client_id, c.name AS client_name, a.service, a.start_at, a.end_at,
+    a.status, a.predicted_time, a.actual_time, a.price, a.length, a.colors, a.decorations,
+    a.technique, a.service_type, a.complexity
+'''
+
+def appointment_json(row):
+    return {
+        'id': row['id'],
+        'workerId': row['worker_id'],
+        'clientId': row['client_id'],
+        'client': row['client_name'] or '',
+        'service': row['service'],
+        'date': row['start_at'][:10],
+        'time': row['start_at'][11:16],
+        'end': row['end_at'][11:16],
+        'status': row['status'],
+        'predictedTime': row['predicted_time'],
+        'actualTime': row['actual_time'],
+        'price': row['price']
+    }
+
+def fetch_appointment(conn, appointment_id):
+    return conn.execute(f'''
+        SELECT {APPOINTMENT_COLUMNS} FROM appointments a
+        LEFT JOIN users c ON c.id = a.client_id
+        WHERE a.id = ?
+    ''', (appointment_id,)).fetchone()
+
+def parse_id(value, name):
+    # JSON ids may come as numbers or digit strings; anything else is a 400
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).isdigit():
+        raise ValueError(f'{name} must be an integer')
+    return int(value)
+
+def parse_number(value, name):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f'{name} must be a number')
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a number') from None
+    if not math.isfinite(number):
+        raise ValueError(f'{name} must be a number')
+    return number
+
+def resolve_duration(data):
+    # Explicit duration in minutes, or the model's prediction rounded up to the
+    # slot step. Never shorter than one step: an interval must end after it
+    # starts, or the per-day index loses its sorted ends.
+    step = get_schedule().step
+    if data.get('duration') not in (None, ''):
+        duration = parse_number(data['duration'], 'duration')
+        if duration <= 0:
+            raise ValueError('duration must be a positive number of minutes')
+        return round_up(math.ceil(duration), step), None
+    missing = [f for f in FEATURES if data.get(f) in (None, '')]
+    if missing:
+        raise ValueError(f'Provide duration or all model features (missing: {", ".join(missing)})')
+    features = {f: parse_number(data[f], f) for f in FEATURES}
+    worker_id = parse_id(data['worker_id'], 'worker_id') if data.get('worker_id') not in (None, '') else None
+    with timed('inference'):
+        predicted = get_prediction_cache().predict(select_model(worker_id), features)
+    return max(step, round_up(math.ceil(predicted), step)), round(float(predicted), 2)
+
+@appointments_bp.route('', methods=['POST', 'OPTIONS'])
+@token_required
+def create_appointment(current_user):
+    try:
+        data = APPOINTMENT.load()
+        start = parse_time(data.start)
+        duration, predicted = resolve_duration(data._asdict())
+    except ValidationError as e:
+        return jsonify({'message': str(e), 'errors': e.errors}), 400
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    worker_id = data.worker_id
+    end = start + timedelta(minutes=duration)
+
+    conn = get_db()
+    schedule = get_schedule()
+    schedule.ensure_loaded(conn)
+    if not schedule.within_hours(start, end):
+        return jsonify({'message': 'Appointment is outside working hours'}), 400
+    worker = conn.execute('SELECT role FROM users WHERE id = ?', (worker_id,)).fetchone()
+    if not worker or worker['role'] != 'worker':
+        return jsonify({'message': 'Unknown worker'}), 404
+    client_id = current_user['id'] if current_user['role'] == 'client' else data.client_id
+    if client_id is not None and current_user['role'] != 'client':
+        client = conn.execute('SELECT role FROM users WHERE id = ?', (client_id,)).fetchone()
+        if not client or client['role'] != 'client':
+            return jsonify({'message': 'Unknown client'}), 404
+
+    fields = {
+        'client_id': client_id,
+        'service': data.service,
+        'predicted_time': predicted,
+        'price': data.price
+    }
+    fields.update({f: getattr(data, f) for f in FEATURES})
+    # Confirmation and reminder emails are queued in the booking transaction
+    reminder_before = timedelta(hours=current_app.config.get('MAIL_REMINDER_HOURS', 24))
+    queue_emails = lambda conn, appointment_id: queue_booking(conn, appointment_id, start, data.service,
+                                                              reminder_before)
+    try:
+        appointment_id = book(conn, schedule, worker_id, start, end, fields, queue_emails)
+    except SlotTaken as e:
+        return jsonify({'message': str(e)}), 409
+    sender = get_sender()
+    if sender is not None:
+        sender.notify()
+    logger.debug('Appointment %s booked for worker %s at %s', appointment_id, worker_id, data.start)
+    return jsonify({'appointment': appointment_json(fetch_appointment(conn, appointment_id))}), 201
+
+@appointments_bp.route('', methods=['GET', 'OPTIONS'])
+@token_required
+def list_appointments(current_user):
+    day = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+    params = [f'{day} 00:00', f'{day} 23:59']
+    where = 'a.start_at BETWEEN ? AND ?'
+    if current_user['role'] == 'client':
+        where += ' AND a.client_id = ?'
+        params.append(current_user['id'])
+    elif current_user['role'] == 'worker':
+        where += ' AND a.worker_id = ?'
+        params.append(current_user['id'])
+    elif request.args.get('worker_id'):
+        where += ' AND a.worker_id = ?'
+        try:
+            params.append(parse_id(request.args['worker_id'], 'worker_id'))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    rows = get_db().execute(f'''
+        SELECT {APPOINTMENT_COLUMNS} FROM appointments a
+        LEFT JOIN users c ON c.id = a.client_id
+        WHERE {where}
+        ORDER BY a.start_at
+    ''', params).fetchall()
+    return jsonify({'appointments': [appointment_json(row) for row in rows]}), 200
+
+@appointments_bp.route('/free-slot', methods=['GET', 'OPTIONS'])
+@token_required
+def first_free_slot(current_user):
+    try:
+        duration, predicted = resolve_duration(request.args)
+        start = parse_time(request.args['from']) if request.args.get('from') else datetime.now()
+        days = parse_id(request.args.get('days', '7'), 'days')
+        if not 1 <= days <= MAX_SEARCH_DAYS:
+            raise ValueError(f'days must be between 1 and {MAX_SEARCH_DAYS}')
+        worker_ids = [parse_id(request.args['worker_id'], 'worker_id')] if request.args.get('worker_id') else None
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    schedule = get_schedule()
+    schedule.ensure_loaded(get_db())
+    found = schedule.first_free(duration, start, days, worker_ids)
+    if found is None:
+        return jsonify({'message': 'No free slot in range', 'duration': duration}), 404
+    slot, worker_id = found
+    return jsonify({'start': format_time(slot), 'worker_id': worker_id, 'duration': duration,
+                    'predicted_time': predicted}), 200
+
+@appointments_bp.route('/slots', methods=['GET', 'OPTIONS'])
+@token_required
+def free_slots(current_user):
+    try:
+        duration, _ = resolve_duration(request.args)
+        worker_id = parse_id(request.args['worker_id'], 'worker_id')
+        day = datetime.strptime(request.args['date'], '%Y-%m-%d').date()
+    except (KeyError, ValueError) as e:
+        return jsonify({'message': f'Invalid or missing parameter: {e}'}), 400
+    schedule = get_schedule()
+    schedule.ensure_loaded(get_db())
+    slots = schedule.free_slots(worker_id, day, duration)
+    return jsonify({'slots': [slot.strftime('%H:%M') for slot in slots], 'duration': duration}), 200
+
+@appointments_bp.route('/<int:appointment_id>/status', methods=['PUT', 'OPTIONS'])
+@token_required
+def update_status(current_user, appointment_id):
+    try:
+        data = APPOINTMENT_STATUS.load()
+    except ValidationError as e:
+        return jsonify({'message': str(e), 'errors': e.errors}), 400
+    status = data.status
+    conn = get_db()
+    row = fetch_appointment(conn, appointment_id)
+    if not row:
+        return jsonify({'message': 'Appointment not found'}), 404
+    if current_user['role'] != 'owner' and current_user['id'] != row['worker_id']:
+        return jsonify({'message': 'Not allowed'}), 403
+    previous = row['status']
+    if status == previous and status != 'completed':
+        return jsonify({'appointment': appointment_json(row)}), 200
+    if status not in TRANSITIONS[previous]:
+        return jsonify({'message': f'Cannot change a {previous} appointment to {status}'}), 409
+    actual_time = data.actual_time if data.actual_time is not None else row['actual_time']
+    schedule = get_schedule()
+
+    if previous == 'cancelled':
+        # Back in the index and the outbox, unless the slot went to someone else
+        start, end = parse_time(row['start_at']), parse_time(row['end_at'])
+        reminder_before = timedelta(hours=current_app.config.get('MAIL_REMINDER_HOURS', 24))
+        schedule.ensure_loaded(conn)
+        try:
+            rebook(conn, schedule, appointment_id, row['worker_id'], start, end, status,
+                   lambda conn, appointment_id: queue_booking(conn, appointment_id, start, row['service'],
+                                                              reminder_before))
+        except SlotTaken as e:
+            return jsonify({'message': str(e)}), 409
+        sender = get_sender()
+        if sender is not None:
+            sender.notify()
+        return jsonify({'appointment': appointment_json(fetch_appointment(conn, appointment_id))}), 200
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute('UPDATE appointments SET status = ?, actual_time = ? WHERE id = ?',
+                     (status, actual_time, appointment_id))
+        # Keep the dashboard rollups in step with completed appointments
+        if previous == 'completed':
+            apply_completion(conn, row, -1)
+        if status == 'completed':
+            apply_completion(conn, dict(row, actual_time=actual_time))
+        if status == 'cancelled':
+            cancel_booking(conn, appointment_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if status == 'cancelled':
+        schedule.remove(row['worker_id'], parse_time(row['start_at']), appointment_id)
+    learner = get_learner()
+    if learner is not None and status == 'completed' and previous != 'completed' and actual_time is not None \
+            and all(row[f] is not None for f in FEATURES):
+        # Queued for the background learner; never trains on the request thread.
+        # A correction of an already completed appointment is not learned twice.
+        learner.submit({f: row[f] for f in FEATURES}, actual_time)
+    return jsonify({'appointment': appointment_json(fetch_appointment(conn, appointment_id))}), 200
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-import jwt
-from helpers import get_db, generate_token, token_required
+from helpers import get_db, generate_token, token_required, invalidate_user
+from hashing import HashingBusy, busy_response, get_hasher
+from schemas import LOGIN, REGISTER, ValidationError
+from users import fold
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,51 +15,34 @@ def register():
         return '', 204
     try:
         logger.debug('Registration request received')
-        data = request.get_json()
-        if not data:
-            logger.error('No data provided in registration request')
-            return jsonify({'message': 'No data provided'}), 400
-
-        logger.debug(f'Registration data received: {data}')
-
-        # Validate required fields
-        required_fields = ['name', 'email', 'password', 'role']
-        missing_fields = [field for field in required_fields if not data.get(field)]
-        if missing_fields:
-            logger.error(f'Missing required fields in registration request: {missing_fields}')
-            return jsonify({'message': f'Missing required fields: {", ".join(missing_fields)}'}), 400
-
-        # Validate role
-        if data['role'] not in ['client', 'worker', 'owner']:
-            logger.error(f'Invalid role in registration request: {data["role"]}')
-            return jsonify({'message': 'Invalid role'}), 400
+        try:
+            data = REGISTER.load()
+        except ValidationError as e:
+            logger.error('Invalid registration request: %s', e.errors or e)
+            return jsonify({'message': str(e), 'errors': e.errors}), 400
 
-        # Validate email format
-        if '@' not in data['email']:
-            logger.error(f'Invalid email format in registration request: {data["email"]}')
-            return jsonify({'message': 'Invalid email format'}), 400
+        logger.debug('Registration data received for %s (role %s)', data.email, data.role)
 
         conn = get_db()
         cur = conn.cursor()
 
         # Check if user already exists
-        cur.execute('SELECT * FROM users WHERE email = ?', (data['email'],))
+        cur.execute('SELECT * FROM users WHERE email = ?', (data.email,))
         if cur.fetchone():
-            logger.error(f'Email already registered: {data["email"]}')
-            conn.close()
+            logger.error('Email already registered: %s', data.email)
             return jsonify({'message': 'Email already registered'}), 409
 
         # Create new user
-        password_hash = generate_password_hash(data['password'])
+        password_hash = get_hasher().hash(data.password)
         try:
             cur.execute('''
-                INSERT INTO users (name, email, password_hash, role)
-                VALUES (?, ?, ?, ?)
-            ''', (data['name'], data['email'], password_hash, data['role']))
+                INSERT INTO users (name, name_lower, email, password_hash, role)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (data.name, fold(data.name), data.email, password_hash, data.role))
             conn.commit()
 
             # Get the created user
-            cur.execute('SELECT * FROM users WHERE email = ?', (data['email'],))
+            cur.execute('SELECT * FROM users WHERE email = ?', (data.email,))
             user = cur.fetchone()
 
             if not user:
@@ -78,14 +62,15 @@ def register():
             }), 201
 
         except Exception as e:
-            logger.error(f'Error during user creation: {str(e)}')
+            logger.error('Error during user creation: %s', e)
             conn.rollback()
             raise e
-        finally:
-            conn.close()
 
+    except HashingBusy:
+        logger.warning('Registration rejected, password hashing pool is saturated')
+        return busy_response()
     except Exception as e:
-        logger.error(f'Error during registration: {str(e)}')
+        logger.error('Error during registration: %s', e)
         return jsonify({'message': f'Error during registration: {str(e)}'}), 500
 
 @auth_bp.route('/login', methods=['POST', 'OPTIONS'])
@@ -93,19 +78,28 @@ def login():
     if request.method == 'OPTIONS':
         return '', 204
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'message': 'No data provided'}), 400
-        if not data.get('email') or not data.get('password'):
-            return jsonify({'message': 'Missing email or password'}), 400
+        try:
+            data = LOGIN.load()
+        except ValidationError as e:
+            return jsonify({'message': str(e), 'errors': e.errors}), 400
         conn = get_db()
         cur = conn.cursor()
-        cur.execute('SELECT * FROM users WHERE email = ?', (data['email'],))
+        cur.execute('SELECT * FROM users WHERE email = ?', (data.email,))
         user = cur.fetchone()
         if not user:
             return jsonify({'message': 'Invalid email or password'}), 401
-        if not check_password_hash(user['password_hash'], data['password']):
+        hasher = get_hasher()
+        if not hasher.verify(user['password_hash'], data.password):
             return jsonify({'message': 'Invalid email or password'}), 401
+        # Checked after the password, so the answer does not reveal the account
+        if user['status'] != 'active':
+            return jsonify({'message': 'Account is deactivated'}), 403
+        # Upgrade hashes created with an older method or cost
+        if hasher.needs_rehash(user['password_hash']):
+            cur.execute('UPDATE users SET password_hash = ? WHERE id = ?',
+                        (hasher.hash(data.password), user['id']))
+            conn.commit()
+            invalidate_user(user['id'])
         # Generate token
         token = generate_token(user)
         return jsonify({
@@ -117,20 +111,60 @@ def login():
                 'role': user['role']
             }
         }), 200
+    except HashingBusy:
+        return busy_response()
     except Exception as e:
         return jsonify({'message': f'Error during login: {str(e)}'}), 500
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @auth_bp.route('/verify', methods=['GET', 'OPTIONS'])
 @token_required
 def verify_token(current_user):
-    # ... (тук се поставя логиката от app.py за verify)
-    pass
+    return jsonify({
+        'message': 'Token is valid',
+        'user': {
+            'name': current_user['name'],
+            'email': current_user['email'],
+            'role': current_user['role']
+        }
+    }), 200
 
 @auth_bp.route('/user/update', methods=['PUT', 'OPTIONS'])
 @token_required
 def update_user(current_user):
-    # ... (тук се поставя логиката от app.py за update user)
-    pass 
\ No newline at end of file
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'No data provided'}), 400
+    name = data.get('name') or current_user['name']
+    email = data.get('email') or current_user['email']
+    if '@' not in email:
+        return jsonify({'message': 'Invalid email format'}), 400
+    password_hash = current_user['password_hash']
+    if data.get('password'):
+        hasher = get_hasher()
+        try:
+            if not hasher.verify(password_hash, data.get('current_password') or ''):
+                return jsonify({'message': 'Current password is incorrect'}), 401
+            password_hash = hasher.hash(data['password'])
+        except HashingBusy:
+            return busy_response()
+    conn = get_db()
+    cur = conn.cursor()
+    if email != current_user['email']:
+        cur.execute('SELECT id FROM users WHERE email = ?', (email,))
+        if cur.fetchone():
+            return jsonify({'message': 'Email already registered'}), 409
+    cur.execute('UPDATE users SET name = ?, name_lower = ?, email = ?, password_hash = ? WHERE id = ?',
+                (name, fold(name), email, password_hash, current_user['id']))
+    conn.commit()
+    invalidate_user(current_user['id'])
+    cur.execute('SELECT * FROM users WHERE id = ?', (current_user['id'],))
+    user = cur.fetchone()
+    return jsonify({
+        'message': 'User updated',
+        'token': generate_token(user),
+        'user': {
+            'name': user['name'],
+            'email': user['email'],
+            'role': user['role']
+        }
+    }), 200
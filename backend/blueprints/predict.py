@@ -1,13 +1,59 @@
 from flask import Blueprint, request, jsonify
-import pandas as pd
-from app import model
+from inference import parse_batch
+from micro_batcher import BatcherTimeout, get_batcher, timeout_response
+from model_pool import select_model
+from schemas import PREDICT, ValidationError
+from prediction_cache import get_prediction_cache
+from metrics import timed
 
 predict_bp = Blueprint('predict', __name__, url_prefix='/api')
 
 @predict_bp.route('/predict-time', methods=['POST'])
 def predict_time():
-    data = request.json
-    features = ['length', 'colors', 'decorations', 'technique', 'service_type', 'complexity']
-    sample = pd.DataFrame([{f: data.get(f, 0) for f in features}])
-    predicted_time = model.predict(sample)[0]
-    return jsonify({'predicted_time': round(float(predicted_time), 2)}) 
\ No newline at end of file
+    try:
+        data = PREDICT.load()
+    except ValidationError as e:
+        return jsonify({'message': str(e), 'errors': e.errors}), 400
+    # Optional worker_id / salon_id pick a personal model, falling back to the global one
+    model = select_model(data.worker_id, data.salon_id)
+    try:
+        with timed('inference'):
+            predicted_time = get_prediction_cache().predict(model, data.features(), get_batcher())
+    except BatcherTimeout:
+        return timeout_response()
+    return jsonify({'predicted_time': round(float(predicted_time), 2), 'model_version': model.version,
+                    'model': model.scope})
+
+@predict_bp.route('/predict-time/batch', methods=['POST'])
+def predict_time_batch():
+    try:
+        items = parse_batch(request)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    # Every item goes through the same schema as /predict-time; errors are
+    # reported per item index and nothing is predicted if any item is invalid
+    rows, errors = [], {}
+    for i, item in enumerate(items):
+        try:
+            rows.append(PREDICT.validate(item))
+        except ValidationError as e:
+            errors[str(i)] = e.errors or {'item': str(e)}
+    if errors:
+        return jsonify({'message': f'{len(errors)} invalid item(s)', 'errors': errors}), 400
+    # Items are scored by the same model /predict-time would pick for them:
+    # one predict_many() per distinct model, results back in request order
+    models, groups = {}, {}
+    for i, row in enumerate(rows):
+        key = (row.worker_id, row.salon_id)
+        if key not in models:
+            models[key] = select_model(row.worker_id, row.salon_id)
+        model = models[key]
+        groups.setdefault(id(model), (model, []))[1].append(i)
+    predicted, used = [None] * len(rows), [None] * len(rows)
+    with timed('inference'):
+        for model, indexes in groups.values():
+            values = model.predictor.predict_many([rows[i].features() for i in indexes])
+            for i, value in zip(indexes, values):
+                predicted[i], used[i] = round(float(value), 2), model
+    return jsonify({'predicted_times': predicted, 'model_versions': [model.version for model in used],
+                    'models': [model.scope for model in used]})
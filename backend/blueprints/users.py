@@ -0,0 +1,45 @@
+from flask import Blueprint, request, jsonify
+from blueprints.admin import owner_only
+from helpers import get_db, invalidate_user, token_required
+from schemas import STATUS, ValidationError
+from users import FIELDS, parse_args, search_enabled, search_users
+import logging
+
+logger = logging.getLogger(__name__)
+
+users_bp = Blueprint('users', __name__, url_prefix='/api/users')
+
+@users_bp.route('', methods=['GET', 'OPTIONS'])
+@token_required
+def list_users(current_user):
+    # ?role=&status=&prefix= (name prefix) or ?q= (name/email search), &limit=&cursor=
+    denied = owner_only(current_user)
+    if denied:
+        return denied
+    try:
+        page = search_users(get_db(), fts=search_enabled(), **parse_args(request.args))
+    except ValidationError as e:
+        return jsonify({'message': str(e), 'errors': e.errors}), 400
+    return jsonify(page), 200
+
+@users_bp.route('/<int:user_id>/status', methods=['PUT', 'OPTIONS'])
+@token_required
+def update_status(current_user, user_id):
+    denied = owner_only(current_user)
+    if denied:
+        return denied
+    try:
+        data = STATUS.load()
+    except ValidationError as e:
+        return jsonify({'message': str(e), 'errors': e.errors}), 400
+    if user_id == current_user['id'] and data.status != 'active':
+        return jsonify({'message': 'You cannot deactivate your own account'}), 409
+    conn = get_db()
+    user = conn.execute(f'UPDATE users SET status = ? WHERE id = ? RETURNING {", ".join(FIELDS)}',
+                        (data.status, user_id)).fetchone()
+    conn.commit()
+    if user is None:
+        return jsonify({'message': 'User not found'}), 404
+    invalidate_user(user_id)
+    logger.info('User %s marked %s by %s', user_id, data.status, current_user['id'])
+    return jsonify({'user': dict(user)}), 200
@@ -0,0 +1,135 @@
+import os
+import queue
+import sqlite3
+from flask import current_app, g
+from metrics import timed
+
+DATABASE = os.environ.get('NAILTIME_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nailtime.db'))
+
+# Applied to every new connection. WAL lets readers run alongside a writer,
+# and synchronous=NORMAL is durable enough in WAL mode.
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -16000),        # KiB, i.e. 16 MB page cache per connection
+    ('mmap_size', 134217728),      # 128 MB
+    ('temp_store', 'MEMORY'),
+    ('foreign_keys', 'ON'),
+)
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        with timed('db'):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        with timed('db'):
+            return super().executemany(sql, seq_of_parameters)
+
+
+class TimedConnection(sqlite3.Connection):
+    # Every query and commit is recorded in the db phase histogram.
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def commit(self):
+        with timed('db'):
+            super().commit()
+
+
+class ConnectionPool:
+    # Keeps up to `size` idle connections. Each Flask app context borrows one
+    # through get_db() and returns it on teardown, so prepared statements
+    # (cached_statements) and the page cache survive across requests.
+
+    def __init__(self, path, size=8, pragmas=PRAGMAS, busy_timeout=5.0, cached_statements=256):
+        self.path = path
+        self.size = size
+        self.pragmas = pragmas
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue(maxsize=max(size, 1))
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                               cached_statements=self.cached_statements, check_same_thread=False,
+                               factory=TimedConnection)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas:
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def acquire(self):
+        if self.size:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+        return self.connect()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if self.size:
+            try:
+                self._idle.put_nowait(conn)
+                return
+            except queue.Full:
+                pass
+        conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def get_db():
+    # The connection belongs to the current app context; callers must not close it.
+    if 'db' not in g:
+        g.db = current_app.extensions['db_pool'].acquire()
+    return g.db
+
+
+def close_db(exc=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        current_app.extensions['db_pool'].release(conn)
+
+
+def init_db(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'active',
+            name_lower TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+
+
+def init_app(app):
+    app.config.setdefault('DATABASE', DATABASE)
+    app.config.setdefault('DB_POOL_SIZE', 8)
+    app.config.setdefault('DB_PRAGMAS', PRAGMAS)
+    pool = ConnectionPool(app.config['DATABASE'], app.config['DB_POOL_SIZE'], app.config['DB_PRAGMAS'])
+    app.extensions['db_pool'] = pool
+    app.teardown_appcontext(close_db)
+    conn = pool.connect()
+    try:
+        init_db(conn)
+    finally:
+        conn.close()
+    return pool
@@ -0,0 +1,20 @@
+# Build and warm the app once in the master, then fork the workers from it so
+# the model, NumPy and the schedule index are shared copy-on-write.
+import os
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+preload_app = True
+
+if os.environ.get('MICROBATCH_ENABLED', '0') == '1':
+    # Sync workers serve one request at a time, so the micro-batcher would
+    # never see two predictions at once; batching needs request threads.
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+
+def post_fork(server, worker):
+    from app import after_fork
+    from wsgi import app
+    after_fork(app)
@@ -0,0 +1,86 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from flask import current_app, jsonify
+from werkzeug.security import generate_password_hash, check_password_hash
+from metrics import timed
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class HashingService:
+    # Runs password hashing in a process pool so request threads only wait on a
+    # future. At most `max_pending` hashes may be queued or running; past that,
+    # callers get HashingBusy immediately instead of piling up behind the pool.
+    # workers=0 hashes inline on the request thread.
+
+    def __init__(self, method='scrypt', workers=2, max_pending=32, timeout=10.0):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        # e.g. 'scrypt:32768:8:1' - stored hashes with another prefix are rehashed on login
+        self.prefix = generate_password_hash('', method).split('$', 1)[0]
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _pool(self):
+        # Created on first use so each pre-forked server worker gets its own pool.
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(self.workers)
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            with timed('hashing'):
+                return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy('Password hashing queue is full')
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is freed when the job finishes, not when the caller stops
+        # waiting: a timed-out hash still occupies the pool
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            with timed('hashing'):
+                return future.result(self.timeout)
+        except TimeoutError:
+            raise HashingBusy('Password hashing timed out')
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.prefix
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+def init_app(app):
+    app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config.setdefault('HASH_WORKERS', 2)
+    app.config.setdefault('HASH_MAX_PENDING', 32)
+    service = HashingService(app.config['PASSWORD_HASH_METHOD'], app.config['HASH_WORKERS'],
+                             app.config['HASH_MAX_PENDING'])
+    app.extensions['hashing'] = service
+    return service
+
+
+def get_hasher():
+    return current_app.extensions['hashing']
+
+
+def busy_response():
+    return jsonify({'message': 'Server is busy, please try again'}), 503, {'Retry-After': '1'}
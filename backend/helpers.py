@@ -1,16 +1,21 @@
-import sqlite3
 import jwt
 from flask import current_app, request, jsonify
 from datetime import datetime, timedelta
 from functools import wraps
 import os
+import time
+from cache import TTLCache
+from db import get_db
 
-DATABASE = 'nailtime.db'
-
-def get_db():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Verified token payloads keyed by the full token (not just the signature, so a
+# tampered header or payload can never hit a cached entry), and user rows by id.
+# Both are per-process; invalidate_user() must be called whenever a user row
+# is updated or deleted, but it only reaches the worker that made the change.
+# Token payloads never change, while user rows do (status, role), so user rows
+# get a much shorter TTL (AUTH_USER_CACHE_TTL): the other workers pick up a
+# change, e.g. a deactivation, within that many seconds.
+token_cache = TTLCache(maxsize=10000, ttl=60)
+user_cache = TTLCache(maxsize=10000, ttl=5)
 
 def generate_token(user):
     token = jwt.encode({
@@ -22,6 +27,35 @@ def generate_token(user):
     }, current_app.config['SECRET_KEY'], algorithm='HS256')
     return token
 
+def invalidate_user(user_id):
+    user_cache.invalidate(user_id)
+
+def auth_cache_stats():
+    return {'tokens': token_cache.stats(), 'users': user_cache.stats()}
+
+def decode_token(token):
+    if not current_app.config.get('AUTH_CACHE_ENABLED', True):
+        return jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+    data = token_cache.get(token)
+    if data is None:
+        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+        # Never cache a payload past its own expiry
+        ttl = min(current_app.config.get('AUTH_CACHE_TTL', 60), data['exp'] - time.time())
+        token_cache.set(token, data, ttl)
+    return data
+
+def load_user(user_id):
+    cache_enabled = current_app.config.get('AUTH_CACHE_ENABLED', True)
+    user = user_cache.get(user_id) if cache_enabled else None
+    if user is None:
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute('SELECT * FROM users WHERE id = ?', (user_id,))
+        user = cur.fetchone()
+        if user is not None and cache_enabled:
+            user_cache.set(user_id, user, current_app.config.get('AUTH_USER_CACHE_TTL', 5))
+    return user
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -32,14 +66,13 @@ def token_required(f):
             return jsonify({'message': 'Token is missing'}), 401
         try:
             token = token.split(' ')[1]  # Remove 'Bearer ' prefix
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-            conn = get_db()
-            cur = conn.cursor()
-            cur.execute('SELECT * FROM users WHERE id = ?', (data['user_id'],))
-            current_user = cur.fetchone()
-            conn.close()
+            data = decode_token(token)
+            current_user = load_user(data['user_id'])
             if not current_user:
                 raise Exception('User not found')
+            if current_user['status'] != 'active':
+                # Deactivated by the owner; outstanding tokens stop working too
+                return jsonify({'message': 'Account is deactivated'}), 403
         except jwt.ExpiredSignatureError:
             return jsonify({'message': 'Token has expired'}), 401
         except jwt.InvalidTokenError:
@@ -0,0 +1,225 @@
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+FEATURES = ['length', 'colors', 'decorations', 'technique', 'service_type', 'complexity']
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ML')
+MODEL_PATH = os.path.join(MODEL_DIR, 'nail_model.bin')
+PICKLE_PATH = os.path.join(MODEL_DIR, 'nail_model.pkl')
+
+# Flat model file: a fixed preamble (magic, format version, header length),
+# a JSON header, then at a 64-byte aligned offset a little-endian float64
+# table of shape (models, features + 1), one row per model holding its
+# raw-feature weights followed by its bias, and right after it the model
+# names as a sorted fixed-width byte array. Both are memory-mapped, so even a
+# file with many thousands of per-worker models costs a process almost nothing
+# until it looks one up.
+FLAT_MAGIC = b'NTMF'
+FLAT_VERSION = 1
+FLAT_PREAMBLE = struct.Struct('<4sHHI')
+FLAT_ALIGN = 64
+
+
+def load_model(path=PICKLE_PATH):
+    import joblib
+    return joblib.load(path)
+
+
+def linear_weights(model):
+    # Folds the StandardScaler + LinearRegression pipeline from train_ml into a
+    # single (weights, bias) pair over the raw features.
+    # Returns None for models that are not linear in the raw features.
+    steps = getattr(model, 'steps', None)
+    if steps:
+        *preprocessing, (_, regressor) = steps
+    else:
+        preprocessing, regressor = [], model
+    if not hasattr(regressor, 'coef_'):
+        return None
+    weights = np.asarray(regressor.coef_, dtype=np.float64).ravel()
+    bias = float(np.ravel(regressor.intercept_)[0])
+    if len(preprocessing) > 1:
+        return None
+    if preprocessing:
+        transformer = preprocessing[0][1]
+        transformers = getattr(transformer, 'transformers_', None)
+        if transformers is None or len(transformers) != 1:
+            return None
+        _, scaler, columns = transformers[0]
+        if list(columns) != FEATURES or not hasattr(scaler, 'scale_'):
+            return None
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(len(FEATURES))
+        scale = scaler.scale_ if scaler.with_std else np.ones(len(FEATURES))
+        weights = weights / scale
+        bias -= float(np.dot(weights, mean))
+    if weights.shape != (len(FEATURES),):
+        return None
+    return weights, bias
+
+
+def feature_matrix(rows):
+    X = np.empty((len(rows), len(FEATURES)), dtype=np.float64)
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise ValueError(f'Item {i} is not an object')
+        try:
+            X[i] = [row[f] for f in FEATURES]
+        except KeyError as e:
+            # A missing feature is not a zero; callers validate rows first
+            raise ValueError(f'Item {i} is missing {e.args[0]}') from None
+    return X
+
+
+class CompiledPredictor:
+    # Array-backed linear model: one dot product per request, no pandas or
+    # sklearn validation on the hot path.
+    __slots__ = ('weights', 'bias', '_w')
+    # Cheaper to recompute than to look up in PredictionCache
+    cacheable = False
+
+    def __init__(self, weights, bias):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        # For six features a Python float loop beats a NumPy call.
+        self._w = tuple(float(w) for w in self.weights)
+
+    def predict_one(self, data):
+        total = self.bias
+        for w, f in zip(self._w, FEATURES):
+            total += w * float(data.get(f, 0))
+        return total
+
+    def predict_many(self, rows):
+        if not rows:
+            return np.empty(0)
+        return feature_matrix(rows) @ self.weights + self.bias
+
+
+class SklearnPredictor:
+    # Fallback for models linear_weights() cannot fold.
+    __slots__ = ('model',)
+    cacheable = True
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict_one(self, data):
+        return float(self.predict_many([data])[0])
+
+    def predict_many(self, rows):
+        if not rows:
+            return np.empty(0)
+        import pandas as pd
+        X = pd.DataFrame(feature_matrix(rows), columns=FEATURES)
+        return np.asarray(self.model.predict(X), dtype=np.float64)
+
+
+def compile_model(model):
+    weights = linear_weights(model)
+    if weights is None:
+        return SklearnPredictor(model)
+    return CompiledPredictor(*weights)
+
+
+def flat_offset(header_len):
+    return -(-(FLAT_PREAMBLE.size + header_len) // FLAT_ALIGN) * FLAT_ALIGN
+
+
+def write_flat(path, table, names=('default',), features=FEATURES, default=None, **meta):
+    names = [str(name) for name in names]
+    if len(set(names)) != len(names):
+        raise ValueError('Model names must be unique')
+    table = np.asarray(table, dtype='<f8').reshape(len(names), len(features) + 1)
+    encoded = np.array([name.encode() for name in names])
+    order = np.argsort(encoded, kind='stable')
+    encoded, table = encoded[order], table[order]
+    header = json.dumps(dict(meta, features=list(features), dtype='<f8', shape=list(table.shape),
+                             names_dtype=encoded.dtype.str, default=default or names[0],
+                             created_at=time.time())).encode()
+    offset = flat_offset(len(header))
+    # Write next to the target and rename over it: processes that have the old
+    # file mapped keep reading the old inode instead of seeing a torn table.
+    tmp = f'{path}.tmp{os.getpid()}'
+    with open(tmp, 'wb') as f:
+        f.write(FLAT_PREAMBLE.pack(FLAT_MAGIC, FLAT_VERSION, 0, len(header)))
+        f.write(header)
+        f.write(b'\0' * (offset - FLAT_PREAMBLE.size - len(header)))
+        f.write(table.tobytes())
+        f.write(encoded.tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+def is_flat(path):
+    with open(path, 'rb') as f:
+        return f.read(len(FLAT_MAGIC)) == FLAT_MAGIC
+
+
+class FlatModelFile:
+    # Read-only memory map of a flat model file. The pages belong to the OS
+    # page cache, so every worker process mapping the same file shares them.
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, version, _, header_len = FLAT_PREAMBLE.unpack(f.read(FLAT_PREAMBLE.size))
+            if magic != FLAT_MAGIC:
+                raise ValueError(f'{path} is not a flat model file')
+            if version > FLAT_VERSION:
+                raise ValueError(f'{path} uses format version {version}, this build reads up to {FLAT_VERSION}')
+            self.meta = json.loads(f.read(header_len))
+        features = self.meta['features']
+        if sorted(features) != sorted(FEATURES):
+            raise ValueError(f'{path} was trained on features {features}, expected {FEATURES}')
+        # Map the file's feature order onto FEATURES once
+        self.columns = [features.index(f) for f in FEATURES]
+        self.path = path
+        self.default = self.meta['default']
+        shape = tuple(self.meta['shape'])
+        offset = flat_offset(header_len)
+        self.table = np.memmap(path, dtype=self.meta['dtype'], mode='r', offset=offset, shape=shape)
+        self.names = np.memmap(path, dtype=self.meta['names_dtype'], mode='r',
+                               offset=offset + self.table.nbytes, shape=(shape[0],))
+
+    def __len__(self):
+        return len(self.names)
+
+    def find(self, name):
+        # Row index of `name` by binary search over the mapped names, or None
+        key = str(name).encode()
+        i = int(np.searchsorted(self.names, key))
+        return i if i < len(self.names) and self.names[i] == key else None
+
+    def __contains__(self, name):
+        return self.find(name) is not None
+
+    def predictor(self, name=None):
+        i = self.find(self.default if name is None else name)
+        if i is None:
+            raise KeyError(name)
+        row = self.table[i]
+        weights = row[:-1] if self.columns == list(range(len(FEATURES))) else row[self.columns]
+        return CompiledPredictor(weights, row[-1])
+
+
+def load_predictor(path=MODEL_PATH):
+    # Flat files are mapped, anything else is treated as a joblib pickle
+    if is_flat(path):
+        return FlatModelFile(path).predictor()
+    return compile_model(load_model(path))
+
+
+def parse_batch(request):
+    # Accepts either a JSON array of feature objects or an NDJSON body
+    # (one object per line, Content-Type: application/x-ndjson).
+    if request.mimetype in ('application/x-ndjson', 'application/jsonlines'):
+        lines = request.get_data(as_text=True).splitlines()
+        return [json.loads(line) for line in lines if line.strip()]
+    data = request.get_json()
+    if isinstance(data, dict):
+        data = data.get('items')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of feature objects')
+    return data
@@ -0,0 +1,34 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    # request.get_json() and jsonify() through orjson. Output matches the
+    # default provider: sorted keys, and anything orjson cannot encode natively
+    # (dates, Decimal, UUID, ...) goes through DefaultJSONProvider.default.
+    # NumPy scalars and arrays are encoded directly.
+    options = orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def dumps_bytes(self, obj):
+        return orjson.dumps(obj, default=self.default, option=self.options)
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+def init_app(app):
+    app.config.setdefault('JSON_ORJSON', True)
+    if orjson is not None and app.config['JSON_ORJSON']:
+        app.json = OrjsonProvider(app)
+    return app.json
@@ -0,0 +1,90 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    # The stock QueueHandler.prepare() formats the message on the calling
+    # thread. The queue never leaves the process, so hand over the record as
+    # is and let the listener thread do getMessage() and JSON encoding.
+    def prepare(self, record):
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    # Lets through a fraction of DEBUG/INFO records; warnings and errors always pass.
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+def parse_mapping(value, cast=str):
+    # "app=DEBUG,werkzeug=WARNING" -> {'app': 'DEBUG', 'werkzeug': 'WARNING'}
+    if not value:
+        return {}
+    if isinstance(value, dict):
+        return {k: cast(v) for k, v in value.items()}
+    pairs = (item.split('=', 1) for item in value.split(',') if '=' in item)
+    return {k.strip(): cast(v.strip()) for k, v in pairs}
+
+
+def configure_logging(app):
+    global _listener
+    app.config.setdefault('LOG_LEVEL', 'INFO')
+    app.config.setdefault('LOG_LEVELS', {})
+    app.config.setdefault('LOG_SAMPLING', {})
+    app.config.setdefault('LOG_FORMAT', 'json')
+
+    if _listener is not None:
+        _listener.stop()
+    handler = logging.StreamHandler(sys.stderr)
+    if app.config['LOG_FORMAT'] == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(app.config['LOG_LEVEL'])
+    for name, level in parse_mapping(app.config['LOG_LEVELS'], str.upper).items():
+        logging.getLogger(name).setLevel(level)
+    for name, rate in parse_mapping(app.config['LOG_SAMPLING'], float).items():
+        target = logging.getLogger(name)
+        for f in [f for f in target.filters if isinstance(f, SamplingFilter)]:
+            target.removeFilter(f)
+        target.addFilter(SamplingFilter(rate))
+    return _listener
+
+
+@atexit.register
+def _flush():
+    if _listener is not None:
+        _listener.stop()
@@ -0,0 +1,163 @@
+import bisect
+import cProfile
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from flask import Response, current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Registry:
+    # Metric families keyed by name, each holding one series per label tuple.
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.help = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, labels, help=''):
+        family = self.histograms.get(name)
+        if family is None:
+            with self._lock:
+                family = self.histograms.setdefault(name, {})
+                self.help.setdefault(name, help)
+        series = family.get(labels)
+        if series is None:
+            with self._lock:
+                series = family.setdefault(labels, Histogram())
+        return series
+
+    def inc(self, name, labels, help=''):
+        with self._lock:
+            family = self.counters.setdefault(name, {})
+            self.help.setdefault(name, help)
+            family[labels] = family.get(labels, 0) + 1
+
+    def render(self):
+        lines = []
+        for name, family in sorted(self.counters.items()):
+            lines.append(f'# HELP {name} {self.help[name]}')
+            lines.append(f'# TYPE {name} counter')
+            for labels, value in sorted(family.items()):
+                lines.append(f'{name}{format_labels(labels)} {value}')
+        for name, family in sorted(self.histograms.items()):
+            lines.append(f'# HELP {name} {self.help[name]}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, h in sorted(family.items()):
+                with h._lock:
+                    counts, total, count = list(h.counts), h.sum, h.count
+                cumulative = 0
+                for bound, n in zip(h.buckets + (float('inf'),), counts):
+                    cumulative += n
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{format_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} {total}')
+                lines.append(f'{name}_count{format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+registry = Registry()
+
+
+@contextmanager
+def timed(phase):
+    # Records time spent in a phase (db, hashing, inference) of the current request.
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.histogram('nailtime_phase_duration_seconds', (('phase', phase),),
+                           'Time spent in DB queries, password hashing and model inference').observe(
+            time.perf_counter() - start)
+
+
+_profile_lock = threading.Lock()
+
+
+def _start_request():
+    g.request_start = time.perf_counter()
+    if (current_app.config.get('PROFILING_ENABLED') and request.headers.get('X-Profile')
+            and _profile_lock.acquire(blocking=False)):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def _finish_request(response):
+    start = g.pop('request_start', None)
+    if start is None:
+        return response
+    duration = time.perf_counter() - start
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    registry.histogram('nailtime_request_duration_seconds', (('endpoint', endpoint), ('method', request.method)),
+                       'Request latency by endpoint').observe(duration)
+    registry.inc('nailtime_requests_total',
+                 (('endpoint', endpoint), ('method', request.method), ('status', str(response.status_code))),
+                 'Requests by endpoint and status')
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _profile_lock.release()
+        if duration * 1000 >= current_app.config.get('PROFILE_SLOW_MS', 100):
+            _dump_profile(profiler, endpoint, duration)
+    return response
+
+
+def _abort_profile(exc=None):
+    # after_request is skipped when a view raises; make sure the profiler stops
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _profile_lock.release()
+
+
+def _dump_profile(profiler, endpoint, duration):
+    directory = current_app.config.get('PROFILE_DIR', 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    name = endpoint.strip('/').replace('/', '_').replace('<', '').replace('>', '') or 'root'
+    path = os.path.join(directory, f'{name}-{int(time.time() * 1000)}.pstats')
+    profiler.dump_stats(path)
+    logger.info('Slow request to %s took %.1f ms, profile written to %s', endpoint, duration * 1000, path)
+
+
+def metrics_view():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    app.config.setdefault('PROFILING_ENABLED', False)
+    app.config.setdefault('PROFILE_SLOW_MS', 100)
+    app.config.setdefault('PROFILE_DIR', 'profiles')
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_abort_profile)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
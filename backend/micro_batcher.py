@@ -0,0 +1,136 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from flask import current_app, jsonify
+
+logger = logging.getLogger(__name__)
+
+
+class BatcherTimeout(Exception):
+    pass
+
+
+class MicroBatcher:
+    # Collects predictions from concurrent requests into one batch: the first
+    # request opens a window of `window` seconds, everything queued until it
+    # closes (or until `max_batch` items) is scored with one predict_many()
+    # per model, and each request thread waits on its own Future. A request
+    # that waits longer than `timeout` gets BatcherTimeout and its item is
+    # dropped from the batch if it has not been scored yet.
+
+    def __init__(self, window=0.002, max_batch=32, timeout=1.0):
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+        self.busy_ns = 0
+        self.timeouts = 0
+
+    def predict(self, model, data):
+        future = Future()
+        self._queue.put((model.predictor, data, future))
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            future.cancel()
+            self.timeouts += 1
+            raise BatcherTimeout('Prediction timed out')
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    # After the window, still take whatever is already queued
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._score(batch)
+                    return
+                batch.append(item)
+            self._score(batch)
+
+    def _score(self, batch):
+        start = time.perf_counter_ns()
+        groups = {}
+        for predictor, data, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            groups.setdefault(id(predictor), (predictor, []))[1].append((data, future))
+        for predictor, items in groups.values():
+            try:
+                values = predictor.predict_many([data for data, _ in items])
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), value in zip(items, values):
+                future.set_result(float(value))
+        self.busy_ns += time.perf_counter_ns() - start
+        self.batches += 1
+        self.items += len(batch)
+        self.largest = max(self.largest, len(batch))
+
+    def stats(self):
+        return {
+            'window_ms': self.window * 1000,
+            'max_batch': self.max_batch,
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch': self.items / self.batches if self.batches else 0.0,
+            'largest_batch': self.largest,
+            'avg_score_us': self.busy_ns / self.batches / 1000 if self.batches else 0.0,
+            'timeouts': self.timeouts,
+        }
+
+
+def init_app(app):
+    app.config.setdefault('MICROBATCH_ENABLED', False)
+    app.config.setdefault('MICROBATCH_WINDOW_MS', 2.0)
+    app.config.setdefault('MICROBATCH_MAX_SIZE', 32)
+    app.config.setdefault('MICROBATCH_TIMEOUT', 1.0)
+    if not app.config['MICROBATCH_ENABLED']:
+        app.extensions['micro_batcher'] = None
+        return None
+    batcher = MicroBatcher(app.config['MICROBATCH_WINDOW_MS'] / 1000, app.config['MICROBATCH_MAX_SIZE'],
+                           app.config['MICROBATCH_TIMEOUT'])
+    batcher.start()
+    atexit.register(batcher.stop)
+    app.extensions['micro_batcher'] = batcher
+    return batcher
+
+
+def get_batcher():
+    return current_app.extensions.get('micro_batcher')
+
+
+def timeout_response():
+    return jsonify({'message': 'Prediction timed out, please try again'}), 503, {'Retry-After': '1'}
@@ -0,0 +1,113 @@
+import logging
+import os
+import threading
+import time
+
+from flask import current_app
+
+from cache import TTLCache
+from inference import MODEL_DIR, FlatModelFile
+from model_registry import ModelVersion, file_version
+
+logger = logging.getLogger(__name__)
+
+PERSONAL_MODELS_PATH = os.path.join(MODEL_DIR, 'personal_models.bin')
+
+# Cached for names the file has no model for, so a miss is not searched again
+_MISSING = object()
+
+
+def scopes(worker_id=None, salon_id=None):
+    # Most specific first; the global model is the caller's fallback
+    if worker_id not in (None, ''):
+        yield f'worker:{int(worker_id)}'
+    if salon_id not in (None, ''):
+        yield f'salon:{int(salon_id)}'
+
+
+class ModelPool:
+    # Per-worker and per-salon linear models from one flat model file
+    # (ML/train_personal.py). The file is memory-mapped, and a predictor is only
+    # built the first time its name is asked for; at most `maxsize` of them are
+    # kept, least recently used first out. The file is re-opened when it changes.
+
+    def __init__(self, path=PERSONAL_MODELS_PATH, maxsize=1024, check_interval=5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._cache = TTLCache(maxsize, ttl=float('inf'))
+        # (file, version), swapped as one so readers never mix the two
+        self._current = (None, None)
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = None
+            if mtime == self._mtime:
+                return
+            flat = version = None
+            if mtime is not None:
+                try:
+                    flat, version = FlatModelFile(self.path), file_version(self.path)
+                except (OSError, ValueError):
+                    logger.exception('Could not open personal models from %s', self.path)
+            self._current, self._mtime = (flat, version), mtime
+            self._cache.clear()
+            if flat is not None:
+                logger.info('Personal models %s opened from %s (%d models)', version, self.path, len(flat))
+
+    def get(self, name):
+        self._refresh()
+        flat, version = self._current
+        # Keyed by file version: a model built from the previous file just
+        # before a swap cannot be served once the new file is in place
+        key = (version, name)
+        model = self._cache.get(key)
+        if model is None:
+            model = _MISSING
+            if flat is not None and name in flat:
+                model = ModelVersion(flat.predictor(name), version, self.path, None, scope=name)
+            self._cache.set(key, model)
+        return None if model is _MISSING else model
+
+    def resolve(self, worker_id=None, salon_id=None):
+        # First personal model in the worker -> salon hierarchy, or None
+        for name in scopes(worker_id, salon_id):
+            model = self.get(name)
+            if model is not None:
+                return model
+        return None
+
+    def stats(self):
+        stats = self._cache.stats()
+        flat, stats['version'] = self._current
+        stats['models'] = len(flat) if flat is not None else 0
+        return stats
+
+
+def init_app(app):
+    app.config.setdefault('PERSONAL_MODELS_PATH', PERSONAL_MODELS_PATH)
+    app.config.setdefault('MODEL_POOL_SIZE', 1024)
+    app.config.setdefault('MODEL_POOL_CHECK_INTERVAL', 5.0)
+    pool = ModelPool(app.config['PERSONAL_MODELS_PATH'], app.config['MODEL_POOL_SIZE'],
+                     app.config['MODEL_POOL_CHECK_INTERVAL'])
+    app.extensions['model_pool'] = pool
+    return pool
+
+
+def get_model_pool():
+    return current_app.extensions['model_pool']
+
+
+def select_model(worker_id=None, salon_id=None):
+    # Personal model if there is one, otherwise the live global model
+    return current_app.extensions['model_pool'].resolve(worker_id, salon_id) or \
+        current_app.extensions['model_registry'].current()
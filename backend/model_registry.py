@@ -0,0 +1,174 @@
+import csv
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from flask import current_app
+
+from inference import MODEL_PATH, load_predictor
+
+logger = logging.getLogger(__name__)
+
+HOLDOUT_PATH = os.path.join(os.path.dirname(MODEL_PATH), 'nail_time.csv')
+
+
+class ModelValidationError(Exception):
+    pass
+
+
+class ModelVersion:
+    __slots__ = ('predictor', 'version', 'path', 'loaded_at', 'holdout_mse', 'scope')
+
+    def __init__(self, predictor, version, path, holdout_mse, scope='global'):
+        self.predictor = predictor
+        self.version = version
+        self.path = path
+        self.loaded_at = time.time()
+        self.holdout_mse = holdout_mse
+        self.scope = scope
+
+    def to_dict(self):
+        return {
+            'scope': self.scope,
+            'version': self.version,
+            'path': self.path,
+            'loaded_at': self.loaded_at,
+            'holdout_mse': self.holdout_mse,
+        }
+
+
+def file_version(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def load_holdout(path=HOLDOUT_PATH, fraction=0.2):
+    with open(path, newline='') as f:
+        rows = [{k: float(v) for k, v in row.items()} for row in csv.DictReader(f)]
+    rows = rows[-max(1, int(len(rows) * fraction)):]
+    return rows, np.array([row['time'] for row in rows])
+
+
+class ModelRegistry:
+    # Holds the live model. Readers call current() once per request and keep the
+    # returned ModelVersion, so a concurrent swap never changes a model mid-request.
+
+    def __init__(self, path=MODEL_PATH, holdout_path=HOLDOUT_PATH, holdout_fraction=0.2, max_holdout_mse=None):
+        self.path = path
+        self.holdout_path = holdout_path
+        self.holdout_fraction = holdout_fraction
+        self.max_holdout_mse = max_holdout_mse
+        self._current = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self._mtime = None
+        self._holdout_cache = None
+
+    def current(self):
+        current = self._current
+        if current is None:
+            # Not preloaded (MODEL_PRELOAD off): the first request pays for unpickling
+            current = self.reload()
+        return current
+
+    def _holdout(self):
+        # Re-read only when the CSV changes; install() may run every few minutes
+        mtime = os.path.getmtime(self.holdout_path)
+        if self._holdout_cache is None or self._holdout_cache[0] != mtime:
+            self._holdout_cache = (mtime, load_holdout(self.holdout_path, self.holdout_fraction))
+        return self._holdout_cache[1]
+
+    def _validate(self, predictor, max_mse=None):
+        rows, y = self._holdout()
+        error = predictor.predict_many(rows) - y
+        mse = float(error @ error / len(y))
+        if not np.isfinite(mse):
+            raise ModelValidationError('Model produces non-finite predictions on the holdout set')
+        for limit in (self.max_holdout_mse, max_mse):
+            if limit is not None and mse > limit:
+                raise ModelValidationError(f'Holdout MSE {mse:.2f} exceeds limit {limit:.2f}')
+        return mse
+
+    def reload(self, force=False):
+        with self._reload_lock:
+            self._mtime = os.path.getmtime(self.path)
+            version = file_version(self.path)
+            current = self._current
+            if current is not None and current.version == version and not force:
+                return current
+            predictor = load_predictor(self.path)
+            mse = self._validate(predictor)
+            # Single reference assignment: requests see either the old or the new model.
+            self._current = ModelVersion(predictor, version, self.path, mse)
+            logger.info('Model %s loaded from %s (holdout MSE %.2f)', version, self.path, mse)
+            return self._current
+
+    def install(self, predictor, version, path, max_mse=None):
+        # Swaps in a model built in memory (a promoted online model) after the
+        # same holdout validation reload() applies to model files; `max_mse`
+        # is an extra cap on top of max_holdout_mse.
+        with self._reload_lock:
+            mse = self._validate(predictor, max_mse)
+            self._current = ModelVersion(predictor, version, path, mse)
+            logger.info('Model %s installed from %s (holdout MSE %.2f)', version, path, mse)
+            return self._current
+
+    def reload_async(self):
+        thread = threading.Thread(target=self._reload_logged, name='model-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def _reload_logged(self):
+        try:
+            self.reload()
+        except Exception:
+            logger.exception('Model reload from %s failed, keeping version %s',
+                             self.path, self._current.version if self._current else None)
+
+    def watch(self, interval=5.0):
+        if self._watcher is not None:
+            return self._watcher
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    mtime = os.path.getmtime(self.path)
+                except OSError:
+                    continue
+                if mtime != self._mtime:
+                    self._reload_logged()
+
+        self._watcher = threading.Thread(target=run, name='model-watcher', daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop(self):
+        self._stop.set()
+        self._watcher = None
+
+
+def init_app(app):
+    registry = ModelRegistry(
+        path=app.config.get('MODEL_PATH', MODEL_PATH),
+        max_holdout_mse=app.config.get('MODEL_MAX_HOLDOUT_MSE'),
+    )
+    app.config.setdefault('MODEL_PRELOAD', True)
+    if app.config['MODEL_PRELOAD']:
+        registry.reload()
+    interval = app.config.get('MODEL_WATCH_INTERVAL')
+    if interval:
+        registry.watch(interval)
+    app.extensions['model_registry'] = registry
+    return registry
+
+
+def get_registry():
+    return current_app.extensions['model_registry']
@@ -0,0 +1,295 @@
+import atexit
+import collections
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no pre-forking server, one process anyway
+    fcntl = None
+
+import numpy as np
+from flask import current_app
+
+from inference import FEATURES, MODEL_DIR, CompiledPredictor, FlatModelFile, is_flat, write_flat
+from model_registry import ModelValidationError
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = os.path.join(MODEL_DIR, 'online_model.bin')
+
+
+class RollingMean:
+    # Mean of the last `window` values, kept as a running sum.
+    __slots__ = ('values', 'total')
+
+    def __init__(self, window):
+        self.values = collections.deque(maxlen=window)
+        self.total = 0.0
+
+    def add(self, value):
+        if len(self.values) == self.values.maxlen:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+    def mean(self):
+        return self.total / len(self.values) if self.values else None
+
+    def clear(self):
+        self.values.clear()
+        self.total = 0.0
+
+    def __len__(self):
+        return len(self.values)
+
+
+class RLSModel:
+    # Recursive least squares over the raw features plus a bias term; `x`
+    # arguments carry a trailing 1.0. Each update is O(d^2) for d = 7, and
+    # `forgetting` < 1 discounts old samples so the weights can follow a
+    # technician who gets faster over time.
+    __slots__ = ('w', 'P', 'forgetting', 'updates')
+
+    def __init__(self, weights, bias, initial_variance=1.0, forgetting=0.999, covariance=None):
+        self.w = np.append(np.asarray(weights, dtype=np.float64), float(bias))
+        self.P = (np.asarray(covariance, dtype=np.float64) if covariance is not None
+                  else np.eye(len(self.w)) * initial_variance)
+        self.forgetting = forgetting
+        self.updates = 0
+
+    def predict(self, x):
+        return float(self.w @ x)
+
+    def update(self, x, y):
+        Px = self.P @ x
+        gain = Px / (self.forgetting + x @ Px)
+        self.w += gain * (y - self.w @ x)
+        self.P -= np.outer(gain, Px)
+        self.P /= self.forgetting
+        self.updates += 1
+
+    def predictor(self):
+        return CompiledPredictor(self.w[:-1].copy(), self.w[-1])
+
+
+class OnlineLearner:
+    # Shadow model fed with completed appointments. submit() only enqueues, so
+    # the request path never waits on training; a daemon thread scores each
+    # sample against both the live and the shadow model before learning from
+    # it (prequential error), snapshots the shadow every `snapshot_interval`
+    # seconds and, with `auto_promote`, promotes it when its rolling MSE beats
+    # the live model's by `promote_margin` over at least `min_samples` samples
+    # and its holdout MSE is at most `max_holdout_ratio` times the live model's.
+    #
+    # With several worker processes only one of them learns: the first to
+    # take an exclusive lock on `<snapshot_path>.lock`. The others drop their
+    # samples (counted in stats()), so there is one shadow model and one
+    # writer of the snapshot. Promotion swaps the model in the owning process
+    # only, which is why auto_promote is off by default; with several workers,
+    # promote by writing the snapshot as the model file and reloading.
+
+    def __init__(self, registry, snapshot_path=SNAPSHOT_PATH, window=200, min_samples=50,
+                 promote_margin=0.1, snapshot_interval=300.0, auto_promote=False, max_queue=10000,
+                 forgetting=0.999, initial_variance=1.0, max_holdout_ratio=1.5):
+        self.registry = registry
+        self.snapshot_path = snapshot_path
+        self.max_holdout_ratio = max_holdout_ratio
+        self.min_samples = min_samples
+        self.promote_margin = promote_margin
+        self.snapshot_interval = snapshot_interval
+        self.auto_promote = auto_promote
+        self.forgetting = forgetting
+        self.initial_variance = initial_variance
+        self.live_errors = RollingMean(window)
+        self.shadow_errors = RollingMean(window)
+        self.shadow = None
+        self.dropped = 0
+        self.not_owner = 0
+        self.promotions = 0
+        self.update_ns = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        # Taken lazily by the thread, so a pre-fork master never holds the lock
+        self._lock_file = None
+        self._owner = False
+        # Held while the shadow changes; promote() may also run on a request thread
+        self._lock = threading.RLock()
+        self._last_snapshot = time.monotonic()
+
+    def submit(self, features, actual):
+        try:
+            self._queue.put_nowait((features, float(actual)))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def owns_learning(self):
+        # Non-blocking, so a worker can take over when the owner exits
+        if self._owner:
+            return True
+        if not self.snapshot_path or fcntl is None:
+            self._owner = True
+            return True
+        lock_file = open(self.snapshot_path + '.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        self._owner = True
+        logger.info('Online learning runs in process %d', os.getpid())
+        return True
+
+    def _init_shadow(self):
+        if self.snapshot_path and os.path.exists(self.snapshot_path) and is_flat(self.snapshot_path):
+            flat = FlatModelFile(self.snapshot_path)
+            predictor = flat.predictor()
+            self.shadow = RLSModel(predictor.weights, predictor.bias, forgetting=self.forgetting,
+                                   covariance=flat.meta.get('covariance'))
+            self.shadow.updates = flat.meta.get('updates', 0)
+            logger.info('Online model resumed from %s after %d updates', self.snapshot_path, self.shadow.updates)
+            return
+        predictor = self.registry.current().predictor
+        if not isinstance(predictor, CompiledPredictor):
+            raise TypeError('Online learning needs a linear live model')
+        self.shadow = RLSModel(predictor.weights, predictor.bias, self.initial_variance, self.forgetting)
+
+    def learn(self, features, actual):
+        with self._lock:
+            start = time.perf_counter_ns()
+            if self.shadow is None:
+                self._init_shadow()
+            x = np.array([float(features.get(f, 0)) for f in FEATURES] + [1.0])
+            live = self.registry.current().predictor.predict_one(features)
+            self.live_errors.add((live - actual) ** 2)
+            self.shadow_errors.add((self.shadow.predict(x) - actual) ** 2)
+            self.shadow.update(x, actual)
+            self.update_ns += time.perf_counter_ns() - start
+            if self.auto_promote and self.should_promote():
+                self.promote()
+            if self.snapshot_path and time.monotonic() - self._last_snapshot >= self.snapshot_interval:
+                self.snapshot()
+
+    def rolling_mse(self):
+        return self.live_errors.mean(), self.shadow_errors.mean()
+
+    def should_promote(self):
+        if len(self.shadow_errors) < self.min_samples:
+            return False
+        live, shadow = self.rolling_mse()
+        return shadow < live * (1 - self.promote_margin)
+
+    def snapshot(self):
+        with self._lock:
+            self._last_snapshot = time.monotonic()
+            live, shadow = self.rolling_mse()
+            write_flat(self.snapshot_path, self.shadow.w[None, :], ['online'], updates=self.shadow.updates,
+                       covariance=self.shadow.P.tolist(), rolling_mse=shadow, live_rolling_mse=live)
+            return self.snapshot_path
+
+    def promote(self):
+        with self._lock:
+            version = 'online-' + hashlib.sha256(self.shadow.w.tobytes()).hexdigest()[:12]
+            live, shadow = self.rolling_mse()
+            current = self.registry.current()
+            max_mse = None
+            if self.max_holdout_ratio is not None and current.holdout_mse is not None:
+                # Recent completions may say one thing; the holdout set still has to agree
+                max_mse = current.holdout_mse * self.max_holdout_ratio
+            try:
+                self.registry.install(self.shadow.predictor(), version, self.snapshot_path or 'online', max_mse)
+            except ModelValidationError as e:
+                logger.warning('Online model not promoted: %s', e)
+                version = None
+            else:
+                logger.info('Online model %s promoted after %d updates (rolling MSE %s vs %s)',
+                            version, self.shadow.updates, shadow, live)
+                self.promotions += 1
+                if self.snapshot_path:
+                    self.snapshot()
+            # Either way, compare the next window afresh
+            self.live_errors.clear()
+            self.shadow_errors.clear()
+            return version
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                if self.owns_learning():
+                    self.learn(*item)
+                else:
+                    self.not_owner += 1
+            except Exception:
+                logger.exception('Online model update failed')
+            finally:
+                self._queue.task_done()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='online-learner', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self, snapshot=True):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if snapshot and self.shadow is not None and self.snapshot_path and self._owner:
+            self.snapshot()
+
+    def stats(self):
+        live, shadow = self.rolling_mse()
+        return {
+            'updates': self.shadow.updates if self.shadow is not None else 0,
+            'pending': self._queue.qsize(),
+            'dropped': self.dropped,
+            'not_owner': self.not_owner,
+            'promotions': self.promotions,
+            'live_rolling_mse': live,
+            'shadow_rolling_mse': shadow,
+            'window': len(self.shadow_errors),
+            'avg_update_us': self.update_ns / self.shadow.updates / 1000 if self.shadow and self.shadow.updates else 0.0,
+        }
+
+
+def init_app(app):
+    app.config.setdefault('ONLINE_LEARNING', True)
+    app.config.setdefault('ONLINE_AUTO_PROMOTE', False)
+    app.config.setdefault('ONLINE_MAX_HOLDOUT_RATIO', 1.5)
+    app.config.setdefault('ONLINE_SNAPSHOT_PATH', SNAPSHOT_PATH)
+    app.config.setdefault('ONLINE_SNAPSHOT_INTERVAL', 300.0)
+    app.config.setdefault('ONLINE_WINDOW', 200)
+    app.config.setdefault('ONLINE_MIN_SAMPLES', 50)
+    app.config.setdefault('ONLINE_PROMOTE_MARGIN', 0.1)
+    if not app.config['ONLINE_LEARNING']:
+        app.extensions['online_learner'] = None
+        return None
+    learner = OnlineLearner(
+        app.extensions['model_registry'],
+        snapshot_path=app.config['ONLINE_SNAPSHOT_PATH'],
+        window=app.config['ONLINE_WINDOW'],
+        min_samples=app.config['ONLINE_MIN_SAMPLES'],
+        promote_margin=app.config['ONLINE_PROMOTE_MARGIN'],
+        snapshot_interval=app.config['ONLINE_SNAPSHOT_INTERVAL'],
+        auto_promote=app.config['ONLINE_AUTO_PROMOTE'],
+        max_holdout_ratio=app.config['ONLINE_MAX_HOLDOUT_RATIO'],
+    )
+    learner.start()
+    atexit.register(learner.stop)
+    app.extensions['online_learner'] = learner
+    return learner
+
+
+def get_learner():
+    return current_app.extensions.get('online_learner')
@@ -0,0 +1,313 @@
+import atexit
+import logging
+import random
+import smtplib
+import threading
+import time
+from datetime import timedelta
+from email.message import EmailMessage
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+CONFIRMATION_SUBJECT = 'Потвърждение на час за {service}'
+CONFIRMATION_BODY = 'Здравейте, {name}!\n\nЗаписахме Ви за {service} на {date} в {time} ч.\n\nNailTime'
+REMINDER_SUBJECT = 'Напомняне: {service} на {date} в {time} ч.'
+REMINDER_BODY = 'Здравейте, {name}!\n\nНапомняме Ви за часа Ви за {service} на {date} в {time} ч.\n\nNailTime'
+
+
+def init_schema(conn):
+    # send_at and locked_until are Unix timestamps. A sender claims a batch by
+    # pushing locked_until into the future, so two processes never send the
+    # same row and a batch claimed by a crashed process is retried once the
+    # lease runs out.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            appointment_id INTEGER REFERENCES appointments(id),
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            send_at REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            locked_until REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            sent_at REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON email_outbox (send_at) WHERE status = 'pending'")
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_appointment ON email_outbox (appointment_id)')
+    conn.commit()
+
+
+def enqueue(conn, recipient, subject, body, send_at=None, kind='message'):
+    # One INSERT on the caller's connection; the caller commits
+    conn.execute('INSERT INTO email_outbox (kind, recipient, subject, body, send_at) VALUES (?, ?, ?, ?, ?)',
+                 (kind, recipient, subject, body, time.time() if send_at is None else send_at))
+
+
+def queue_booking(conn, appointment_id, start, service, reminder_before=timedelta(hours=24)):
+    # Confirmation now and a reminder `reminder_before` the appointment, as a
+    # single INSERT ... SELECT that reads the client's name and address itself.
+    # No rows for appointments without a client; no reminder if it is already due.
+    # service comes from the booking request and ends up in a header
+    service = ' '.join(str(service).splitlines())
+    fields = {'service': service, 'date': start.strftime('%d.%m.%Y'), 'time': start.strftime('%H:%M'), 'name': '{name}'}
+    now = time.time()
+    remind_at = (start - reminder_before).timestamp()
+    conn.execute('''
+        INSERT INTO email_outbox (kind, appointment_id, recipient, subject, body, send_at)
+        SELECT m.kind, a.id, c.email, m.subject, replace(m.body, '{name}', c.name), m.send_at
+        FROM appointments a
+        JOIN users c ON c.id = a.client_id
+        JOIN (SELECT 'confirmation' AS kind, ? AS subject, ? AS body, ? AS send_at
+              UNION ALL SELECT 'reminder', ?, ?, ?) m
+        WHERE a.id = ? AND m.send_at IS NOT NULL
+    ''', (CONFIRMATION_SUBJECT.format(**fields), CONFIRMATION_BODY.format(**fields), now,
+          REMINDER_SUBJECT.format(**fields), REMINDER_BODY.format(**fields), remind_at if remind_at > now else None,
+          appointment_id))
+
+
+def cancel_booking(conn, appointment_id):
+    conn.execute("UPDATE email_outbox SET status = 'cancelled' WHERE appointment_id = ? AND status = 'pending'",
+                 (appointment_id,))
+
+
+def backoff(attempts, base=30.0, cap=3600.0):
+    # Exponential with full jitter, so a dead server is not hit in lockstep
+    return random.uniform(0, min(cap, base * 2 ** (attempts - 1)))
+
+
+class SMTPConnection:
+    # One SMTP session reused for every message until it fails or goes idle.
+
+    def __init__(self, host, port, use_tls=False, username=None, password=None, timeout=10.0):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self._smtp = None
+        self.connects = 0
+
+    def open(self):
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                smtp.starttls()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+            self._smtp = smtp
+            self.connects += 1
+        return self._smtp
+
+    def send(self, message):
+        try:
+            self.open().send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped an idle session; retry once on a fresh one
+            self.close()
+            self.open().send_message(message)
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+
+def is_permanent(error):
+    # 5xx replies will not succeed on retry
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class OutboxSender:
+    # Background thread that claims due rows in batches, sends them over one
+    # reused SMTP connection and records the outcome of the whole batch in one
+    # transaction. Failed messages are retried with backoff until
+    # `max_attempts`; permanent (5xx) failures are not retried.
+
+    def __init__(self, pool, connection, sender, batch_size=50, interval=5.0, max_attempts=5,
+                 backoff_base=30.0, backoff_cap=3600.0, lease=300.0):
+        self.pool = pool
+        self.connection = connection
+        self.sender = sender
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.lease = lease
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+
+    def claim(self, conn, now):
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute('''
+                UPDATE email_outbox SET locked_until = ?
+                WHERE id IN (SELECT id FROM email_outbox
+                             WHERE status = 'pending' AND send_at <= ? AND locked_until <= ?
+                             ORDER BY send_at LIMIT ?)
+                RETURNING id, recipient, subject, body, attempts
+            ''', (now + self.lease, now, now, self.batch_size)).fetchall()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return rows
+
+    def message(self, row):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = row['recipient']
+        message['Subject'] = row['subject']
+        message.set_content(row['body'])
+        return message
+
+    def send_batch(self, conn):
+        # Returns the number of rows handled; 0 means nothing is due
+        now = time.time()
+        rows = self.claim(conn, now)
+        if not rows:
+            return 0
+        sent, retry, failed, released = [], [], [], []
+        for index, row in enumerate(rows):
+            try:
+                self.connection.send(self.message(row))
+                sent.append((time.time(), row['id']))
+            except (ValueError, TypeError) as e:
+                # The row cannot be turned into a message (e.g. a newline in a
+                # header); it will never send, so fail it and go on
+                failed.append((row['attempts'] + 1, f'Invalid message: {e}', row['id']))
+            except (smtplib.SMTPException, OSError) as e:
+                attempts = row['attempts'] + 1
+                if is_permanent(e) or attempts >= self.max_attempts:
+                    failed.append((attempts, str(e), row['id']))
+                else:
+                    retry.append((attempts, str(e), now + backoff(attempts, self.backoff_base, self.backoff_cap),
+                                  row['id']))
+                if not isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                    # Connection-level error: drop the session, keep the rest for the next round
+                    self.connection.close()
+                    released = [(row['id'],) for row in rows[index + 1:]]
+                    break
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany("UPDATE email_outbox SET status = 'sent', sent_at = ?, locked_until = 0 WHERE id = ?",
+                             sent)
+            conn.executemany('UPDATE email_outbox SET attempts = ?, last_error = ?, send_at = ?, locked_until = 0 '
+                             'WHERE id = ?', retry)
+            conn.executemany("UPDATE email_outbox SET status = 'failed', attempts = ?, last_error = ?, "
+                             "locked_until = 0 WHERE id = ?", failed)
+            conn.executemany('UPDATE email_outbox SET locked_until = 0 WHERE id = ?', released)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self.sent += len(sent)
+        self.retried += len(retry)
+        self.failed += len(failed)
+        self.batches += 1
+        if failed:
+            logger.warning('Outbox: %d message(s) failed permanently, last error: %s', len(failed), failed[-1][1])
+        # Short of a full batch after a connection error, so drain() waits for the next round
+        return len(rows) - len(released)
+
+    def drain(self):
+        # Sends everything that is due now; used by the thread and by benchmarks
+        conn = self.pool.connect()
+        try:
+            total = 0
+            while not self._stop.is_set():
+                claimed = self.send_batch(conn)
+                total += claimed
+                if claimed < self.batch_size:
+                    return total
+            return total
+        finally:
+            conn.close()
+
+    def notify(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.drain()
+            except Exception:
+                logger.exception('Outbox sender failed, retrying in %.0f s', self.interval)
+            finally:
+                # Idle SMTP sessions get dropped by servers anyway
+                self.connection.close()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='outbox-sender', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        conn = self.pool.connect()
+        try:
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM email_outbox GROUP BY status').fetchall())
+        finally:
+            conn.close()
+        return {'sent': self.sent, 'retried': self.retried, 'failed': self.failed, 'batches': self.batches,
+                'smtp_connects': self.connection.connects, 'outbox': counts}
+
+
+def init_app(app):
+    app.config.setdefault('MAIL_SENDER_ENABLED', False)
+    app.config.setdefault('MAIL_BATCH_SIZE', 50)
+    app.config.setdefault('MAIL_POLL_INTERVAL', 5.0)
+    app.config.setdefault('MAIL_MAX_ATTEMPTS', 5)
+    app.config.setdefault('MAIL_REMINDER_HOURS', 24)
+    pool = app.extensions['db_pool']
+    conn = pool.connect()
+    try:
+        init_schema(conn)
+    finally:
+        conn.close()
+    if not app.config['MAIL_SENDER_ENABLED']:
+        # Bookings are still queued; another process (or a later start) sends them
+        app.extensions['outbox_sender'] = None
+        return None
+    connection = SMTPConnection(app.config['MAIL_SERVER'], app.config['MAIL_PORT'],
+                                app.config.get('MAIL_USE_TLS', False), app.config.get('MAIL_USERNAME'),
+                                app.config.get('MAIL_PASSWORD'))
+    sender = OutboxSender(pool, connection, app.config['MAIL_DEFAULT_SENDER'], app.config['MAIL_BATCH_SIZE'],
+                          app.config['MAIL_POLL_INTERVAL'], app.config['MAIL_MAX_ATTEMPTS'])
+    sender.start()
+    atexit.register(sender.stop)
+    app.extensions['outbox_sender'] = sender
+    return sender
+
+
+def get_sender():
+    return current_app.extensions.get('outbox_sender')
@@ -0,0 +1,98 @@
+import csv
+import itertools
+import time
+
+from flask import current_app
+
+from cache import TTLCache
+from inference import FEATURES
+from model_registry import HOLDOUT_PATH
+
+
+def feature_key(data):
+    # 30 and 30.0 must hit the same entry
+    return tuple(float(data.get(f, 0)) for f in FEATURES)
+
+
+def observed_space(path=HOLDOUT_PATH):
+    # Distinct values of each feature in the training data
+    values = {f: set() for f in FEATURES}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            for name in FEATURES:
+                values[name].add(float(row[name]))
+    return {name: sorted(v) for name, v in values.items()}
+
+
+class PredictionCache:
+    # LRU memo of predict_one() keyed by (model version, normalized feature
+    # tuple), so a request still scoring with the previous model can never
+    # store a value that is later served for the new one. The old version's
+    # entries are dropped as soon as a request sees a different version.
+    # Predictors that are not `cacheable` (a compiled linear model costs
+    # about as much as the lookup) bypass the cache entirely.
+
+    def __init__(self, maxsize=4096):
+        self._cache = TTLCache(maxsize, ttl=float('inf'))
+        self.version = None
+        self.hit_ns = 0
+        self.miss_ns = 0
+
+    def _check_version(self, model):
+        if model.version != self.version:
+            self._cache.clear()
+            self.version = model.version
+
+    def predict(self, model, data, batcher=None):
+        # With a MicroBatcher, misses are scored in a shared batch
+        if not model.predictor.cacheable:
+            return batcher.predict(model, data) if batcher else model.predictor.predict_one(data)
+        start = time.perf_counter_ns()
+        self._check_version(model)
+        features = feature_key(data)
+        key = (model.version, features)
+        value = self._cache.get(key)
+        if value is not None:
+            self.hit_ns += time.perf_counter_ns() - start
+            return value
+        row = dict(zip(FEATURES, features))
+        value = batcher.predict(model, row) if batcher else model.predictor.predict_one(row)
+        self._cache.set(key, value)
+        self.miss_ns += time.perf_counter_ns() - start
+        return value
+
+    def warm(self, model, space=None):
+        # Precomputes the whole grid of a bounded feature space in one batch.
+        space = space or observed_space()
+        size = 1
+        for name in FEATURES:
+            size *= len(space[name])
+        if size > self._cache.maxsize:
+            return 0
+        self._check_version(model)
+        keys = list(itertools.product(*(space[name] for name in FEATURES)))
+        values = model.predictor.predict_many([dict(zip(FEATURES, key)) for key in keys])
+        for key, value in zip(keys, values):
+            self._cache.set((model.version, key), float(value))
+        return len(keys)
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats['version'] = self.version
+        stats['avg_hit_us'] = self.hit_ns / stats['hits'] / 1000 if stats['hits'] else 0.0
+        stats['avg_miss_us'] = self.miss_ns / stats['misses'] / 1000 if stats['misses'] else 0.0
+        return stats
+
+
+def init_app(app):
+    app.config.setdefault('PREDICTION_CACHE_SIZE', 4096)
+    app.config.setdefault('PREDICTION_CACHE_WARM', False)
+    cache = PredictionCache(app.config['PREDICTION_CACHE_SIZE'])
+    if app.config['PREDICTION_CACHE_WARM']:
+        cache.warm(app.extensions['model_registry'].current())
+    app.extensions['prediction_cache'] = cache
+    return cache
+
+
+def get_prediction_cache():
+    return current_app.extensions['prediction_cache']
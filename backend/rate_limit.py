@@ -0,0 +1,264 @@
+import json
+import math
+import mmap
+import multiprocessing
+import re
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request
+
+from db import PRAGMAS
+from helpers import decode_token
+
+# Per-route limits, keyed by Flask endpoint. Each entry is a comma-separated
+# list of `scope:count/period`; a request must fit into every bucket. Scopes:
+# ip (client address), user (id from the bearer token) and email (the
+# `email` field of the JSON body, for login and registration).
+DEFAULT_LIMITS = {
+    'auth.register': 'ip:10/minute',
+    'auth.login': 'ip:30/minute, email:10/minute',
+    'auth.update_user': 'user:10/minute',
+    'user_update': 'user:10/minute',
+    'predict.predict_time': 'ip:600/minute',
+    'predict.predict_time_batch': 'ip:60/minute',
+}
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+LIMIT_RE = re.compile(r'^\s*(ip|user|email)\s*:\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$')
+
+
+class Limit:
+    __slots__ = ('scope', 'count', 'period', 'rate', 'burst')
+
+    def __init__(self, scope, count, period):
+        self.scope = scope
+        self.count = count
+        self.period = period
+        # Refills continuously; a client can spend the whole allowance at once
+        self.rate = count / period
+        self.burst = float(count)
+
+    def __repr__(self):
+        return f'{self.scope}:{self.count}/{self.period}s'
+
+
+def parse_limits(text):
+    limits = []
+    for part in text.split(','):
+        match = LIMIT_RE.match(part)
+        if not match or int(match.group(2)) < 1:
+            raise ValueError(f'Invalid rate limit {part.strip()!r}, expected e.g. "ip:10/minute"')
+        scope, count, multiple, unit = match.groups()
+        limits.append(Limit(scope, int(count), int(multiple or 1) * PERIODS[unit]))
+    return tuple(limits)
+
+
+def refill(tokens, updated, rate, burst, now):
+    # Token bucket: returns (tokens left, seconds until the next token if denied)
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBackend:
+    # Buckets in a dict in this process; the least recently used are dropped
+    # past `maxsize` (a dropped bucket starts full again).
+
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens, retry = refill(burst, now, rate, burst, now)
+                self._buckets[key] = [tokens, now]
+                if len(self._buckets) > self.maxsize:
+                    self._buckets.popitem(last=False)
+                return retry
+            self._buckets.move_to_end(key)
+            bucket[0], retry = refill(bucket[0], bucket[1], rate, burst, now)
+            bucket[1] = now
+            return retry
+
+
+class SharedMemoryBackend:
+    # Fixed table of `slots` buckets in an anonymous shared mapping, so
+    # processes forked after it is created (gunicorn with preload_app) share
+    # the limits. A key hashes to one slot holding (fingerprint, tokens,
+    # updated); a different key landing on the same slot takes it over with a
+    # full bucket. Slots are guarded by striped process-shared locks. Keys are
+    # hashed with hash(), whose per-process seed forked children inherit.
+    SLOT = struct.Struct('<Qdd')
+
+    def __init__(self, slots=65536, stripes=64):
+        self.slots = slots
+        self._buf = mmap.mmap(-1, slots * self.SLOT.size)
+        self._locks = [multiprocessing.Lock() for _ in range(stripes)]
+
+    def take(self, key, rate, burst):
+        fingerprint = (hash(key) & 0xFFFFFFFFFFFFFFFF) | 1
+        slot = fingerprint % self.slots
+        offset = slot * self.SLOT.size
+        with self._locks[slot % len(self._locks)]:
+            now = time.monotonic()
+            owner, tokens, updated = self.SLOT.unpack_from(self._buf, offset)
+            if owner != fingerprint:
+                tokens, updated = burst, now
+            tokens, retry = refill(tokens, updated, rate, burst, now)
+            self.SLOT.pack_into(self._buf, offset, fingerprint, tokens, now)
+        return retry
+
+
+class SQLiteBackend:
+    # Buckets in a SQLite table, shared by every process that opens the file.
+    # One UPSERT per check does the refill and the take atomically.
+    TAKE = '''
+        INSERT INTO rate_limits (key, tokens, updated, retry_after) VALUES (:key, :burst - 1, :now, 0)
+        ON CONFLICT(key) DO UPDATE SET
+            tokens = min(:burst, tokens + (:now - updated) * :rate)
+                     - (min(:burst, tokens + (:now - updated) * :rate) >= 1),
+            retry_after = CASE WHEN min(:burst, tokens + (:now - updated) * :rate) >= 1 THEN 0
+                          ELSE (1 - min(:burst, tokens + (:now - updated) * :rate)) / :rate END,
+            updated = :now
+        RETURNING retry_after
+    '''
+
+    def __init__(self, path, prune_every=10_000, idle=86400):
+        self.path = path
+        self.prune_every = prune_every
+        self.idle = idle
+        self._local = threading.local()
+        self._calls = 0
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL,
+                retry_after REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            for name, value in PRAGMAS:
+                conn.execute(f'PRAGMA {name} = {value}')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst):
+        conn = self._connect()
+        now = time.time()
+        retry = conn.execute(self.TAKE, {'key': key, 'rate': rate, 'burst': burst, 'now': now}).fetchone()[0]
+        self._calls += 1
+        if self._calls % self.prune_every == 0:
+            # Buckets idle that long are full again anyway
+            conn.execute('DELETE FROM rate_limits WHERE updated < ?', (now - self.idle,))
+        return retry
+
+
+def client_ip():
+    return request.remote_addr
+
+
+def token_user():
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    try:
+        return str(decode_token(header[7:])['user_id'])
+    except Exception:
+        # token_required answers invalid tokens
+        return None
+
+
+def body_email():
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email else None
+
+
+SCOPES = {'ip': client_ip, 'user': token_user, 'email': body_email}
+
+
+class RateLimiter:
+    def __init__(self, backend, limits):
+        self.backend = backend
+        self.limits = {endpoint: parse_limits(text) for endpoint, text in limits.items() if text}
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, endpoint):
+        # Seconds the client must wait, or 0.0 if the request may proceed
+        limits = self.limits.get(endpoint)
+        if limits is None:
+            return 0.0
+        for limit in limits:
+            value = SCOPES[limit.scope]()
+            if value is None:
+                continue
+            retry = self.backend.take(f'{endpoint}|{limit.scope}:{value}', limit.rate, limit.burst)
+            if retry:
+                self.limited += 1
+                return retry
+        self.allowed += 1
+        return 0.0
+
+    def stats(self):
+        return {'backend': type(self.backend).__name__, 'allowed': self.allowed, 'limited': self.limited,
+                'limits': {endpoint: [repr(limit) for limit in limits] for endpoint, limits in self.limits.items()}}
+
+
+def limit_request():
+    if request.method == 'OPTIONS':
+        return None
+    retry = current_app.extensions['rate_limiter'].check(request.endpoint)
+    if retry:
+        return jsonify({'message': 'Too many requests, please try again later'}), 429, \
+            {'Retry-After': str(math.ceil(retry))}
+    return None
+
+
+def make_backend(app):
+    name = app.config['RATE_LIMIT_BACKEND']
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'shared':
+        return SharedMemoryBackend(app.config['RATE_LIMIT_SLOTS'])
+    if name == 'sqlite':
+        return SQLiteBackend(app.config['RATE_LIMIT_DATABASE'] or app.config['DATABASE'])
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {name!r}, expected 'memory', 'shared' or 'sqlite'")
+
+
+def init_app(app):
+    app.config.setdefault('RATE_LIMIT_ENABLED', True)
+    app.config.setdefault('RATE_LIMIT_BACKEND', 'shared')
+    app.config.setdefault('RATE_LIMIT_SLOTS', 65536)
+    app.config.setdefault('RATE_LIMIT_DATABASE', None)
+    app.config.setdefault('RATE_LIMITS', {})
+    if not app.config['RATE_LIMIT_ENABLED']:
+        app.extensions['rate_limiter'] = None
+        return None
+    limits = dict(DEFAULT_LIMITS)
+    overrides = app.config['RATE_LIMITS']
+    limits.update(json.loads(overrides) if isinstance(overrides, str) else overrides)
+    limiter = RateLimiter(make_backend(app), limits)
+    app.extensions['rate_limiter'] = limiter
+    app.before_request(limit_request)
+    return limiter
+
+
+def get_limiter():
+    return current_app.extensions.get('rate_limiter')
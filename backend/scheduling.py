@@ -0,0 +1,270 @@
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+
+TIME_FORMAT = '%Y-%m-%d %H:%M'
+STATUSES = ('scheduled', 'in-progress', 'completed', 'cancelled')
+
+
+class SlotTaken(Exception):
+    pass
+
+
+def parse_time(value):
+    return datetime.strptime(value, TIME_FORMAT) if len(value) == 16 else datetime.fromisoformat(value)
+
+
+def format_time(value):
+    return value.strftime(TIME_FORMAT)
+
+
+def minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+
+def round_up(minute, step):
+    return -(-minute // step) * step
+
+
+class DaySchedule:
+    # Booked intervals of one worker on one day as parallel sorted arrays of
+    # minutes from midnight. Intervals never overlap, so `ends` is sorted too and
+    # both conflict checks and gap searches start with a bisect.
+    __slots__ = ('starts', 'ends', 'ids', 'max_gap')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.ids = []
+        self.max_gap = None
+
+    def overlaps(self, start, end):
+        i = bisect.bisect_right(self.ends, start)
+        return i < len(self.starts) and self.starts[i] < end
+
+    def add(self, start, end, appointment_id):
+        i = bisect.bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, appointment_id)
+        self.max_gap = None
+
+    def remove(self, appointment_id):
+        if appointment_id in self.ids:
+            i = self.ids.index(appointment_id)
+            del self.starts[i], self.ends[i], self.ids[i]
+            self.max_gap = None
+
+    def largest_gap(self, open_minute, close_minute):
+        # Cached until the day changes; lets first_free() skip full days in O(1).
+        if self.max_gap is None:
+            edges = [open_minute] + self.ends
+            self.max_gap = max(b - a for a, b in zip(edges, self.starts + [close_minute]))
+        return self.max_gap
+
+    def first_gap(self, duration, not_before, close_minute, step):
+        cursor = round_up(not_before, step)
+        i = bisect.bisect_right(self.ends, cursor)
+        while i < len(self.starts) and self.starts[i] < cursor + duration:
+            cursor = round_up(max(cursor, self.ends[i]), step)
+            i += 1
+        return cursor if cursor + duration <= close_minute else None
+
+
+class Schedule:
+    # In-memory index of upcoming bookings per (worker_id, date). SQLite stays the
+    # source of truth: bookings are re-checked inside a write transaction, and the
+    # index is rebuilt every `refresh_seconds` to pick up other processes' writes.
+
+    def __init__(self, open_minute=9 * 60, close_minute=19 * 60, step=15, refresh_seconds=30):
+        self.open_minute = open_minute
+        self.close_minute = close_minute
+        self.step = step
+        self.refresh_seconds = refresh_seconds
+        self.days = {}
+        self.workers = []
+        self.lock = threading.RLock()
+        self.loaded_at = None
+
+    def load(self, conn, since=None):
+        since = since or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        days = {}
+        rows = conn.execute(
+            "SELECT id, worker_id, start_at, end_at FROM appointments "
+            "WHERE status != 'cancelled' AND start_at >= ? ORDER BY start_at",
+            (format_time(since),))
+        for appointment_id, worker_id, start_at, end_at in rows:
+            start, end = parse_time(start_at), parse_time(end_at)
+            day = days.setdefault((worker_id, start.date()), DaySchedule())
+            day.starts.append(minute_of_day(start))
+            day.ends.append(minute_of_day(end))
+            day.ids.append(appointment_id)
+        workers = [row[0] for row in conn.execute("SELECT id FROM users WHERE role = 'worker' ORDER BY id")]
+        with self.lock:
+            self.days = days
+            self.workers = workers
+            self.loaded_at = time.monotonic()
+
+    def ensure_loaded(self, conn):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.refresh_seconds:
+            self.load(conn)
+
+    def mark_stale(self):
+        self.loaded_at = None
+
+    def overlaps(self, worker_id, start, end):
+        day = self.days.get((worker_id, start.date()))
+        return day is not None and day.overlaps(minute_of_day(start), minute_of_day(end))
+
+    def add(self, worker_id, start, end, appointment_id):
+        with self.lock:
+            day = self.days.setdefault((worker_id, start.date()), DaySchedule())
+            day.add(minute_of_day(start), minute_of_day(end), appointment_id)
+            if worker_id not in self.workers:
+                bisect.insort(self.workers, worker_id)
+
+    def remove(self, worker_id, start, appointment_id):
+        with self.lock:
+            day = self.days.get((worker_id, start.date()))
+            if day is not None:
+                day.remove(appointment_id)
+
+    def within_hours(self, start, end):
+        return (start.date() == end.date() and minute_of_day(start) >= self.open_minute
+                and minute_of_day(end) <= self.close_minute)
+
+    def free_slots(self, worker_id, day, duration):
+        schedule = self.days.get((worker_id, day))
+        slots = []
+        cursor = self.open_minute
+        while True:
+            if schedule is None:
+                start = round_up(cursor, self.step)
+                start = start if start + duration <= self.close_minute else None
+            else:
+                start = schedule.first_gap(duration, cursor, self.close_minute, self.step)
+            if start is None:
+                return slots
+            slots.append(datetime.combine(day, datetime.min.time()) + timedelta(minutes=start))
+            cursor = start + self.step
+
+    def first_free(self, duration, start, days=7, worker_ids=None):
+        # Earliest (start, worker_id) where `duration` minutes fit, scanning day by day.
+        workers = worker_ids or self.workers
+        for offset in range(days):
+            day = start.date() + timedelta(days=offset)
+            not_before = max(self.open_minute, minute_of_day(start) if offset == 0 else 0)
+            best = None
+            for worker_id in workers:
+                schedule = self.days.get((worker_id, day))
+                if schedule is None:
+                    minute = round_up(not_before, self.step)
+                    minute = minute if minute + duration <= self.close_minute else None
+                elif schedule.largest_gap(self.open_minute, self.close_minute) < duration:
+                    continue
+                else:
+                    minute = schedule.first_gap(duration, not_before, self.close_minute, self.step)
+                if minute is not None and (best is None or minute < best[0]):
+                    best = (minute, worker_id)
+            if best is not None:
+                return datetime.combine(day, datetime.min.time()) + timedelta(minutes=best[0]), best[1]
+        return None
+
+
+def init_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            worker_id INTEGER NOT NULL REFERENCES users(id),
+            client_id INTEGER REFERENCES users(id),
+            service TEXT NOT NULL,
+            start_at TEXT NOT NULL,
+            end_at TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'scheduled',
+            predicted_time REAL,
+            actual_time REAL,
+            price REAL,
+            length INTEGER,
+            colors INTEGER,
+            decorations INTEGER,
+            technique INTEGER,
+            service_type INTEGER,
+            complexity INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_appointments_worker_start ON appointments (worker_id, start_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_appointments_start ON appointments (start_at)')
+    conn.commit()
+
+
+def reserve(conn, schedule, worker_id, start, end, write, after=None):
+    # Checks the slot against the index, then again inside a write transaction,
+    # and only then runs write(), which stores the appointment and returns its
+    # id. after(conn, appointment_id) runs inside the same transaction.
+    with schedule.lock:
+        if schedule.overlaps(worker_id, start, end):
+            raise SlotTaken('Slot is already booked')
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            clash = conn.execute(
+                "SELECT 1 FROM appointments WHERE worker_id = ? AND status != 'cancelled' "
+                "AND start_at < ? AND end_at > ? LIMIT 1",
+                (worker_id, format_time(end), format_time(start))).fetchone()
+            if clash:
+                # Booked by another process since the index was loaded
+                schedule.mark_stale()
+                raise SlotTaken('Slot is already booked')
+            appointment_id = write()
+            if after is not None:
+                after(conn, appointment_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        schedule.add(worker_id, start, end, appointment_id)
+        return appointment_id
+
+
+def book(conn, schedule, worker_id, start, end, fields, on_insert=None):
+    # fields: client_id, service, predicted_time, price and the model features.
+    # on_insert(conn, appointment_id) runs inside the same transaction.
+    def insert():
+        columns = ['worker_id', 'start_at', 'end_at'] + list(fields)
+        return conn.execute(
+            f'INSERT INTO appointments ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+            [worker_id, format_time(start), format_time(end)] + list(fields.values())).lastrowid
+    return reserve(conn, schedule, worker_id, start, end, insert, on_insert)
+
+
+def rebook(conn, schedule, appointment_id, worker_id, start, end, status, on_update=None):
+    # Brings a cancelled appointment back as `status`. Its slot may have been
+    # taken in the meantime, so it goes through the same checks as book().
+    def update():
+        conn.execute('UPDATE appointments SET status = ? WHERE id = ?', (status, appointment_id))
+        return appointment_id
+    return reserve(conn, schedule, worker_id, start, end, update, on_update)
+
+
+def init_app(app):
+    app.config.setdefault('SCHEDULE_OPEN', '09:00')
+    app.config.setdefault('SCHEDULE_CLOSE', '19:00')
+    app.config.setdefault('SCHEDULE_STEP', 15)
+    app.config.setdefault('SCHEDULE_REFRESH_SECONDS', 30)
+    to_minute = lambda value: int(value[:2]) * 60 + int(value[3:5])
+    pool = app.extensions['db_pool']
+    conn = pool.connect()
+    try:
+        init_schema(conn)
+    finally:
+        conn.close()
+    schedule = Schedule(to_minute(app.config['SCHEDULE_OPEN']), to_minute(app.config['SCHEDULE_CLOSE']),
+                        app.config['SCHEDULE_STEP'], app.config['SCHEDULE_REFRESH_SECONDS'])
+    app.extensions['schedule'] = schedule
+    return schedule
+
+
+def get_schedule():
+    return current_app.extensions['schedule']
@@ -0,0 +1,220 @@
+from typing import NamedTuple, Optional
+
+from flask import request
+
+from inference import FEATURES
+from scheduling import STATUSES as APPOINTMENT_STATUSES
+
+ROLES = ('client', 'worker', 'owner')
+STATUSES = ('active', 'inactive')
+
+
+class ValidationError(ValueError):
+    # str(e) is the message handlers return; `errors` maps each bad field to its problem
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or {}
+
+
+class RegisterRequest(NamedTuple):
+    name: str
+    email: str
+    password: str
+    role: str
+
+
+class LoginRequest(NamedTuple):
+    email: str
+    password: str
+
+
+class StatusRequest(NamedTuple):
+    status: str
+
+
+class AppointmentStatusRequest(NamedTuple):
+    status: str
+    actual_time: Optional[float] = None
+
+
+class AppointmentRequest(NamedTuple):
+    worker_id: int
+    start: str
+    service: str
+    client_id: Optional[int] = None
+    price: Optional[float] = None
+    duration: Optional[float] = None
+    length: Optional[float] = None
+    colors: Optional[float] = None
+    decorations: Optional[float] = None
+    technique: Optional[float] = None
+    service_type: Optional[float] = None
+    complexity: Optional[float] = None
+
+
+class PredictRequest(NamedTuple):
+    length: float
+    colors: float
+    decorations: float
+    technique: float
+    service_type: float
+    complexity: float
+    worker_id: Optional[int] = None
+    salon_id: Optional[int] = None
+
+    def features(self):
+        return dict(zip(FEATURES, self))
+
+
+assert PredictRequest._fields[:len(FEATURES)] == tuple(FEATURES)
+assert AppointmentRequest._fields[-len(FEATURES):] == tuple(FEATURES)
+
+
+def _string(value):
+    if not isinstance(value, str):
+        raise ValueError('must be a string')
+    return value
+
+
+def _number(value):
+    # bool is an int subclass; True is not a length
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError('must be a number')
+    return float(value)
+
+
+def _identifier(value):
+    if isinstance(value, bool):
+        raise ValueError('must be an integer')
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    raise ValueError('must be an integer')
+
+
+KINDS = {'string': _string, 'number': _number, 'id': _identifier}
+
+
+class Field:
+    __slots__ = ('kind', 'required', 'choices', 'minimum', 'check', 'message')
+
+    def __init__(self, kind, required=True, choices=None, minimum=None, check=None, message=None):
+        if kind not in KINDS:
+            raise ValueError(f'Unknown field kind {kind!r}, expected one of {tuple(KINDS)}')
+        self.kind = kind
+        self.required = required
+        self.choices = frozenset(choices) if choices is not None else None
+        self.minimum = minimum
+        self.check = check
+        # Returned as the response message when this field is the only problem
+        self.message = message
+
+    def compile(self, name):
+        # One closure per field: type conversion first, then the constraints
+        convert, choices, minimum, check = KINDS[self.kind], self.choices, self.minimum, self.check
+        message = self.message or f'Invalid {name}'
+
+        def validate(value):
+            value = convert(value)
+            if choices is not None and value not in choices:
+                raise ValueError(message)
+            if minimum is not None and value < minimum:
+                raise ValueError(f'must be at least {minimum}')
+            if check is not None and not check(value):
+                raise ValueError(message)
+            return value
+        return validate
+
+
+class Schema:
+    # Validates a decoded JSON object into `cls`, a NamedTuple whose fields are
+    # the schema's fields in the same order. Everything that does not depend
+    # on the payload is worked out once, here.
+
+    def __init__(self, cls, **fields):
+        if tuple(fields) != cls._fields:
+            raise ValueError(f'{cls.__name__} fields {cls._fields} do not match schema fields {tuple(fields)}')
+        self.cls = cls
+        self.fields = fields
+        self._make = cls._make
+        self._steps = tuple((name, field.compile(name), field.required, cls._field_defaults.get(name))
+                            for name, field in fields.items())
+
+    def validate(self, data):
+        if not isinstance(data, dict) or not data:
+            raise ValidationError('No data provided')
+        values = []
+        missing = []
+        errors = {}
+        for name, validate, required, default in self._steps:
+            value = data.get(name)
+            if value is None or value == '':
+                if required:
+                    missing.append(name)
+                values.append(default)
+                continue
+            try:
+                values.append(validate(value))
+            except ValueError as e:
+                errors[name] = str(e)
+        if missing:
+            errors.update((name, 'is required') for name in missing)
+            raise ValidationError(f'Missing required fields: {", ".join(missing)}', errors)
+        if errors:
+            name, problem = next(iter(errors.items()))
+            message = problem if self.fields[name].message == problem else f'{name} {problem}'
+            raise ValidationError(message, errors)
+        return self._make(values)
+
+    def load(self):
+        # Validated payload of the current request
+        return self.validate(request.get_json(silent=True))
+
+
+REGISTER = Schema(
+    RegisterRequest,
+    name=Field('string'),
+    email=Field('string', check=lambda email: '@' in email, message='Invalid email format'),
+    password=Field('string'),
+    role=Field('string', choices=ROLES, message='Invalid role'),
+)
+
+STATUS = Schema(
+    StatusRequest,
+    status=Field('string', choices=STATUSES, message='Invalid status'),
+)
+
+APPOINTMENT_STATUS = Schema(
+    AppointmentStatusRequest,
+    status=Field('string', choices=APPOINTMENT_STATUSES, message='Invalid status'),
+    actual_time=Field('number', required=False, check=lambda minutes: 0 < minutes < 24 * 60,
+                      message='actual_time must be a positive number of minutes'),
+)
+
+LOGIN = Schema(
+    LoginRequest,
+    email=Field('string'),
+    password=Field('string'),
+)
+
+# Features are optional when duration is given, but never stored unchecked:
+# completed appointments feed them to the online learner
+APPOINTMENT = Schema(
+    AppointmentRequest,
+    worker_id=Field('id'),
+    start=Field('string'),
+    service=Field('string', check=lambda service: service.strip() != '', message='service must not be empty'),
+    client_id=Field('id', required=False),
+    price=Field('number', required=False, minimum=0),
+    duration=Field('number', required=False, check=lambda minutes: minutes > 0,
+                   message='duration must be a positive number of minutes'),
+    **{name: Field('number', required=False, minimum=0) for name in FEATURES},
+)
+
+PREDICT = Schema(
+    PredictRequest,
+    **{name: Field('number', minimum=0) for name in FEATURES},
+    worker_id=Field('id', required=False),
+    salon_id=Field('id', required=False),
+)
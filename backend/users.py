@@ -0,0 +1,209 @@
+import base64
+import json
+import logging
+import sqlite3
+
+from flask import current_app
+
+from schemas import ROLES, STATUSES, ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Projected columns: what the staff list shows, never the password hash
+FIELDS = ('id', 'name', 'email', 'role', 'status', 'created_at')
+COLUMNS = ', '.join(f'u.{field}' for field in FIELDS)
+MAX_LIMIT = 100
+# Trigrams need at least three characters to match anything
+MIN_SEARCH = 3
+
+
+def fold(name):
+    # Case-insensitive form of a name, for Cyrillic too (SQLite's lower() and
+    # NOCASE only fold ASCII). Whoever writes users.name writes name_lower.
+    return name.casefold()
+
+
+def init_schema(conn):
+    # The staff list pages through users newest first, optionally by role
+    # (idx_users_role_created) or alphabetically by name prefix, matched
+    # case-insensitively on name_lower (idx_users_name_lower). Free-text search
+    # over name and email goes through an external-content FTS5 table with the
+    # trigram tokenizer, kept in sync by triggers. Returns False when this
+    # SQLite build has no FTS5.
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(users)')}
+    if 'status' not in columns:
+        conn.execute("ALTER TABLE users ADD COLUMN status TEXT NOT NULL DEFAULT 'active'")
+    if 'name_lower' not in columns:
+        conn.execute('ALTER TABLE users ADD COLUMN name_lower TEXT')
+    # Also picks up rows written by tools that do not know about name_lower
+    conn.executemany('UPDATE users SET name_lower = ? WHERE id = ?',
+                     [(fold(name), user_id) for user_id, name in
+                      conn.execute('SELECT id, name FROM users WHERE name_lower IS NULL').fetchall()])
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_role_created ON users (role, created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_created ON users (created_at)')
+    conn.execute('DROP INDEX IF EXISTS idx_users_name')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_name_lower ON users (name_lower)')
+    conn.commit()
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'").fetchone()
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+                name, email, content='users', content_rowid='id', tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        logger.warning('Full-text user search unavailable, falling back to LIKE: %s', e)
+        return False
+    conn.executescript('''
+        CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+            INSERT INTO users_fts (rowid, name, email) VALUES (new.id, new.name, new.email);
+        END;
+        CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+        END;
+        CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF name, email ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+            INSERT INTO users_fts (rowid, name, email) VALUES (new.id, new.name, new.email);
+        END;
+    ''')
+    if not exists:
+        # Index the users created before the table existed
+        conn.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+    conn.commit()
+    return True
+
+
+def encode_cursor(mode, key):
+    return base64.urlsafe_b64encode(json.dumps([mode, *key], separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, mode, types):
+    # The cursor is the sort key of the last row of the previous page; it is
+    # only valid for the same kind of listing it came from, and every value
+    # must have the type of its column before it gets near SQLite
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        value = None
+    if not isinstance(value, list) or len(value) != len(types) + 1 or value[0] != mode \
+            or any(type(key) is not kind for key, kind in zip(value[1:], types)):
+        raise ValidationError('Invalid cursor', {'cursor': 'Does not belong to this listing'})
+    return value[1:]
+
+
+def fts_phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def prefix_range(prefix):
+    # [lo, hi) of name_lower is every name starting with the prefix in any
+    # case, so the range is answered by idx_users_name_lower
+    lo = fold(prefix)
+    return lo, lo[:-1] + chr(ord(lo[-1]) + 1)
+
+
+def build_query(role=None, status=None, prefix=None, q=None, cursor=None, limit=25, fts=True):
+    # Returns (sql, params, mode, key columns); key columns outside FIELDS are
+    # selected too, for the cursor. One extra row is fetched to
+    # tell whether there is a next page. Keyset pagination: the next page
+    # starts strictly after the cursor's sort key, so deep pages cost the
+    # same as the first one instead of skipping OFFSET rows.
+    where, params = [], {'limit': limit + 1}
+    if role is not None:
+        where.append('u.role = :role')
+        params['role'] = role
+    if status is not None:
+        where.append('u.status = :status')
+        params['status'] = status
+
+    if q is not None:
+        # Newest matches first; the FTS table yields rowids in order
+        mode, keys, types = 'search', ('id',), (int,)
+        if fts:
+            source = 'users_fts f JOIN users u ON u.id = f.rowid'
+            where.insert(0, 'users_fts MATCH :match')
+            params['match'] = fts_phrase(q)
+            order, after = 'f.rowid DESC', 'f.rowid < :id'
+        else:
+            source = 'users u'
+            where.insert(0, "(u.name LIKE :like ESCAPE '\\' OR u.email LIKE :like ESCAPE '\\')")
+            params['like'] = '%' + q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            order, after = 'u.id DESC', 'u.id < :id'
+    elif prefix is not None:
+        mode, keys, types, source = 'name', ('name_lower', 'id'), (str, int), 'users u'
+        params['lo'], params['hi'] = prefix_range(prefix)
+        if cursor is None:
+            where.insert(0, 'u.name_lower >= :lo AND u.name_lower < :hi')
+        else:
+            # The cursor's name replaces the lower bound so the index range starts
+            # there; rows sharing that exact name are skipped by id, not seeked
+            where.insert(0, 'u.name_lower >= :name_lower AND u.name_lower < :hi')
+        order, after = 'u.name_lower, u.id', '(u.name_lower > :name_lower OR u.id > :id)'
+    else:
+        mode, keys, types, source = 'created', ('created_at', 'id'), (str, int), 'users u'
+        order, after = 'u.created_at DESC, u.id DESC', '(u.created_at, u.id) < (:created_at, :id)'
+
+    if cursor is not None:
+        where.append(after)
+        params.update(zip(keys, decode_cursor(cursor, mode, types)))
+    extra = ''.join(f', u.{key}' for key in keys if key not in FIELDS)
+    sql = f'SELECT {COLUMNS}{extra} FROM {source}'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    return f'{sql} ORDER BY {order} LIMIT :limit', params, mode, keys
+
+
+def search_users(conn, role=None, status=None, prefix=None, q=None, cursor=None, limit=25, fts=True):
+    sql, params, mode, keys = build_query(role, status, prefix, q, cursor, limit, fts)
+    rows = conn.execute(sql, params).fetchall()
+    page = [{field: row[field] for field in FIELDS} for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(mode, [rows[limit - 1][key] for key in keys])
+    return {'users': page, 'next_cursor': next_cursor}
+
+
+def query_plan(conn, sql, params):
+    # EXPLAIN QUERY PLAN details, e.g. 'SEARCH u USING INDEX idx_users_role_created (role=?)'
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()]
+
+
+def parse_args(args):
+    # Query string of GET /api/users -> keyword arguments for search_users()
+    errors = {}
+    role = args.get('role') or None
+    if role is not None and role not in ROLES:
+        errors['role'] = f'Must be one of {", ".join(ROLES)}'
+    status = args.get('status') or None
+    if status is not None and status not in STATUSES:
+        errors['status'] = f'Must be one of {", ".join(STATUSES)}'
+    prefix = args.get('prefix', '').strip() or None
+    q = args.get('q', '').strip() or None
+    if q is not None and len(q) < MIN_SEARCH:
+        errors['q'] = f'Must be at least {MIN_SEARCH} characters'
+    if q is not None and prefix is not None:
+        errors['prefix'] = 'Cannot be combined with q'
+    try:
+        limit = int(args.get('limit', 25))
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError
+    except ValueError:
+        errors['limit'] = f'Must be a whole number between 1 and {MAX_LIMIT}'
+        limit = None
+    if errors:
+        raise ValidationError('Invalid query parameters', errors)
+    return {'role': role, 'status': status, 'prefix': prefix, 'q': q,
+            'cursor': args.get('cursor') or None, 'limit': limit}
+
+
+def init_app(app):
+    pool = app.extensions['db_pool']
+    conn = pool.connect()
+    try:
+        app.extensions['users_fts'] = init_schema(conn)
+    finally:
+        conn.close()
+
+
+def search_enabled():
+    return current_app.extensions.get('users_fts', False)
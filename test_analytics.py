@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import unittest
+import analytics
+from api_test_case import APITestCase
+
+class AnalyticsRollupTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = self.register('Owner', 'owner@example.com', 'owner')
+        self.worker_id = self.register('Worker', 'worker@example.com', 'worker')['id']
+        self.conn = sqlite3.connect(os.path.join(self.tmp, 'test.db'))
+        self.conn.row_factory = sqlite3.Row
+
+    def tearDown(self):
+        self.conn.close()
+        super().tearDown()
+
+    def book(self, start, service='Маникюр', price=30):
+        response = self.app.post('/api/appointments', headers=self.owner['headers'], json={
+            'worker_id': self.worker_id, 'start': start, 'service': service, 'duration': 60, 'price': price
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()['appointment']['id']
+
+    def complete(self, appointment_id, actual_time):
+        response = self.app.put(f'/api/appointments/{appointment_id}/status', headers=self.owner['headers'],
+                                json={'status': 'completed', 'actual_time': actual_time})
+        self.assertEqual(response.status_code, 200)
+
+    def dashboard(self, period, day):
+        response = self.app.get(f'/api/analytics?period={period}&date={day}', headers=self.owner['headers'])
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def rollups(self):
+        return {tuple(row[:3]): (row[3], round(row[4], 6), round(row[5], 6))
+                for row in self.conn.execute('SELECT * FROM appointment_rollups WHERE appointments != 0')}
+
+    def test_completion_is_counted(self):
+        self.complete(self.book('2031-03-04 10:00', price=40), 50)
+        self.book('2031-03-04 12:00')
+        totals = self.dashboard('week', '2031-03-04')['totals']
+        self.assertEqual(totals, {'appointments': 1, 'revenue': 40.0, 'avg_minutes': 50.0})
+        services = self.dashboard('month', '2031-03-10')['services']
+        self.assertEqual([(s['name'], s['appointments'], s['revenue']) for s in services], [('Маникюр', 1, 40.0)])
+
+    def test_recompletion_replaces_previous_values(self):
+        appointment_id = self.book('2031-03-04 10:00')
+        self.complete(appointment_id, 50)
+        self.complete(appointment_id, 65)
+        totals = self.dashboard('year', '2031-03-04')['totals']
+        self.assertEqual(totals, {'appointments': 1, 'revenue': 30.0, 'avg_minutes': 65.0})
+
+    def test_removing_completion_cancels_it_out(self):
+        appointment_id = self.book('2031-03-04 10:00')
+        self.complete(appointment_id, 50)
+        row = self.conn.execute('SELECT * FROM appointments WHERE id = ?', (appointment_id,)).fetchone()
+        analytics.apply_completion(self.conn, row, -1)
+        self.conn.commit()
+        self.assertEqual(self.rollups(), {})
+        self.assertEqual(self.dashboard('week', '2031-03-04')['totals']['appointments'], 0)
+
+    def test_rebuild_matches_incremental(self):
+        for i, (start, service) in enumerate([('2031-02-26 10:00', 'Маникюр'), ('2031-03-02 11:00', 'Педикюр'),
+                                              ('2031-03-03 09:00', 'Маникюр'), ('2031-03-31 15:00', 'Гел лак'),
+                                              ('2031-04-01 10:00', 'Педикюр')]):
+            appointment_id = self.book(start, service, price=25 + i)
+            self.complete(appointment_id, 40 + i)
+            if i == 2:
+                self.complete(appointment_id, 70)
+        self.book('2031-03-05 10:00')
+        incremental = self.rollups()
+        self.assertTrue(incremental)
+        analytics.rebuild(self.conn)
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_non_numeric_price_is_counted_as_zero(self):
+        # Stored before booking input was validated
+        appointment_id = self.book('2031-03-04 10:00')
+        self.conn.execute("UPDATE appointments SET price = 'abc' WHERE id = ?", (appointment_id,))
+        self.conn.commit()
+        self.complete(appointment_id, 50)
+        totals = self.dashboard('week', '2031-03-04')['totals']
+        self.assertEqual(totals, {'appointments': 1, 'revenue': 0.0, 'avg_minutes': 50.0})
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM appointment_rollups "
+                                           "WHERE typeof(revenue) = 'text'").fetchone()[0], 0)
+
+    def test_non_numeric_rollups_are_rebuilt(self):
+        self.complete(self.book('2031-03-04 10:00'), 50)
+        self.conn.execute("UPDATE appointment_rollups SET revenue = 'abc'")
+        self.conn.commit()
+        analytics.init_app(self.app.application)
+        self.assertEqual(self.dashboard('week', '2031-03-04')['totals']['revenue'], 30.0)
+
+if __name__ == '__main__':
+    unittest.main()
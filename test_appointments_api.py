@@ -0,0 +1,104 @@
+import unittest
+from datetime import date, timedelta
+from api_test_case import APITestCase
+
+class AppointmentsAPITestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = self.register('Owner', 'owner@example.com', 'owner')
+        self.worker_id = self.register('Worker', 'worker@example.com', 'worker')['id']
+        self.day = (date.today() + timedelta(days=7)).isoformat()
+
+    def book(self, at, duration=60, worker_id=None, **extra):
+        return self.app.post('/api/appointments', headers=self.owner['headers'], json=dict({
+            'worker_id': worker_id or self.worker_id,
+            'start': f'{self.day} {at}',
+            'service': 'Маникюр',
+            'duration': duration
+        }, **extra))
+
+    def set_status(self, appointment_id, status):
+        return self.app.put(f'/api/appointments/{appointment_id}/status', headers=self.owner['headers'],
+                            json={'status': status})
+
+    def test_overlapping_booking_is_rejected(self):
+        self.assertEqual(self.book('10:00').status_code, 201)
+        self.assertEqual(self.book('10:30').status_code, 409)
+        self.assertEqual(self.book('09:30').status_code, 409)
+
+    def test_adjacent_booking_is_accepted(self):
+        self.assertEqual(self.book('10:00').status_code, 201)
+        self.assertEqual(self.book('11:00').status_code, 201)
+        self.assertEqual(self.book('09:00').status_code, 201)
+
+    def test_other_worker_is_not_blocked(self):
+        other_id = self.register('Other', 'other@example.com', 'worker')['id']
+        self.assertEqual(self.book('10:00').status_code, 201)
+        self.assertEqual(self.book('10:00', worker_id=other_id).status_code, 201)
+
+    def test_cancelled_slot_can_be_booked_again(self):
+        appointment_id = self.book('10:00').get_json()['appointment']['id']
+        self.assertEqual(self.set_status(appointment_id, 'cancelled').status_code, 200)
+        self.assertEqual(self.book('10:30').status_code, 201)
+        # The slot is taken now, so the cancelled appointment cannot come back
+        self.assertEqual(self.set_status(appointment_id, 'scheduled').status_code, 409)
+
+    def test_invalid_input_is_rejected(self):
+        self.assertEqual(self.book('10:00', duration=0).status_code, 400)
+        self.assertEqual(self.book('10:00', worker_id='abc').status_code, 400)
+        self.assertEqual(self.book('18:30').status_code, 400)
+
+    def test_invalid_fields_are_not_stored(self):
+        for extra in ({'price': 'abc'}, {'price': -5}, {'service': {'name': 'x'}}, {'service': '   '},
+                      {'client_id': {'id': 1}}, {'client_id': 'abc'}, {'length': 'abc'}, {'colors': -1},
+                      {'start': 123}):
+            response = self.book('10:00', **extra)
+            self.assertEqual(response.status_code, 400, extra)
+            self.assertIn(next(iter(extra)), response.get_json()['errors'], extra)
+
+    def test_unknown_client(self):
+        self.assertEqual(self.book('10:00', client_id=999).status_code, 404)
+        # A worker is not a client either
+        self.assertEqual(self.book('10:00', client_id=self.worker_id).status_code, 404)
+
+    def test_valid_fields_are_stored(self):
+        client_id = self.register('Client', 'client@example.com', 'client')['id']
+        response = self.book('10:00', client_id=client_id, price=45, length=30, colors=2)
+        self.assertEqual(response.status_code, 201)
+        appointment = response.get_json()['appointment']
+        self.assertEqual((appointment['clientId'], appointment['client'], appointment['price']), (client_id, 'Client', 45))
+
+    def test_prediction_without_duration(self):
+        features = {'length': 30, 'colors': 2, 'decorations': 1, 'technique': 1, 'service_type': 1, 'complexity': 3}
+        response = self.book('10:00', duration=None, **features)
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNotNone(response.get_json()['appointment']['predictedTime'])
+        response = self.book('14:00', duration=None, length=30)
+        self.assertEqual(response.status_code, 400)
+
+    def test_free_slot_search_is_bounded(self):
+        query = f'/api/appointments/free-slot?duration=60&from={self.day}%2009:00'
+        response = self.app.get(f'{query}&days=62&worker_id={self.worker_id}', headers=self.owner['headers'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['worker_id'], self.worker_id)
+        for days in ('0', '63', '10000000', '-1', 'abc'):
+            response = self.app.get(f'{query}&days={days}', headers=self.owner['headers'])
+            self.assertEqual(response.status_code, 400, days)
+        response = self.app.get(f'{query}&worker_id=abc', headers=self.owner['headers'])
+        self.assertEqual(response.status_code, 400)
+
+    def test_slots_rejects_bad_worker_id(self):
+        query = f'/api/appointments/slots?duration=60&date={self.day}'
+        self.assertEqual(self.app.get(f'{query}&worker_id={self.worker_id}', headers=self.owner['headers']).status_code, 200)
+        for worker_id in ('abc', '-1', '1.5'):
+            response = self.app.get(f'{query}&worker_id={worker_id}', headers=self.owner['headers'])
+            self.assertEqual(response.status_code, 400, worker_id)
+
+    def test_invalid_status_transition(self):
+        appointment_id = self.book('10:00').get_json()['appointment']['id']
+        self.assertEqual(self.set_status(appointment_id, 'completed').status_code, 200)
+        self.assertEqual(self.set_status(appointment_id, 'scheduled').status_code, 409)
+        self.assertEqual(self.set_status(appointment_id, 'done').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
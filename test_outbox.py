@@ -0,0 +1,120 @@
+import os
+import shutil
+import smtplib
+import tempfile
+import time
+import unittest
+import db
+import outbox
+import scheduling
+
+class FakeConnection:
+    # Stands in for SMTPConnection: fails the recipients listed in `errors`
+    # with the given exception and records everything else as sent
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.sent = []
+        self.connects = 0
+        self.closed = 0
+
+    def send(self, message):
+        error = self.errors.get(message['To'])
+        if error is not None:
+            raise error
+        self.sent.append(message['To'])
+
+    def close(self):
+        self.closed += 1
+
+class OutboxRetryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.pool = db.ConnectionPool(os.path.join(self.tmp, 'test.db'), size=0)
+        self.conn = self.pool.connect()
+        db.init_db(self.conn)
+        scheduling.init_schema(self.conn)
+        outbox.init_schema(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def sender(self, connection, **kwargs):
+        return outbox.OutboxSender(self.pool, connection, 'salon@example.com', **kwargs)
+
+    def enqueue(self, *recipients):
+        for recipient in recipients:
+            outbox.enqueue(self.conn, recipient, 'Напомняне', 'Здравейте!')
+        self.conn.commit()
+
+    def row(self, recipient):
+        return self.conn.execute('SELECT * FROM email_outbox WHERE recipient = ?', (recipient,)).fetchone()
+
+    def test_all_sent(self):
+        self.enqueue('a@example.com', 'b@example.com')
+        connection = FakeConnection()
+        self.assertEqual(self.sender(connection).drain(), 2)
+        self.assertEqual(connection.sent, ['a@example.com', 'b@example.com'])
+        self.assertEqual(self.row('a@example.com')['status'], 'sent')
+
+    def test_temporary_failure_is_retried_later(self):
+        self.enqueue('a@example.com', 'b@example.com')
+        error = smtplib.SMTPResponseException(451, b'Try again later')
+        sender = self.sender(FakeConnection({'a@example.com': error}))
+        before = time.time()
+        sender.drain()
+        row = self.row('a@example.com')
+        self.assertEqual(row['status'], 'pending')
+        self.assertEqual(row['attempts'], 1)
+        self.assertEqual(row['locked_until'], 0)
+        self.assertGreaterEqual(row['send_at'], before)
+        self.assertIn('Try again later', row['last_error'])
+        # A response error keeps the session, so the rest of the batch still goes out
+        self.assertEqual(self.row('b@example.com')['status'], 'sent')
+        self.assertEqual(sender.retried, 1)
+
+    def test_permanent_failure_is_not_retried(self):
+        self.enqueue('a@example.com')
+        error = smtplib.SMTPRecipientsRefused({'a@example.com': (550, b'No such user')})
+        self.sender(FakeConnection({'a@example.com': error})).drain()
+        row = self.row('a@example.com')
+        self.assertEqual(row['status'], 'failed')
+        self.assertEqual(row['attempts'], 1)
+
+    def test_failed_after_max_attempts(self):
+        self.enqueue('a@example.com')
+        self.conn.execute('UPDATE email_outbox SET attempts = 2')
+        self.conn.commit()
+        error = smtplib.SMTPResponseException(451, b'Try again later')
+        self.sender(FakeConnection({'a@example.com': error}), max_attempts=3).drain()
+        row = self.row('a@example.com')
+        self.assertEqual(row['status'], 'failed')
+        self.assertEqual(row['attempts'], 3)
+
+    def test_connection_error_releases_rest_of_batch(self):
+        self.enqueue('a@example.com', 'b@example.com', 'c@example.com')
+        connection = FakeConnection({'b@example.com': ConnectionResetError('Connection reset')})
+        # One attempt only, so b does not come back in the second round
+        sender = self.sender(connection, max_attempts=1)
+        self.assertEqual(sender.send_batch(self.conn), 2)
+        self.assertEqual(connection.closed, 1)
+        self.assertEqual(self.row('a@example.com')['status'], 'sent')
+        self.assertEqual(self.row('b@example.com')['status'], 'failed')
+        released = self.row('c@example.com')
+        self.assertEqual((released['status'], released['attempts'], released['locked_until']), ('pending', 0, 0))
+        # Picked up by the next round without waiting for the lease to run out
+        connection.errors.clear()
+        self.assertEqual(sender.send_batch(self.conn), 1)
+        self.assertEqual(self.row('c@example.com')['status'], 'sent')
+
+    def test_invalid_message_does_not_block_batch(self):
+        outbox.enqueue(self.conn, 'a@example.com', 'Bad\nSubject', 'Body')
+        self.enqueue('b@example.com')
+        self.sender(FakeConnection()).drain()
+        row = self.row('a@example.com')
+        self.assertEqual(row['status'], 'failed')
+        self.assertTrue(row['last_error'].startswith('Invalid message'))
+        self.assertEqual(self.row('b@example.com')['status'], 'sent')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -34,9 +34,19 @@ class PredictTimeAPITestCase(unittest.TestCase):
             data=json.dumps(incomplete_data),
             content_type='application/json'
         )
-        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.status_code, 400)
         data = response.get_json()
-        self.assertIn('predicted_time', data)
+        self.assertIn('length', data['errors'])
+
+    def test_predict_time_invalid_field(self):
+        invalid_data = dict(self.sample_data, colors='two')
+        response = self.app.post(
+            self.endpoint,
+            data=json.dumps(invalid_data),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('colors', response.get_json()['errors'])
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
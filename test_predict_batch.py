@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+import unittest
+from api_test_case import APITestCase, SAMPLE_FEATURES
+from inference import FEATURES, write_flat
+
+class PredictBatchTestCase(APITestCase):
+    def setUp(self):
+        # Personal models for worker 7 and salon 3, each a constant prediction
+        self.models = tempfile.mkdtemp()
+        path = os.path.join(self.models, 'personal_models.bin')
+        write_flat(path, [[0.0] * len(FEATURES) + [77.0], [0.0] * len(FEATURES) + [33.0]], ['worker:7', 'salon:3'])
+        self.config = dict(self.config, PERSONAL_MODELS_PATH=path)
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.models, ignore_errors=True)
+
+    def predict(self, **ids):
+        response = self.app.post('/api/predict-time', json=dict(SAMPLE_FEATURES, **ids))
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_items_use_the_same_model_as_single_predictions(self):
+        items = [{}, {'worker_id': 7}, {'salon_id': 3}, {'worker_id': 8, 'salon_id': 3}, {'worker_id': 7}, {'worker_id': 8}]
+        response = self.app.post('/api/predict-time/batch', json=[dict(SAMPLE_FEATURES, **ids) for ids in items])
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        single = [self.predict(**ids) for ids in items]
+        self.assertEqual(data['predicted_times'], [s['predicted_time'] for s in single])
+        self.assertEqual(data['model_versions'], [s['model_version'] for s in single])
+        self.assertEqual(data['models'], ['global', 'worker:7', 'salon:3', 'salon:3', 'worker:7', 'global'])
+        self.assertEqual(data['predicted_times'][1:3], [77.0, 33.0])
+
+    def test_invalid_item_is_reported_by_index(self):
+        items = [SAMPLE_FEATURES, dict(SAMPLE_FEATURES, worker_id='abc')]
+        response = self.app.post('/api/predict-time/batch', json=items)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.get_json()['errors']), ['1'])
+
+if __name__ == '__main__':
+    unittest.main()
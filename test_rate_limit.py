@@ -0,0 +1,56 @@
+import unittest
+from api_test_case import APITestCase, SAMPLE_FEATURES
+
+class RateLimitTestCase(APITestCase):
+    config = {
+        'RATE_LIMIT_ENABLED': True,
+        'RATE_LIMIT_BACKEND': 'memory',
+        'RATE_LIMITS': {
+            'auth.login': 'ip:5/minute, email:2/minute',
+            'predict.predict_time': 'ip:3/minute'
+        }
+    }
+
+    def failed_login(self, email, ip='10.0.0.1'):
+        return self.login(email, 'wrong', ip)
+
+    def predict(self, ip='10.0.0.1'):
+        return self.app.post('/api/predict-time', json=SAMPLE_FEATURES, environ_base={'REMOTE_ADDR': ip})
+
+    def assertLimited(self, response, period=60):
+        self.assertEqual(response.status_code, 429)
+        retry = int(response.headers['Retry-After'])
+        self.assertGreaterEqual(retry, 1)
+        self.assertLessEqual(retry, period)
+
+    def test_limit_returns_429_with_retry_after(self):
+        for _ in range(3):
+            self.assertEqual(self.predict().status_code, 200)
+        self.assertLimited(self.predict())
+
+    def test_limit_is_per_ip(self):
+        for _ in range(3):
+            self.predict()
+        self.assertEqual(self.predict('10.0.0.2').status_code, 200)
+
+    def test_login_limited_per_email(self):
+        self.assertEqual(self.failed_login('a@example.com').status_code, 401)
+        self.assertEqual(self.failed_login('a@example.com', '10.0.0.2').status_code, 401)
+        # Third attempt for the same address, even from another client
+        self.assertLimited(self.failed_login('a@example.com', '10.0.0.3'))
+        self.assertEqual(self.failed_login('b@example.com').status_code, 401)
+
+    def test_preflight_is_not_limited(self):
+        for _ in range(5):
+            self.assertNotEqual(self.app.options('/api/predict-time').status_code, 429)
+        self.assertEqual(self.predict().status_code, 200)
+
+class SharedRateLimitTestCase(RateLimitTestCase):
+    # The default backend, shared by the forked server workers
+    config = dict(RateLimitTestCase.config, RATE_LIMIT_BACKEND='shared')
+
+class SQLiteRateLimitTestCase(RateLimitTestCase):
+    config = dict(RateLimitTestCase.config, RATE_LIMIT_BACKEND='sqlite')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import base64
+import json
+import unittest
+from api_test_case import APITestCase
+
+NAMES = ['alice', 'Alicia', 'ALINA', 'Albena', 'Мария', 'мариана', 'Марин', 'Bob', 'Боряна', 'Ivan', 'Иван',
+         'Alice', 'Ана']
+
+class UsersAPITestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.headers = self.register('Owner', 'owner@example.com', 'owner')['headers']
+        for i, name in enumerate(NAMES):
+            self.register(name, f'user{i}@example.com', 'worker' if i % 3 == 0 else 'client')
+
+    def get(self, query):
+        return self.app.get(f'/api/users?{query}', headers=self.headers)
+
+    def pages(self, query, limit):
+        # Follows next_cursor to the end; returns the ids in order
+        ids, cursor = [], ''
+        while True:
+            response = self.get(f'{query}&limit={limit}&cursor={cursor}')
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()
+            self.assertLessEqual(len(data['users']), limit)
+            ids += [user['id'] for user in data['users']]
+            cursor = data['next_cursor']
+            if not cursor:
+                return ids
+
+    def test_cursor_round_trip(self):
+        for query in ('', 'role=worker', 'prefix=al', 'prefix=мар', 'q=example', 'status=active'):
+            everything = self.pages(query, 100)
+            self.assertTrue(everything, query)
+            for limit in (1, 2, 5):
+                # Every row exactly once, in the same order as a single page
+                self.assertEqual(self.pages(query, limit), everything, f'{query} limit={limit}')
+
+    def test_prefix_is_case_insensitive(self):
+        # Alphabetical by folded name, then by id
+        names = [user['name'] for user in self.get('prefix=ALI').get_json()['users']]
+        self.assertEqual(names, ['alice', 'Alice', 'Alicia', 'ALINA'])
+        names = [user['name'] for user in self.get('prefix=МАРИ').get_json()['users']]
+        self.assertEqual(names, ['мариана', 'Марин', 'Мария'])
+
+    def test_newest_first(self):
+        names = [user['name'] for user in self.get('limit=3').get_json()['users']]
+        self.assertEqual(names, NAMES[:-4:-1])
+
+    def test_cursor_from_another_listing(self):
+        cursor = self.get('limit=1').get_json()['next_cursor']
+        response = self.get(f'prefix=al&cursor={cursor}')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.get_json()['errors'])
+
+    def test_malformed_cursor(self):
+        for value in (['created', {'a': 1}, 2], ['created', 'x', True], ['name', 'al'], ['search', '1']):
+            cursor = base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+            self.assertEqual(self.get(f'cursor={cursor}').status_code, 400, value)
+        self.assertEqual(self.get('cursor=not-base64!').status_code, 400)
+
+    def test_deactivated_user_is_locked_out(self):
+        temp = self.register('Temp', 'temp@example.com', 'worker')
+        headers, user_id = temp['headers'], temp['id']
+        response = self.app.put(f'/api/users/{user_id}/status', headers=self.headers, json={'status': 'inactive'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.app.get('/api/auth/verify', headers=headers).status_code, 403)
+        self.assertEqual(self.login('temp@example.com').status_code, 403)
+        self.app.put(f'/api/users/{user_id}/status', headers=self.headers, json={'status': 'active'})
+        self.assertEqual(self.app.get('/api/auth/verify', headers=headers).status_code, 200)
+
+    def test_owner_cannot_deactivate_self(self):
+        owner_id = self.get('q=owner@example').get_json()['users'][0]['id']
+        response = self.app.put(f'/api/users/{owner_id}/status', headers=self.headers, json={'status': 'inactive'})
+        self.assertEqual(response.status_code, 409)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.get('limit=0').status_code, 400)
+        self.assertEqual(self.get('role=admin').status_code, 400)
+        self.assertEqual(self.get('q=ab').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()